@@ -0,0 +1,86 @@
+import io
+import os
+import time
+from typing import Optional
+
+from jupiter_import import import_jupiter_station
+from main_handler import MainHandler
+from model_builder import ModelBuilder
+from rail_route import RailRoute
+from xml_formation import RoutesXmlStream, minidom_rail_routes_xml
+
+# performance measurements are run as script, library modules are only imported
+
+
+def benchmark_routes_xml(routes_count: int = 100000, routes_per_light: int = 50) -> dict[str, float]:
+    """ seconds of minidom and streaming route xml formation for one signal type """
+    light_routes = []
+    for i in range(routes_count // routes_per_light):
+        routes = []
+        for j in range(routes_per_light):
+            route = RailRoute(i * routes_per_light + j + 1)
+            route.route_type = "PpoTrainRoute" if j % 2 else "PpoShuntingRoute"
+            route.route_tag = "N{}_CH{}&{}".format(i, j, j % 3)
+            route.trace_begin = "N{}".format(i)
+            route.trace_points = "+{} -{}".format(j % 100 + 1, (j + 7) % 100 + 1)
+            route.trace_end = "CH{}".format(j)
+            route.end_selectors = "CH{} M{}".format(j, j)
+            routes.append(route)
+        light_routes.append(("N{}".format(i), "PpoTrainSignal", routes))
+
+    start_time = time.perf_counter()
+    reference = minidom_rail_routes_xml(light_routes, "PpoTrainSignal")
+    minidom_time = time.perf_counter() - start_time
+
+    start_time = time.perf_counter()
+    out = io.StringIO()
+    stream = RoutesXmlStream(out)
+    for light_name, signal_type, routes in light_routes:
+        stream.write_signal(light_name, signal_type, routes)
+    stream.close()
+    streaming_time = time.perf_counter() - start_time
+
+    assert out.getvalue() == reference, "streaming output differs from minidom pretty format"
+    return {"routes": routes_count, "minidom": minidom_time, "streaming": streaming_time}
+
+
+def benchmark_jupiter_station(dir_name: str = "jupiter_config", routes_dir_name: str = "jupiter_routes",
+                              extension: str = ".csv", axes_count: Optional[int] = 5) -> dict[str, float]:
+    """ seconds of import, config load, model build and routes evaluation for jupiter station,
+        first axes_count ground lines are taken: config load of 5 axes takes seconds, of 8 axes - minutes,
+        from 10 axes points of picket coordinate system of Kupch are taken and cannot be built """
+    start_time = time.perf_counter()
+    cls_rows = import_jupiter_station(dir_name, extension=extension, axes_count=axes_count)
+    import_time = time.perf_counter() - start_time
+
+    start_time = time.perf_counter()
+    mh = MainHandler()
+    mh.read_station_config(dir_name)
+    load_time = time.perf_counter() - start_time
+
+    start_time = time.perf_counter()
+    images = [mh.soi_storage.soi_objects[obj_key.cls_name][obj_key.obj_name]
+              for obj_key in mh.dependence_graph.rectify_dg()]
+    model_builder = ModelBuilder()
+    model_builder.init_soi_list(images)
+    model_builder.build_model()
+    build_time = time.perf_counter() - start_time
+
+    start_time = time.perf_counter()
+    os.makedirs(routes_dir_name, exist_ok=True)
+    model_builder.eval_routes(routes_dir_name)
+    routes_time = time.perf_counter() - start_time
+
+    return {"objects": sum(len(rows) for _, rows in cls_rows.values()), "import": import_time, "load": load_time,
+            "build": build_time, "routes": routes_time}
+
+
+if __name__ == "__main__":
+
+    test_1 = True
+    if test_1:
+        print(benchmark_routes_xml())
+
+    test_2 = True
+    if test_2:
+        print(benchmark_jupiter_station())
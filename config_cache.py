@@ -0,0 +1,100 @@
+from __future__ import annotations
+from collections import OrderedDict
+from typing import Optional
+import hashlib
+import json
+import os
+
+# cache of other version is not read, version is changed when records forming or document format is changed
+CONFIG_CACHE_VERSION = 1
+CONFIG_CACHE_FOLDER_NAME = "station_config_cache"
+
+
+def file_content_hash(file: str) -> str:
+    content_hash = hashlib.sha1()
+    with open(file, 'rb') as in_file:
+        for chunk in iter(lambda: in_file.read(1 << 16), b""):
+            content_hash.update(chunk)
+    return content_hash.hexdigest()
+
+
+def user_cache_folder() -> str:
+    """ per-user cache folder: %LOCALAPPDATA% on Windows, $XDG_CACHE_HOME or ~/.cache else """
+    if os.name == "nt":
+        base_folder = os.environ.get("LOCALAPPDATA") or os.path.join(os.path.expanduser("~"), "AppData", "Local")
+    else:
+        base_folder = os.environ.get("XDG_CACHE_HOME") or os.path.join(os.path.expanduser("~"), ".cache")
+    return os.path.join(base_folder, CONFIG_CACHE_FOLDER_NAME)
+
+
+def config_cache_file_name(config_folder: str) -> str:
+    """ cache file of config folder in user cache folder, named by cache version and folder path """
+    cache_key = hashlib.sha1("{}:{}".format(CONFIG_CACHE_VERSION, os.path.abspath(config_folder))
+                             .encode("utf-8")).hexdigest()
+    return os.path.join(user_cache_folder(), "{}.json".format(cache_key))
+
+
+class ConfigRecordsCache:
+    """ parsed workbook records by file path, valid while file size and mtime or content hash are the same,
+        saved as json document {"version": CONFIG_CACHE_VERSION, "entries": {file: [size, mtime, hash, records]}} """
+    def __init__(self, file_name: Optional[str] = None):
+        self.file_name = file_name
+        self._entries: dict[str, tuple[int, int, str, list[OrderedDict[str, str]]]] = {}
+        self.hits = 0
+        self.misses = 0
+        self.changed = False
+        if file_name:
+            self.load()
+
+    def __len__(self):
+        return len(self._entries)
+
+    def get_records(self, file: str) -> Optional[list[OrderedDict[str, str]]]:
+        entry = self._entries.get(file)
+        if entry is not None:
+            size, mtime_ns, content_hash, records = entry
+            file_stat = os.stat(file)
+            if (file_stat.st_size == size) and (file_stat.st_mtime_ns == mtime_ns):
+                self.hits += 1
+                return records
+            # touched but maybe not changed file
+            if (file_stat.st_size == size) and (file_content_hash(file) == content_hash):
+                self._entries[file] = (size, file_stat.st_mtime_ns, content_hash, records)
+                self.changed = True
+                self.hits += 1
+                return records
+        self.misses += 1
+        return None
+
+    def put_records(self, file: str, records: list[OrderedDict[str, str]]):
+        file_stat = os.stat(file)
+        self._entries[file] = (file_stat.st_size, file_stat.st_mtime_ns, file_content_hash(file), records)
+        self.changed = True
+
+    def clear(self):
+        self._entries.clear()
+        self.changed = True
+
+    def load(self):
+        if not os.path.isfile(self.file_name):
+            return
+        try:
+            with open(self.file_name, 'r', encoding='utf-8') as in_file:
+                document = json.load(in_file, object_pairs_hook=OrderedDict)
+        except (OSError, ValueError):
+            return
+        if (not isinstance(document, dict)) or (document.get("version") != CONFIG_CACHE_VERSION):
+            return
+        entries = document.get("entries")
+        if isinstance(entries, dict):
+            self._entries = {file: tuple(entry) for file, entry in entries.items()}
+
+    def save(self):
+        if not (self.file_name and self.changed):
+            return
+        os.makedirs(os.path.dirname(self.file_name), exist_ok=True)
+        tmp_file_name = "{}.tmp".format(self.file_name)
+        with open(tmp_file_name, 'w', encoding='utf-8') as out_file:
+            json.dump({"version": CONFIG_CACHE_VERSION, "entries": self._entries}, out_file, ensure_ascii=False)
+        os.replace(tmp_file_name, self.file_name)
+        self.changed = False
@@ -1,6 +1,7 @@
 GLOBAL_CS_NAME = "GlobalCS"
 STATION_OUT_CONFIG_FOLDER = "station_out_config"
 STATION_IN_CONFIG_FOLDER = "station_in_config"
+CONFIG_FILE_EXTENSIONS = (".csv", ".json", ".xlsx")
 CLASSES_SEQUENCE = ['CoordinateSystem',
                     'Axis',
                     'Point',
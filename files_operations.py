@@ -1,11 +1,23 @@
 from collections import OrderedDict
+from concurrent.futures import ProcessPoolExecutor
+from typing import Iterator, Iterable, Optional
+import csv
+import json
 import os
-import pandas as pd
+from openpyxl import load_workbook, Workbook
 
 from soi_objects import StationObjectImage, ComplexAttrError
 from default_ordered_dict import DefaultOrderedDict
 from form_exception_message import form_message_from_error
 from attribute_object_key import AttributeKey
+from config_cache import ConfigRecordsCache, config_cache_file_name
+
+from config_names import CONFIG_FILE_EXTENSIONS
+
+# starting of processes costs more than reading or writing of usual station config,
+# without given max_workers processes are used only for larger configs
+PROCESS_POOL_MIN_FILES_SIZE = 1 << 20
+PROCESS_POOL_MIN_ROWS_COUNT = 20000
 
 
 class ReadFileError(Exception):
@@ -44,20 +56,301 @@ class RFDublicateComplexAttrError(ReadFileAttribError):
     pass
 
 
-def read_station_config(dir_name: str) -> DefaultOrderedDict[str, OrderedDict[str, StationObjectImage]]:
-    result: DefaultOrderedDict[str, OrderedDict[str, StationObjectImage]] = DefaultOrderedDict(OrderedDict)
+class WriteFileError(Exception):
+    pass
+
+
+class WFOtherFormatFileError(WriteFileError):
+    pass
+
+
+def use_process_pool(max_workers: Optional[int], tasks_count: int, load: int, min_load: int) -> bool:
+    """ max_workers == 1 - sequential, max_workers > 1 - processes, None - processes only for load >= min_load """
+    if (max_workers == 1) or (tasks_count < 2):
+        return False
+    return (max_workers is not None) or (load >= min_load)
+
+
+def xlsx_cell_str(value) -> str:
+    """ cell value as pd.read_excel(dtype=str, keep_default_na=False) gives it """
+    if value is None:
+        return ""
+    if isinstance(value, float) and value.is_integer():
+        return str(int(value))
+    return str(value)
+
+
+def xlsx_cell_value(cell):
+    """ error cell value is nan as in pandas """
+    return float("nan") if cell.data_type == "e" else cell.value
+
+
+def xlsx_header(header_row: Iterable, width: int = 0) -> list[str]:
+    """ column names as pandas forms them: empty - 'Unnamed: i', repeated - 'name.1', 'name.2'...,
+        header is extended by empty names to width of data rows """
+    header_row = [None if value == "" else value for value in header_row]
+    while header_row and (header_row[-1] is None):
+        header_row.pop()
+    header_row.extend([None] * (width - len(header_row)))
+    result = []
+    repeats: dict[str, int] = {}
+    for i, value in enumerate(header_row):
+        column_name = "Unnamed: {}".format(i) if value is None else xlsx_cell_str(value)
+        if column_name in repeats:
+            repeats[column_name] += 1
+            column_name = "{}.{}".format(column_name, repeats[column_name])
+        else:
+            repeats[column_name] = 0
+        result.append(column_name)
+    return result
+
+
+def iter_table_records(header_row: Iterable, rows: Iterable[Iterable]) -> Iterator[OrderedDict[str, str]]:
+    """ records of table rows as pandas forms them: trailing empty cells and blank rows at the end are trimmed,
+        rows are extended to width of the widest one, cells out of header are in 'Unnamed: i' columns """
+    rows_values: list[list[str]] = []
+    data_rows_count = 0
+    for row in rows:
+        values = [xlsx_cell_str(value) for value in row]
+        while values and not values[-1]:
+            values.pop()
+        rows_values.append(values)
+        if values:
+            data_rows_count = len(rows_values)
+    del rows_values[data_rows_count:]
+    header = xlsx_header(header_row, max((len(values) for values in rows_values), default=0))
+    for values in rows_values:
+        values.extend([""] * (len(header) - len(values)))
+        yield OrderedDict(zip(header, values))
+
+
+def text_header_row(header_row: list) -> list:
+    """ empty column names of text file are the same as empty header cells """
+    return [column_name if column_name else None for column_name in header_row]
+
+
+def iter_xlsx_rows(file: str) -> Iterator[OrderedDict[str, str]]:
+    """ rows of first sheet read in read-only mode """
+    workbook = load_workbook(file, read_only=True, data_only=True)
+    try:
+        rows = ([xlsx_cell_value(cell) for cell in row] for row in workbook.worksheets[0].iter_rows())
+        yield from iter_table_records(next(rows, ()), rows)
+    finally:
+        workbook.close()
+
+
+def iter_csv_rows(file: str) -> Iterator[OrderedDict[str, str]]:
+    with open(file, 'r', encoding='utf-8', newline='') as in_file:
+        rows = csv.reader(in_file)
+        yield from iter_table_records(text_header_row(next(rows, [])), rows)
+
+
+def iter_json_rows(file: str) -> Iterator[OrderedDict[str, str]]:
+    """ json document is {"columns": [...], "rows": [[...], ...]}, columns may repeat as in table file """
+    with open(file, 'r', encoding='utf-8') as in_file:
+        document = json.load(in_file)
+    yield from iter_table_records(text_header_row(document["columns"]), document["rows"])
+
+
+def iter_config_rows(file: str) -> Iterator[OrderedDict[str, str]]:
+    """ format is chosen by file extension: .csv, .json, else .xlsx """
+    if file.endswith(".csv"):
+        return iter_csv_rows(file)
+    if file.endswith(".json"):
+        return iter_json_rows(file)
+    return iter_xlsx_rows(file)
+
+
+def read_config_records(file: str) -> list[OrderedDict[str, str]]:
+    return list(iter_config_rows(file))
+
+
+def read_config_columns(file: str) -> list[str]:
+    """ column names of class file, also of file without rows """
+    if file.endswith(".csv"):
+        with open(file, 'r', encoding='utf-8', newline='') as in_file:
+            return xlsx_header(text_header_row(next(csv.reader(in_file), [])))
+    if file.endswith(".json"):
+        with open(file, 'r', encoding='utf-8') as in_file:
+            return xlsx_header(text_header_row(json.load(in_file)["columns"]))
+    workbook = load_workbook(file, read_only=True, data_only=True)
+    try:
+        return xlsx_header([xlsx_cell_value(cell) for cell in next(workbook.worksheets[0].iter_rows(), ())])
+    finally:
+        workbook.close()
+
+
+def write_config_rows(file: str, columns: list[str], rows: Iterable[list[str]], extension: Optional[str] = None):
+    """ class file: .json, .xlsx (write-only workbook) by extension, else .csv,
+        extension is given when file name is temporary """
+    if extension is None:
+        extension = os.path.splitext(file)[1]
+    if extension == ".json":
+        with open(file, 'w', encoding='utf-8') as out_file:
+            json.dump({"columns": columns, "rows": list(rows)}, out_file, ensure_ascii=False, indent=1)
+    elif extension == ".xlsx":
+        workbook = Workbook(write_only=True)
+        worksheet = workbook.create_sheet()
+        worksheet.append(columns)
+        for row in rows:
+            worksheet.append(row)
+        workbook.save(file)
+    else:
+        with open(file, 'w', encoding='utf-8', newline='') as out_file:
+            writer = csv.writer(out_file)
+            writer.writerow(columns)
+            writer.writerows(rows)
+
+
+def write_config_records(file: str, columns: list[str], records: Iterable[OrderedDict[str, str]]):
+    write_config_rows(file, columns, ([record[column_name] for column_name in columns] for record in records))
+
+
+def write_station_config(dir_name: str, cls_rows: OrderedDict[str, tuple[list[str], list[list[str]]]],
+                         extension: str = ".xlsx", max_workers: Optional[int] = None):
+    """ class files are written to temporary files, replaced only when all are written,
+        concurrently in processes by use_process_pool for rows count,
+        nothing is written if class file of other format is in folder """
+    folder = os.path.join(os.getcwd(), dir_name)
+    check_other_format_files(folder, cls_rows, extension)
+    os.makedirs(folder, exist_ok=True)
+    files = OrderedDict((cls_name, os.path.join(folder, "{}{}".format(cls_name, extension))) for cls_name in cls_rows)
+    tmp_files = OrderedDict((cls_name, "{}.tmp".format(file)) for cls_name, file in files.items())
+    try:
+        rows_count = sum(len(rows) for _, rows in cls_rows.values())
+        if not use_process_pool(max_workers, len(cls_rows), rows_count, PROCESS_POOL_MIN_ROWS_COUNT):
+            for cls_name, (columns, rows) in cls_rows.items():
+                write_config_rows(tmp_files[cls_name], columns, rows, extension)
+        else:
+            with ProcessPoolExecutor(max_workers=max_workers) as executor:
+                futures = [executor.submit(write_config_rows, tmp_files[cls_name], columns, rows, extension)
+                           for cls_name, (columns, rows) in cls_rows.items()]
+                for future in futures:
+                    future.result()
+    except BaseException:
+        for tmp_file in tmp_files.values():
+            if os.path.isfile(tmp_file):
+                os.remove(tmp_file)
+        raise
+    for cls_name, file in files.items():
+        os.replace(tmp_files[cls_name], file)
+
+
+def check_other_format_files(folder: str, cls_names: Iterable[str], extension: str):
+    """ class file of other format would be read instead of written one or together with it """
+    for cls_name in cls_names:
+        for other_extension in CONFIG_FILE_EXTENSIONS:
+            other_file = os.path.join(folder, "{}{}".format(cls_name, other_extension))
+            if (other_extension != extension) and os.path.isfile(other_file):
+                raise WFOtherFormatFileError("Class file '{}' of other format exists in folder"
+                                             .format(os.path.basename(other_file)))
+
+
+def station_config_file(folder: str, cls_name_del_soi: str) -> str:
+    """ first found of class files by CONFIG_FILE_EXTENSIONS order, .xlsx name if there is no file """
+    for extension in CONFIG_FILE_EXTENSIONS:
+        file = os.path.join(folder, "{}{}".format(cls_name_del_soi, extension))
+        if os.path.isfile(file):
+            return file
+    return os.path.join(folder, "{}.xlsx".format(cls_name_del_soi))
+
+
+def convert_station_config(src_dir_name: str, dst_dir_name: str, extension: str = ".csv"):
+    """ class files of source config in any format are written to destination folder as .csv or .json """
+    src_folder = os.path.join(os.getcwd(), src_dir_name)
+    dst_folder = os.path.join(os.getcwd(), dst_dir_name)
+    cls_names = [cls.__name__.replace("SOI", "") for cls in StationObjectImage.__subclasses__()]
+    check_other_format_files(dst_folder, cls_names, extension)
+    os.makedirs(dst_folder, exist_ok=True)
+    for cls_name_del_soi in cls_names:
+        src_file = station_config_file(src_folder, cls_name_del_soi)
+        dst_file = os.path.join(dst_folder, "{}{}".format(cls_name_del_soi, extension))
+        records = read_config_records(src_file)
+        columns = list(records[0]) if records else read_config_columns(src_file)
+        write_config_records(dst_file, columns, records)
+
+
+def iter_config_records(files: list[str], max_workers: Optional[int] = None,
+                        config_cache: ConfigRecordsCache = None) -> Iterator[Iterable[OrderedDict[str, str]]]:
+    """ class files are parsed concurrently in processes by use_process_pool for files size,
+        records are yielded in files order, error of file parsing is raised in its turn as in sequential reading,
+        in sequential reading files are parsed one by one when records are requested.
+        Unchanged files are taken from config_cache without parsing, parsed ones are put to it """
+    cached_records: dict[str, list[OrderedDict[str, str]]] = {}
+    if config_cache is not None:
+        for file in files:
+            if os.path.isfile(file):
+                records = config_cache.get_records(file)
+                if records is not None:
+                    cached_records[file] = records
+    files_to_parse = [file for file in files if file not in cached_records]
+    files_size = sum(os.path.getsize(file) for file in files_to_parse if os.path.isfile(file))
+
+    if not use_process_pool(max_workers, len(files_to_parse), files_size, PROCESS_POOL_MIN_FILES_SIZE):
+        for file in files:
+            if file in cached_records:
+                yield cached_records[file]
+            elif config_cache is None:
+                yield iter_config_rows(file)
+            else:
+                records = read_config_records(file)
+                config_cache.put_records(file, records)
+                yield records
+    else:
+        with ProcessPoolExecutor(max_workers=max_workers) as executor:
+            futures = {file: executor.submit(read_config_records, file) for file in files_to_parse}
+            try:
+                for file in files:
+                    if file in cached_records:
+                        yield cached_records[file]
+                    else:
+                        records = futures[file].result()
+                        if config_cache is not None:
+                            config_cache.put_records(file, records)
+                        yield records
+            finally:
+                for future in futures.values():
+                    future.cancel()
+
+
+def station_config_files_stats(dir_name: str) -> OrderedDict[str, tuple[str, int, int]]:
+    """ class file, its size and mtime by class name, zero size and mtime for absent file """
+    result: OrderedDict[str, tuple[str, int, int]] = OrderedDict()
     folder = os.path.join(os.getcwd(), dir_name)
     for cls in StationObjectImage.__subclasses__():
+        cls_name_del_soi = cls.__name__.replace("SOI", "")
+        file = station_config_file(folder, cls_name_del_soi)
+        if os.path.isfile(file):
+            file_stat = os.stat(file)
+            result[cls_name_del_soi] = (file, file_stat.st_size, file_stat.st_mtime_ns)
+        else:
+            result[cls_name_del_soi] = (file, 0, 0)
+    return result
+
+
+def read_station_config_values(dir_name: str, max_workers: Optional[int] = None, use_cache: bool = False,
+                               cls_names: Optional[Iterable[str]] = None) -> \
+        DefaultOrderedDict[str, OrderedDict[str, OrderedDict[str, str]]]:
+    """ stripped attribute values of objects by class and object names, records are checked as in reading objects,
+        with cls_names only files of these classes are read """
+    result: DefaultOrderedDict[str, OrderedDict[str, OrderedDict[str, str]]] = DefaultOrderedDict(OrderedDict)
+    folder = os.path.join(os.getcwd(), dir_name)
+    classes = StationObjectImage.__subclasses__()
+    if cls_names is not None:
+        cls_names = set(cls_names)
+        classes = [cls for cls in classes if cls.__name__.replace("SOI", "") in cls_names]
+    files = [station_config_file(folder, cls.__name__.replace("SOI", "")) for cls in classes]
+    config_cache = ConfigRecordsCache(config_cache_file_name(folder)) if use_cache else None
+    for cls, obj_dict_list in zip(classes, iter_config_records(files, max_workers, config_cache)):
         cls_name_soi = cls.__name__
         cls_name_del_soi = cls_name_soi.replace("SOI", "")
-        file = os.path.join(folder, "{}.xlsx".format(cls_name_del_soi))
-        df: pd.DataFrame = pd.read_excel(file, dtype=str, keep_default_na=False)
-        obj_dict_list: list[OrderedDict[str, str]] = df.to_dict('records', OrderedDict)
+        cls_schema = cls.schema()
+        result[cls_name_del_soi] = OrderedDict()
         for obj_dict in obj_dict_list:
-            new_obj = cls()
-            complex_attr_keys_set = set([cap.name for cap in new_obj.object_prop_struct.attrib_list])
+            complex_attr_keys_set = set(cls_schema.attr_names)
             if "name" not in obj_dict:
                 raise RFNoNameError("No column 'name'")
+            obj_values: OrderedDict[str, str] = OrderedDict()
             for attr_name, attr_val in obj_dict.items():
                 if "." in attr_name:
                     raise RFDublicateComplexAttrError("Attrib '{}' duplication in file"
@@ -65,26 +358,46 @@ def read_station_config(dir_name: str) -> DefaultOrderedDict[str, OrderedDict[st
                 attr_name = attr_name.strip()
                 attr_val = attr_val.strip()
                 try:
-                    complex_attr_prop = new_obj.get_complex_attr_prop(attr_name)
+                    cls_schema.get_attribute(attr_name)
                 except ComplexAttrError as e:
                     raise RFGetComplexAttrError(e.args[0])
                 complex_attr_keys_set -= {attr_name}
-                complex_attr_prop.temporary_value = attr_val
+                obj_values[attr_name] = attr_val
                 if attr_name == "name":
                     if not attr_val:
                         raise RFEmptyNameError("No-name object in class {}".format(cls_name_del_soi))
                     if attr_val in result[cls_name_del_soi]:
                         raise RFNameRepeatingError("Name {} repeats".format(attr_val))
-                    result[cls_name_del_soi][attr_val] = new_obj
-                    new_obj.name = attr_val
+                    result[cls_name_del_soi][attr_val] = obj_values
             if complex_attr_keys_set:
                 raise RFNotAllComplexAttrError("Complex attributes '{}' not found in file".format(", ".join(complex_attr_keys_set)))
 
+    if config_cache is not None:
+        config_cache.save()
+    return result
+
+
+def read_station_config(dir_name: str, max_workers: Optional[int] = None, use_cache: bool = False) -> \
+        DefaultOrderedDict[str, OrderedDict[str, StationObjectImage]]:
+    """ class file format is detected by extension (.csv, .json, .xlsx),
+        with use_cache parsed records are kept in cache file in user cache folder """
+    result: DefaultOrderedDict[str, OrderedDict[str, StationObjectImage]] = DefaultOrderedDict(OrderedDict)
+    cls_by_name = {cls.__name__.replace("SOI", ""): cls for cls in StationObjectImage.__subclasses__()}
+    config_values = read_station_config_values(dir_name, max_workers, use_cache)
+    for cls_name_del_soi in config_values:
+        for obj_name, obj_values in config_values[cls_name_del_soi].items():
+            new_obj = cls_by_name[cls_name_del_soi]()
+            for attr_name, attr_val in obj_values.items():
+                new_obj.get_complex_attr_prop(attr_name).temporary_value = attr_val
+            result[cls_name_del_soi][obj_name] = new_obj
+            new_obj.name = obj_name
     return result
 
 
 def make_xlsx_templates(dir_name: str):
     # needs to reimplement because of absence of enum values
+    import pandas as pd
+
     folder = os.path.join(os.getcwd(), dir_name)
     for cls in StationObjectImage.__subclasses__():
         name_soi = cls.__name__
@@ -1,5 +1,6 @@
 from __future__ import annotations
 import math
+from collections import defaultdict
 import numpy as np
 from abc import ABC, abstractmethod
 from typing import Union
@@ -140,6 +141,36 @@ def bezier_curvature(t: Real, pnt_1: Point2D, pnt_2: Point2D, pnt_control: Point
                        2 * (y3 - y1) * t - (y3 - y1) + t * y1 - t * y2) ** 2) ** (-1.5))
 
 
+def bezier_params_by_x(x1: np.ndarray, x2: np.ndarray, x3: np.ndarray, x: np.ndarray) -> np.ndarray:
+    """ vectorised solution of x(t) = x for quadratic bezier curves, x(t) is supposed monotonic on [0, 1] """
+    a = x1 - 2*x3 + x2
+    b = 2*(x3 - x1)
+    c = x1 - x
+    is_linear = np.abs(a) < COORD_EQUAL_PRECISION
+    safe_a = np.where(is_linear, 1., a)
+    sqrt_d = np.sqrt(np.maximum(b*b - 4*a*c, 0.))
+    t_root_1 = (-b + sqrt_d) / (2*safe_a)
+    t_root_2 = (-b - sqrt_d) / (2*safe_a)
+    t_quadratic = np.where((t_root_1 >= -COORD_EQUAL_PRECISION) & (t_root_1 <= 1 + COORD_EQUAL_PRECISION),
+                           t_root_1, t_root_2)
+    t_linear = -c / np.where(np.abs(b) < COORD_EQUAL_PRECISION, 1., b)
+    return np.clip(np.where(is_linear, t_linear, t_quadratic), 0., 1.)
+
+
+def bezier_arc_lengths(pnts_1: np.ndarray, pnts_2: np.ndarray, pnts_control: np.ndarray,
+                       t_begin: np.ndarray, t_end: np.ndarray, order: int = 8) -> np.ndarray:
+    """ arc lengths of quadratic bezier pieces [t_begin, t_end] by fixed-order gauss-legendre quadrature,
+        points arrays have shape (n, 2), line segment is bezier with control point in the middle """
+    nodes, weights = np.polynomial.legendre.leggauss(order)
+    half_length = 0.5*(t_end - t_begin)
+    t = (0.5*(t_end + t_begin))[:, np.newaxis] + half_length[:, np.newaxis]*nodes
+    t = t[:, :, np.newaxis]
+    derivative = 2*(1 - t)*(pnts_control - pnts_1)[:, np.newaxis, :] + \
+        2*t*(pnts_2 - pnts_control)[:, np.newaxis, :]
+    speed = np.sqrt(np.sum(derivative*derivative, axis=2))
+    return np.abs(half_length*(speed @ weights))
+
+
 class Point2D:
     def __init__(self, *args):
         """ Point2D(Real, Real) Point2D(tuple[Real, Real]) """
@@ -251,6 +282,45 @@ class Line2D:
             return
 
 
+class LinesAngleIndex:
+    """ lines by angle and intercept buckets; bucket size = precision, so neighbour buckets are also checked """
+    def __init__(self):
+        self._buckets: defaultdict[int, defaultdict[int, list[Line2D]]] = defaultdict(lambda: defaultdict(list))
+
+    @staticmethod
+    def angle_bucket(line: Line2D) -> int:
+        return round(line.angle.angle_mpi2_ppi2 / ANGLE_EQUAL_EVAL_PRECISION)
+
+    @staticmethod
+    def intercept_bucket(line: Line2D) -> int:
+        return round(line.c / COORD_EQUAL_PRECISION)
+
+    def append_line(self, line: Line2D):
+        self._buckets[self.angle_bucket(line)][self.intercept_bucket(line)].append(line)
+
+    def _near_angle_buckets(self, line: Line2D) -> list[defaultdict[int, list[Line2D]]]:
+        angle_bucket = self.angle_bucket(line)
+        return [self._buckets[bucket] for bucket in (angle_bucket - 1, angle_bucket, angle_bucket + 1)
+                if bucket in self._buckets]
+
+    def equivalent_lines(self, line: Line2D) -> list[Line2D]:
+        result = []
+        intercept_bucket = self.intercept_bucket(line)
+        for c_buckets in self._near_angle_buckets(line):
+            for bucket in (intercept_bucket - 1, intercept_bucket, intercept_bucket + 1):
+                if bucket not in c_buckets:
+                    continue
+                result.extend(line_2 for line_2 in c_buckets[bucket]
+                              if (line_2.angle == line.angle) and coord_equality(line_2.c, line.c))
+        return result
+
+    def check_new_line(self, line: Line2D):
+        """ raises EquivalentLinesException as lines_intersection does for any equivalent line in index """
+        equivalent_lines = self.equivalent_lines(line)
+        if equivalent_lines:
+            raise EquivalentLinesException('Lines {}, {} are equal'.format(line, equivalent_lines[0]))
+
+
 class GeometryPrimitive(ABC):
 
     @abstractmethod
@@ -295,6 +365,13 @@ class BoundedCurve(GeometryPrimitive):
     def bezier_control_point(self) -> Point2D:
         return lines_intersection(Line2D(self.pnt_1, angle=self.angle_1), Line2D(self.pnt_2, angle=self.angle_2))
 
+    @property
+    def quadratic_control_point(self) -> Point2D:
+        """ line segment is represented as quadratic bezier with control point in the middle """
+        if self.geom_type == 'line_segment':
+            return Point2D(0.5*(self.pnt_1.x+self.pnt_2.x), 0.5*(self.pnt_1.y+self.pnt_2.y))
+        return self.bezier_control_point
+
     def bezier_optimization(self) -> Angle:
         float_angle_1 = self.angle_1.angle_mpi2_ppi2
         # print("in optim", float_angle_1, (float_angle_1 + ANGLE_EQUAL_VIEW_PRECISION,
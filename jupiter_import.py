@@ -0,0 +1,401 @@
+from __future__ import annotations
+from collections import OrderedDict, defaultdict
+from typing import Iterator, Optional
+import csv
+import os
+import re
+
+import numpy as np
+
+from soi_objects import StationObjectImage
+from files_operations import write_station_config
+
+from config_names import GLOBAL_CS_NAME
+
+# jupiter station description tables in its folder
+JUPITER_FILES = {"basis": os.path.join("01.COMMON", "BASIS.csv"),
+                 "coordinate_systems": os.path.join("01.COMMON", "COORD_SYSTEMS.csv"),
+                 "ground_lines": os.path.join("07.GROUND", "GR_LINE.csv"),
+                 "ground_line_families": os.path.join("07.GROUND", "GR_LINE_FAMILY.csv"),
+                 "points": os.path.join("02.BASE_POINTS", "BASEPOINTS_with_borders.csv"),
+                 "lines": os.path.join("03.LINES", "BASELINES.csv"),
+                 "lights": os.path.join("04.POLE_OBJS", "LIGHTS.csv"),
+                 "joints": os.path.join("04.POLE_OBJS", "JOINTS.csv"),
+                 "isol_segments": os.path.join("05.SEGMENTS", "ISOL_SEGMENTS.csv")}
+JUPITER_FOLDER = "jupiter"
+
+# FieldCoord(value, cs) - groups: picket hundreds, picket meters, integer value, cs name
+FIELD_COORD_PATTERN = re.compile(r"FieldCoord\(\s*'?\s*(?:PK_(-?\d+)\+(\d+)|(-?\d+))\s*'?\s*,\s*(\w+)\s*\)")
+SIGNAL_COLOR_PATTERN = re.compile(r"E_SigColor\.(\w+)")
+SIGNAL_COLORS = {"R": "red", "B": "blue", "W": "white", "Y": "yellow", "G": "green"}
+# station signals begin routes, other types (block, neighbour station, repeat, warning) are out of station model
+SIGNAL_ROUTE_TYPES = {"E_SigType.Train": "train", "E_SigType.Man": "shunt"}
+GROUND_SEGMENT = "GraphSegment_Ground"
+FICTIVE_SEGMENT_TYPE = "E_IsolSegmType.FICTIVE"
+
+
+def iter_jupiter_rows(file: str) -> Iterator[OrderedDict[str, str]]:
+    """ rows of ';'-separated jupiter table one by one with stripped values, empty rows are skipped """
+    with open(file, 'r', encoding='utf-8', errors='replace', newline='') as in_file:
+        rows = csv.reader(in_file, delimiter=';')
+        header = [column_name.strip() for column_name in next(rows, [])]
+        for row in rows:
+            values = [value.strip() for value in row]
+            if any(values):
+                values.extend([""] * (len(header) - len(values)))
+                yield OrderedDict(zip(header, values))
+
+
+def parse_field_coords(values: list[str]) -> tuple[list[str], list[str], np.ndarray]:
+    """ coordinate strings for picket descriptor, cs names and coordinates in meters of FieldCoord values,
+        column is parsed by one regex pass, numbers are converted by arrays """
+    parts = FIELD_COORD_PATTERN.findall("\n".join(values))
+    assert len(parts) == len(values), "Not all values are FieldCoord"
+    if not parts:
+        return [], [], np.zeros(0, dtype=np.int64)
+    parts = np.array(parts, dtype=str).reshape(-1, 4)
+    is_picket = parts[:, 0] != ""
+    hundreds = np.where(is_picket, parts[:, 0], "0")
+    meters = np.where(is_picket, parts[:, 1], parts[:, 2])
+    str_values = ["PK_{}+{}".format(hundreds_str, meters_str) if picket else meters_str
+                  for hundreds_str, meters_str, picket in zip(hundreds.tolist(), meters.tolist(), is_picket.tolist())]
+    return str_values, parts[:, 3].tolist(), hundreds.astype(np.int64) * 100 + meters.astype(np.int64)
+
+
+class JupiterStation:
+    """ jupiter tables mapped to station object images rows:
+        coordinate systems - CoordinateSystem, ground lines - Axis, base points - Point (aliases by OnPoint are
+        replaced with their points), base lines - Line, lights - Light, joints pairs - RailPoint,
+        graph segments borders - Border, isolated segments - Section.
+        Objects which cannot be expressed by images (ground lines without shift or center point, lines ended on
+        lines out of axis, lights out of station) and objects referenced to them are skipped, lines chained on
+        one axis are merged. With axes_count only first ground lines are taken, for smaller stations """
+    def __init__(self, jupiter_dir_name: str = JUPITER_FOLDER, axes_count: Optional[int] = None):
+        self.folder = os.path.join(os.getcwd(), jupiter_dir_name)
+        self.axes_count = axes_count
+        self.axes_center_points: dict[str, str] = {}
+        self.point_aliases: dict[str, str] = {}
+        self.point_borders: OrderedDict[str, list[str]] = OrderedDict()
+        self.point_lines: dict[str, str] = {}
+        self.point_abs_x: dict[str, int] = {}
+        self.line_ends: OrderedDict[str, tuple[str, str]] = OrderedDict()
+        self.line_renames: dict[str, str] = {}
+        self.line_axes: dict[str, str] = {}
+        self.neighbours: dict[tuple[str, str], tuple[Optional[str], Optional[str]]] = {}
+
+    def iter_table(self, table_name: str) -> Iterator[OrderedDict[str, str]]:
+        return iter_jupiter_rows(os.path.join(self.folder, JUPITER_FILES[table_name]))
+
+    def point_name(self, name: str) -> str:
+        while name in self.point_aliases:
+            name = self.point_aliases[name]
+        return name
+
+    def station_config_rows(self) -> OrderedDict[str, tuple[list[str], list[list[str]]]]:
+        """ columns and rows of class files by class name as for write_station_config """
+        objects: OrderedDict[str, list[OrderedDict[str, str]]] = OrderedDict()
+        cs_abs_x, cs_direction, main_cs_name = self.coordinate_systems(objects)
+        self.axes(objects, main_cs_name)
+        self.points_and_lines(objects, cs_abs_x, cs_direction)
+        self.eval_neighbours()
+        self.lights(objects)
+        self.rail_points(objects)
+        self.borders(objects)
+        self.sections(objects)
+
+        result = OrderedDict()
+        for cls in StationObjectImage.__subclasses__():
+            cls_name = cls.__name__.replace("SOI", "")
+            columns = list(cls.schema().attr_names)
+            result[cls_name] = (columns, [[obj_values.get(column_name, "") for column_name in columns]
+                                          for obj_values in objects.get(cls_name, [])])
+        return result
+
+    def coordinate_systems(self, objects: OrderedDict) -> tuple[dict[str, int], dict[str, int], str]:
+        main_cs_name = next(self.iter_table("basis"))["MainCoordSystem"]
+        cs_abs_x = {}
+        cs_direction = {}
+        objects["CoordinateSystem"] = []
+        for row in self.iter_table("coordinate_systems"):
+            name = row["Name"]
+            if row["FieldCoord"]:
+                (x,), (cs_relative_to,), (value,) = parse_field_coords([row["FieldCoord"]])
+                co_direct = -1 if row["RelCsCoDirect"] == "-1" else 1
+            else:
+                x, cs_relative_to, value, co_direct = "0", GLOBAL_CS_NAME, 0, 1
+            if cs_relative_to == GLOBAL_CS_NAME:
+                cs_abs_x[name], cs_direction[name] = int(value), co_direct
+            else:
+                cs_abs_x[name] = cs_abs_x[cs_relative_to] + cs_direction[cs_relative_to] * int(value)
+                cs_direction[name] = cs_direction[cs_relative_to] * co_direct
+            objects["CoordinateSystem"].append(OrderedDict([("name", name), ("dependence", "dependent"),
+                                                            ("cs_relative_to", cs_relative_to), ("x", x),
+                                                            ("co_x", "true" if co_direct == 1 else "false"),
+                                                            ("co_y", "true")]))
+        return cs_abs_x, cs_direction, main_cs_name
+
+    def axes(self, objects: OrderedDict, main_cs_name: str):
+        families_angles = {row["Name"]: row["Angle"] for row in self.iter_table("ground_line_families")}
+        objects["Axis"] = []
+        for row in self.iter_table("ground_lines"):
+            angle = families_angles.get(row["Family"], "0")
+            if (angle in ("", "0")) and row["Shift"]:
+                objects["Axis"].append(OrderedDict([("name", row["Name"]), ("cs_relative_to", main_cs_name),
+                                                    ("creation_method", "translational"), ("y", row["Shift"])]))
+            elif (angle not in ("", "0")) and row["AnchorPoint"]:
+                objects["Axis"].append(OrderedDict([("name", row["Name"]), ("cs_relative_to", main_cs_name),
+                                                    ("creation_method", "rotational"),
+                                                    ("center_point", row["AnchorPoint"]), ("alpha", angle)]))
+                self.axes_center_points[row["Name"]] = row["AnchorPoint"]
+            if (self.axes_count is not None) and (len(objects["Axis"]) == self.axes_count):
+                break
+
+    def points_and_lines(self, objects: OrderedDict, cs_abs_x: dict[str, int], cs_direction: dict[str, int]):
+        coord_rows = []
+        for row in self.iter_table("points"):
+            if row.get("PropBorders"):
+                self.point_borders[row["Name"]] = re.findall(r"\w+", row["PropBorders"])
+            if row["OnPoint"]:
+                self.point_aliases[row["Name"]] = row["OnPoint"]
+            else:
+                coord_rows.append(row)
+        for row in self.iter_table("lines"):
+            self.line_ends[row["Name"]] = (self.point_name(row["Point_Begin"]), self.point_name(row["Point_End"]))
+
+        """ coordinates of all points at once """
+        str_values, cs_names, values = parse_field_coords([row["FieldCoord"] for row in coord_rows])
+        cs_abs = np.array([cs_abs_x[cs_name] for cs_name in cs_names], dtype=np.int64)
+        cs_dir = np.array([cs_direction[cs_name] for cs_name in cs_names], dtype=np.int64)
+        abs_x = cs_abs + cs_dir * values
+
+        """ points on skipped axes, lines with skipped ends or with end on line out of axis (model builds lines
+            only by points on axes), axes with skipped center point and points on them are removed until all
+            are found """
+        point_rows = OrderedDict((row["Name"], row) for row in coord_rows)
+        axes_names = {obj_values["name"] for obj_values in objects["Axis"]}
+        lines_names = set(self.line_ends)
+        while True:
+            points_names = {name for name, row in point_rows.items()
+                            if (row["Line"] in axes_names) or (row["Line"] in lines_names)}
+            ends_lines_names = {name for name in lines_names
+                                if all(end in points_names for end in self.line_ends[name])}
+            ends_groups = {name: [point_rows[end]["Line"] for end in self.line_ends[name]] for name in ends_lines_names}
+            axis_lines_names = {name for name, groups in ends_groups.items()
+                                if (groups[0] in axes_names) and (groups[0] == groups[1])}
+            new_lines_names = {name for name, groups in ends_groups.items()
+                               if all((group in axes_names) or (group in axis_lines_names) for group in groups)}
+            new_axes_names = {name for name in axes_names
+                              if self.point_name(self.axes_center_points.get(name, "")) in points_names
+                              or (name not in self.axes_center_points)}
+            if (len(points_names) == len(point_rows)) and (new_lines_names == lines_names) and \
+                    (new_axes_names == axes_names):
+                break
+            point_rows = OrderedDict((name, row) for name, row in point_rows.items() if name in points_names)
+            lines_names = new_lines_names
+            axes_names = new_axes_names
+        objects["Axis"] = [obj_values for obj_values in objects["Axis"] if obj_values["name"] in axes_names]
+        points_abs_x = {row["Name"]: int(point_abs_x) for row, point_abs_x in zip(coord_rows, abs_x)}
+        self.line_renames = self.merge_axis_lines(point_rows, axes_names, lines_names, points_abs_x)
+        lines_names -= set(self.line_renames)
+
+        objects["Point"] = []
+        for row, x, cs_name in zip(coord_rows, str_values, cs_names):
+            name = row["Name"]
+            if name not in point_rows:
+                continue
+            # points on line lying on axis are built by model as points of axis
+            line_name = self.line_renames.get(row["Line"], row["Line"])
+            line_name = self.line_axes.get(line_name, line_name)
+            self.point_lines[name] = line_name
+            self.point_abs_x[name] = points_abs_x[name]
+            on = "axis" if line_name in axes_names else "line"
+            objects["Point"].append(OrderedDict([("name", name), ("on", on), (on, line_name),
+                                                 ("cs_relative_to", cs_name), ("x", x)]))
+        objects["Line"] = [OrderedDict([("name", name), ("points", " ".join(ends))])
+                           for name, ends in self.line_ends.items() if name in lines_names]
+        self.line_ends = OrderedDict((name, ends) for name, ends in self.line_ends.items() if name in lines_names)
+        self.graph_point_lines(axes_names)
+
+    def graph_point_lines(self, axes_names: set[str]):
+        """ model graph has nodes only for points on lines, points on axis under line and line ends, so points
+            on axis are neighbours on line under them and other points on axis are not kept in point lines """
+        axis_lines: defaultdict[str, list[tuple[int, int, str]]] = defaultdict(list)
+        ends_lines: dict[str, str] = {}
+        for name, ends in self.line_ends.items():
+            begin_x, end_x = self.point_abs_x[ends[0]], self.point_abs_x[ends[1]]
+            if (self.point_lines[ends[0]] in axes_names) and (self.point_lines[ends[0]] == self.point_lines[ends[1]]):
+                axis_lines[self.point_lines[ends[0]]].append((min(begin_x, end_x), max(begin_x, end_x), name))
+            for end in ends:
+                ends_lines.setdefault(end, name)
+        for name, group in list(self.point_lines.items()):
+            if group not in axes_names:
+                continue
+            under_lines = [line_name for min_x, max_x, line_name in axis_lines[group]
+                           if min_x <= self.point_abs_x[name] <= max_x]
+            if under_lines:
+                self.point_lines[name] = under_lines[0]
+            elif name in ends_lines:
+                self.point_lines[name] = ends_lines[name]
+            else:
+                del self.point_lines[name]
+
+    def merge_axis_lines(self, point_rows: OrderedDict[str, OrderedDict[str, str]], axes_names: set[str],
+                         lines_names: set[str], points_abs_x: dict[str, int]) -> dict[str, str]:
+        """ lines on one axis cannot touch in model, chain of lines joined by ends on axis is one line with name
+            of first line, names of other lines of chain are returned with name of the line they are merged to,
+            axes of lines are kept in line axes """
+        axis_lines: defaultdict[str, list[str]] = defaultdict(list)
+        for name in lines_names:
+            begin, end = self.line_ends[name]
+            if (point_rows[begin]["Line"] in axes_names) and (point_rows[begin]["Line"] == point_rows[end]["Line"]):
+                axis_lines[point_rows[begin]["Line"]].append(name)
+        line_renames: dict[str, str] = {}
+        for axis_name, names in axis_lines.items():
+            self.line_axes.update((name, axis_name) for name in names)
+            min_max_ends = {name: sorted(self.line_ends[name], key=points_abs_x.__getitem__) for name in names}
+            names.sort(key=lambda line_name: points_abs_x[min_max_ends[line_name][0]])
+            chain_name = names[0]
+            for name in names[1:]:
+                if min_max_ends[name][0] != min_max_ends[chain_name][1]:
+                    chain_name = name
+                    continue
+                line_renames[name] = chain_name
+                min_max_ends[chain_name][1] = min_max_ends[name][1]
+                self.line_ends[chain_name] = tuple(min_max_ends[chain_name])
+                del self.line_ends[name]
+        for name, chain_name in line_renames.items():
+            while chain_name in line_renames:
+                chain_name = line_renames[chain_name]
+            line_renames[name] = chain_name
+        return line_renames
+
+    def eval_neighbours(self):
+        """ previous and next point by coordinate on every axis and line, line ends are on the line too """
+        groups = list(self.point_lines.values())
+        names = list(self.point_lines.keys())
+        for line_name, ends in self.line_ends.items():
+            for end in ends:
+                if self.point_lines[end] != line_name:
+                    groups.append(line_name)
+                    names.append(end)
+        groups_indexes = {group: i for i, group in enumerate(OrderedDict.fromkeys(groups))}
+        group_ids = np.array([groups_indexes[group] for group in groups], dtype=np.int64)
+        abs_x = np.array([self.point_abs_x[name] for name in names], dtype=np.int64)
+        order = np.lexsort((abs_x, group_ids))
+        sorted_groups = group_ids[order]
+        for position, index in enumerate(order):
+            prev_name = names[order[position - 1]] \
+                if (position > 0) and (sorted_groups[position - 1] == sorted_groups[position]) else None
+            next_name = names[order[position + 1]] \
+                if (position + 1 < len(order)) and (sorted_groups[position + 1] == sorted_groups[position]) else None
+            self.neighbours[(groups[index], names[index])] = (prev_name, next_name)
+
+    def neighbour(self, group: str, point_name: str, direction: int) -> Optional[str]:
+        if (group, point_name) not in self.neighbours:
+            return None
+        return self.neighbours[(group, point_name)][0 if direction < 0 else 1]
+
+    def lights(self, objects: OrderedDict):
+        """ model has one light in point, first of lights placed in one point is taken """
+        objects["Light"] = []
+        center_points: set[str] = set()
+        for row in self.iter_table("lights"):
+            center_point = self.point_name(row["PlacePoint"])
+            if (row["Type"] not in SIGNAL_ROUTE_TYPES) or (center_point not in self.point_lines) or \
+                    (center_point in center_points):
+                continue
+            direction = -1 if row["Direction"] == "E_Direct.Minus" else 1
+            direct_point = self.neighbour(self.point_lines[center_point], center_point, direction)
+            if direct_point is None:
+                continue
+            colors = [SIGNAL_COLORS[color] for color in SIGNAL_COLOR_PATTERN.findall(row["Colors"])]
+            objects["Light"].append(OrderedDict([("name", row["Name"]),
+                                                 ("light_route_type", SIGNAL_ROUTE_TYPES[row["Type"]]),
+                                                 ("center_point", center_point), ("direct_point", direct_point),
+                                                 ("colors", " ".join(colors)), ("light_stick_type", "mast")]))
+            center_points.add(center_point)
+
+    def rail_points(self, objects: OrderedDict):
+        """ plus joint gives lines of straight way on both sides, minus joint differs from it on branch side """
+        joints: OrderedDict[str, dict[str, OrderedDict[str, str]]] = OrderedDict()
+        for row in self.iter_table("joints"):
+            joints.setdefault(self.point_name(row["PlacePoint"]), {})[row["Name"].rsplit("_", 1)[-1]] = row
+        objects["RailPoint"] = []
+        for center_point, point_joints in joints.items():
+            if ("plus" not in point_joints) or ("minus" not in point_joints) or (center_point not in self.point_lines):
+                continue
+            plus_joint, minus_joint = point_joints["plus"], point_joints["minus"]
+            if minus_joint["Line_Plus"] != plus_joint["Line_Plus"]:
+                side, straight_line, branch_line = 1, plus_joint["Line_Plus"], minus_joint["Line_Plus"]
+            elif minus_joint["Line_Minus"] != plus_joint["Line_Minus"]:
+                side, straight_line, branch_line = -1, plus_joint["Line_Minus"], minus_joint["Line_Minus"]
+            else:
+                continue
+            dir_plus_point = self.neighbour(self.line_renames.get(straight_line, straight_line), center_point, side)
+            dir_minus_point = self.neighbour(self.line_renames.get(branch_line, branch_line), center_point, side)
+            if (dir_plus_point is None) or (dir_minus_point is None):
+                continue
+            number = plus_joint["SymbolsList"].lstrip("-")
+            name = number if number.isdigit() else plus_joint["Name"].rsplit("_", 1)[0]
+            objects["RailPoint"].append(OrderedDict([("name", name), ("center_point", center_point),
+                                                     ("dir_plus_point", dir_plus_point),
+                                                     ("dir_minus_point", dir_minus_point)]))
+
+    def borders(self, objects: OrderedDict):
+        """ routes are ended in border by light in its point and light before it as in station config,
+            other borders are not taken """
+        objects["Border"] = []
+        light_direct_points = {obj_values["center_point"]: obj_values["direct_point"]
+                               for obj_values in objects["Light"]}
+        for name, segments in self.point_borders.items():
+            point = self.point_name(name)
+            if (light_direct_points.get(point) not in light_direct_points) or \
+                    not all(segment.startswith("GraphSegment") for segment in segments):
+                continue
+            objects["Border"].append(OrderedDict([("name", "Border_{}".format(name.replace("Point_", "", 1))),
+                                                  ("point", point),
+                                                  ("border_type", "standoff" if GROUND_SEGMENT in segments else "ab")]))
+
+    def sections(self, objects: OrderedDict):
+        """ fictive segment joins separate pieces of tracks, every piece from its border point to next border
+            point on line without common segment is taken as section """
+        segments_points: defaultdict[str, list[str]] = defaultdict(list)
+        points_segments: dict[str, set[str]] = {}
+        for name, segments in self.point_borders.items():
+            point = self.point_name(name)
+            if point not in self.point_lines:
+                continue
+            points_segments.setdefault(point, set()).update(segments)
+            for segment in segments:
+                if point not in segments_points[segment]:
+                    segments_points[segment].append(point)
+        objects["Section"] = []
+        for row in self.iter_table("isol_segments"):
+            border_points = segments_points.get(row["Name"], [])
+            if row["Type"] != FICTIVE_SEGMENT_TYPE:
+                sections_points = [border_points]
+            else:
+                sections_points = []
+                for point in border_points:
+                    for direction in (-1, 1):
+                        next_point = self.neighbour(self.point_lines[point], point, direction)
+                        while (next_point is not None) and (next_point not in points_segments):
+                            next_point = self.neighbour(self.point_lines[point], next_point, direction)
+                        if (next_point is None) or \
+                                (points_segments[point] & points_segments[next_point] - {row["Name"]}):
+                            continue
+                        if not any(set(points) == {point, next_point} for points in sections_points):
+                            sections_points.append([point, next_point])
+            for i, points in enumerate(sections_points):
+                if len(points) >= 2:
+                    name = row["Name"] if len(sections_points) == 1 else "{}_{}".format(row["Name"], i + 1)
+                    objects["Section"].append(OrderedDict([("name", name), ("border_points", " ".join(points))]))
+
+
+def import_jupiter_station(dir_name: str, jupiter_dir_name: str = JUPITER_FOLDER, extension: str = ".csv",
+                           max_workers: Optional[int] = None,
+                           axes_count: Optional[int] = None) -> OrderedDict[str, tuple[list[str], list[list[str]]]]:
+    """ jupiter station is written as station config folder """
+    cls_rows = JupiterStation(jupiter_dir_name, axes_count).station_config_rows()
+    write_station_config(dir_name, cls_rows, extension, max_workers)
+    return cls_rows
@@ -1,10 +1,15 @@
 from __future__ import annotations
-from typing import Optional, Callable
+from typing import Optional, Callable, Iterator
 from collections import OrderedDict
+from concurrent.futures import Future, ThreadPoolExecutor
+from contextlib import contextmanager
+from dataclasses import dataclass, field
+import time
 
-from model_builder import ModelBuilder
+from model_builder import ModelBuilder, ModelBuildError, BuildStageReport, stage_reports_summary, \
+    save_stage_reports_trace, first_stage_name
 from soi_dg_storage import SOIDependenceGraph, SOIStorage, DependenciesBuildError
-from files_operations import read_station_config
+from files_operations import read_station_config_values, station_config_files_stats, write_station_config
 from soi_objects import StationObjectImage, CoordinateSystemSOI, AxisSOI, PointSOI, LineSOI, LightSOI, \
     RailPointSOI, BorderSOI, SectionSOI, AttributeEvaluateError, IndexManagementCommand, StationObjectDescriptor
 from form_exception_message import form_message_from_error
@@ -66,6 +71,51 @@ def soi_to_obj_keys(soi_dict: DefaultOrderedDict[str, OrderedDict[str, StationOb
     return result
 
 
+def config_str_values(obj_values: OrderedDict[str, str], obj: StationObjectImage) -> OrderedDict[str, str]:
+    """ values of obj active attributes as they are given in file, list values are normalized as in loading """
+    result = OrderedDict()
+    for complex_attr in obj.active_complex_attrs:
+        temp_val = obj_values[complex_attr.name]
+        if complex_attr.is_list:
+            temp_val = " ".join([val.strip() for val in temp_val.split(" ") if val])
+        result[complex_attr.name] = temp_val
+    return result
+
+
+def object_str_values(obj: StationObjectImage) -> OrderedDict[str, str]:
+    """ last input values of obj active attributes, empty list elements are skipped """
+    result = OrderedDict()
+    for complex_attr in obj.active_complex_attrs:
+        result[complex_attr.name] = " ".join([single_attr.last_input_str_value
+                                              for single_attr in complex_attr.single_attr_list
+                                              if single_attr.last_input_str_value])
+    return result
+
+
+def station_config_rows(soi_objects: DefaultOrderedDict[str, OrderedDict[str, StationObjectImage]]) -> \
+        OrderedDict[str, tuple[list[str], list[list[str]]]]:
+    """ columns and rows of class files by class name, columns are descriptors in class order,
+        row values are last input values of attributes """
+    result = OrderedDict()
+    for cls in StationObjectImage.__subclasses__():
+        cls_name = cls.__name__.replace("SOI", "")
+        columns = list(cls.schema().attr_names)
+        rows = []
+        for obj in soi_objects[cls_name].values():
+            rows.append([" ".join([single_attr.last_input_str_value for single_attr in complex_attr.single_attr_list
+                                   if single_attr.last_input_str_value])
+                         for complex_attr in obj.object_prop_struct.attrib_list])
+        result[cls_name] = (columns, rows)
+    return result
+
+
+@dataclass
+class ConfigChanges:
+    added: list[ObjectKey] = field(default_factory=list)
+    removed: list[ObjectKey] = field(default_factory=list)
+    modified: list[ObjectKey] = field(default_factory=list)
+
+
 class MainHandler:
     """ director """
     def __init__(self):
@@ -76,21 +126,33 @@ class MainHandler:
         self.current_object_is_new = True
         self.safety_apply_mode = True
 
+        """ loaded config files state for reload """
+        self.config_dir_name: Optional[str] = None
+        self.config_files_stats: OrderedDict[str, tuple[str, int, int]] = OrderedDict()
+        self.dump_executor = ThreadPoolExecutor(max_workers=1)
+
+        """ timing of last command stages, optionally saved as chrome trace """
+        self.stage_reports: OrderedDict[str, BuildStageReport] = OrderedDict()
+        self.trace_file_name: Optional[str] = None
+
         """ external states """
         self.cls_objects_dict: OrderedDict = OrderedDict()
         self.current_object_attrib_dict: OrderedDict = OrderedDict()
         self.curr_obj_creation_readiness: bool = False
+        self.common_status: str = ""
 
         """ external changes flags """
         self.changed_cls_objects_dict: bool = False
         self.changed_current_object_attrib_dict: bool = False
         self.changed_creation_readiness: bool = False
+        self.changed_common_status: bool = False
 
     """ 
         Interface input commands:
     1. Menu commands
         1.1 'File' menu commands 
             - read_station_config
+            - reload_station_config
             - dump_station_config
         1.2 'Edit' menu commands
             - undo
@@ -113,32 +175,145 @@ class MainHandler:
 
     def read_station_config(self, dir_name: str):
         # self.safety_apply_mode = False
-        od_cls_objects = read_station_config(dir_name)
-        for cls_name in od_cls_objects:
-            # print("cls_name", cls_name)
-            for obj_name, file_obj in od_cls_objects[cls_name].items():
-                file_obj: StationObjectImage
-                # print("file_obj", file_obj)
-                self.create_new_object(cls_name)
-                real_obj = self.current_object
-                for complex_attr in real_obj.object_prop_struct.attrib_list:
-                    file_obj_complex_attr = file_obj.get_complex_attr_prop(complex_attr.name)
-                    # print("complex_attr", complex_attr)
-                    if complex_attr.active:
-                        attr_name = complex_attr.name
-                        # print("attr_name", attr_name)
-                        temp_val = file_obj_complex_attr.temporary_value
-                        if complex_attr.is_list:
-                            elem_str_values = [val.strip() for val in temp_val.split(" ") if val]
-                            for index, str_value in enumerate(elem_str_values):
-                                self.append_attrib_single_value(attr_name)
-                                self.change_attribute_value(attr_name, str_value, index)
-                        else:
-                            self.change_attribute_value(attr_name, temp_val)
+        self.stage_reports = OrderedDict()
+        with self.stage_report("config_read"):
+            files_stats = station_config_files_stats(dir_name)
+            config_values = read_station_config_values(dir_name, use_cache=True)
+        with self.stage_report("objects_load"):
+            for cls_name in config_values:
+                # print("cls_name", cls_name)
+                for obj_values in config_values[cls_name].values():
+                    self.load_file_object(cls_name, obj_values)
+        self.config_dir_name = dir_name
+        self.config_files_stats = files_stats
+        self.report_stages("Objects successfully loaded from file")
+
+    def reload_station_config(self) -> ConfigChanges:
+        """ only changed class files are read, their objects are compared with storage ones
+            and only added, removed and modified objects are applied """
+        changes = ConfigChanges()
+        if self.config_dir_name is None:
+            return changes
+        self.stage_reports = OrderedDict()
+        with self.stage_report("config_read"):
+            files_stats = station_config_files_stats(self.config_dir_name)
+            changed_cls_names = [cls_name for cls_name in files_stats
+                                 if files_stats[cls_name] != self.config_files_stats.get(cls_name)]
+            if changed_cls_names:
+                config_values = read_station_config_values(self.config_dir_name, use_cache=True,
+                                                           cls_names=changed_cls_names)
+        if not changed_cls_names:
+            self.report_stages("Station config not changed")
+            return changes
+        with self.stage_report("objects_apply"):
+            """ 1. Removed objects, dependent classes first """
+            for cls_name in reversed(changed_cls_names):
+                for obj_name in self.soi_storage.soi_objects_no_gcs[cls_name]:
+                    if obj_name not in config_values[cls_name]:
+                        self.recheck_attributes(self.remove_object(cls_name, obj_name))
+                        changes.removed.append(ObjectKey(cls_name, obj_name))
+
+            """ 2. Added and modified objects """
+            for cls_name in changed_cls_names:
+                storage_objects = self.soi_storage.soi_objects[cls_name]
+                for obj_name, obj_values in config_values[cls_name].items():
+                    if obj_name not in storage_objects:
+                        self.load_file_object(cls_name, obj_values)
+                        changes.added.append(ObjectKey(cls_name, obj_name))
+                    elif config_str_values(obj_values, storage_objects[obj_name]) != \
+                            object_str_values(storage_objects[obj_name]):
+                        self.replace_object_from_file(cls_name, obj_values)
+                        changes.modified.append(ObjectKey(cls_name, obj_name))
+
+            if changes.removed or changes.modified:
                 self.apply_creation_new_object()
+        """ files state is kept only after changes applied, failed reload is repeated next time """
+        self.config_files_stats = files_stats
+
+        """ 3. Model is built again from first stage of changed classes, skeleton is kept for equipment changes """
+        changed_obj_keys = changes.added + changes.removed + changes.modified
+        if self.safety_apply_mode and changed_obj_keys:
+            try:
+                self.build_model(first_stage_name(obj_key.cls_name for obj_key in changed_obj_keys))
+            except ModelBuildError as e:
+                """ objects and files state are kept, failed stage is built again by next reload """
+                self.report_stages(form_message_from_error(e))
+                return changes
+        self.report_stages("Station config reloaded")
+        return changes
+
+    def build_model(self, from_stage: Optional[str] = None):
+        """ all storage images are passed to model builder in dependence order,
+            with from_stage model of stages before it is kept """
+        with self.stage_report("rectify"):
+            obj_keys = self.dependence_graph.rectify_dg()
+            self.model_builder.init_soi_list([self.soi_storage.soi_objects[obj_key.cls_name][obj_key.obj_name]
+                                              for obj_key in obj_keys], from_stage)
+        try:
+            self.model_builder.build_model()
+        finally:
+            self.stage_reports.update(self.model_builder.stage_reports)
 
-    def dump_station_config(self, dir_name: str):
-        pass
+    @contextmanager
+    def stage_report(self, name: str) -> Iterator[BuildStageReport]:
+        report = BuildStageReport(name, start=time.perf_counter())
+        try:
+            yield report
+        finally:
+            report.duration = time.perf_counter() - report.start
+            self.stage_reports[name] = report
+
+    def report_stages(self, status: str):
+        """ stages timing of command is added to status and saved as trace if trace file is set """
+        self.common_status = "{} [{}]".format(status, stage_reports_summary(self.stage_reports.values()))
+        self.changed_common_status = True
+        if self.trace_file_name:
+            save_stage_reports_trace(self.stage_reports.values(), self.trace_file_name)
+
+    def load_file_object(self, cls_name: str, obj_values: OrderedDict[str, str]):
+        self.create_new_object(cls_name)
+        real_obj = self.current_object
+        for complex_attr in real_obj.object_prop_struct.attrib_list:
+            # print("complex_attr", complex_attr)
+            if complex_attr.active:
+                attr_name = complex_attr.name
+                # print("attr_name", attr_name)
+                temp_val = obj_values[attr_name]
+                if complex_attr.is_list:
+                    elem_str_values = [val.strip() for val in temp_val.split(" ") if val]
+                    for index, str_value in enumerate(elem_str_values):
+                        self.append_attrib_single_value(attr_name)
+                        self.change_attribute_value(attr_name, str_value, index)
+                else:
+                    self.change_attribute_value(attr_name, temp_val)
+        self.apply_creation_new_object()
+
+    def replace_object_from_file(self, cls_name: str, obj_values: OrderedDict[str, str]):
+        """ object is loaded again from file values, attributes referenced to it are rechecked after loading """
+        child_attr_keys = self.remove_object(cls_name, obj_values["name"])
+        self.load_file_object(cls_name, obj_values)
+        self.recheck_attributes(child_attr_keys)
+
+    def remove_object(self, cls_name: str, obj_name: str) -> list[AttributeKey]:
+        """ object is removed with its dependencies, returns keys of attributes referenced to it """
+        obj = self.soi_storage.remove_obj(cls_name, obj_name)
+        if obj is self.current_object:
+            self.current_object = None
+        return self.dependence_graph.remove_obj_node_dg(ObjectKey(cls_name, obj_name))
+
+    def recheck_attributes(self, attr_keys: list[AttributeKey]):
+        for attr_key in attr_keys:
+            if attr_key.obj_name not in self.soi_storage.soi_objects[attr_key.cls_name]:
+                continue
+            obj = self.soi_storage.soi_objects[attr_key.cls_name][attr_key.obj_name]
+            single_attr = obj.get_single_attr_prop(attr_key.attr_name, attr_key.index)
+            self.common_attrib_check(attr_key.cls_name, attr_key.obj_name, attr_key.attr_name,
+                                     single_attr.last_input_str_value, attr_key.index, True)
+
+    def dump_station_config(self, dir_name: str, extension: str = ".xlsx") -> Future:
+        """ rows are formed at once, class files are written in background not to block interface """
+        cls_rows = station_config_rows(self.soi_storage.soi_objects_no_gcs)
+        return self.dump_executor.submit(write_station_config, dir_name, cls_rows, extension)
 
     def undo(self):
         pass
@@ -147,7 +322,10 @@ class MainHandler:
         pass
 
     def eval_routes(self, dir_name: str):
+        self.stage_reports = OrderedDict()
         self.model_builder.eval_routes(dir_name)
+        self.stage_reports.update(self.model_builder.routes_stage_reports)
+        self.report_stages("Routes evaluated")
 
     def create_new_object(self, cls_name: str):
         self.current_object: StationObjectImage = eval(cls_name+"SOI")()
@@ -159,10 +337,11 @@ class MainHandler:
 
     def change_current_object(self, cls_name: str, obj_name: str):
         curr_obj = self.current_object
-        for complex_attr in curr_obj.active_complex_attrs:
-            for single_attr in complex_attr.single_attr_list:
-                single_attr.interface_str_value = single_attr.last_confirmed_str_value
-        self.current_object = self.dependence_graph.soi_objects[cls_name][obj_name]
+        if curr_obj is not None:
+            for complex_attr in curr_obj.active_complex_attrs:
+                for single_attr in complex_attr.single_attr_list:
+                    single_attr.interface_str_value = single_attr.last_confirmed_str_value
+        self.current_object = self.soi_storage.soi_objects[cls_name][obj_name]
         self.current_object_is_new = False
 
     def delete_request(self, cls_name: str, obj_name: str):
@@ -1,10 +1,59 @@
 from __future__ import annotations
-from typing import Optional
+from typing import Optional, Iterable
+from bisect import bisect_left, bisect_right
 
 from graphical_object import Point2D, Line2D, BoundedCurve
 from enums_images import CELightRouteType, CELightColor, CELightStickType, CEBorderType, CESectionType
 
 
+class SortedPoints:
+    """ points always sorted by x, bisect-based insertion and neighbour lookup """
+    def __init__(self, points: Iterable[PointMO] = None):
+        self._xs: list[float] = []
+        self._points: list[PointMO] = []
+        if points:
+            for point in points:
+                self.add(point)
+
+    def __len__(self):
+        return len(self._points)
+
+    def __iter__(self):
+        return iter(self._points)
+
+    def __reversed__(self):
+        return reversed(self._points)
+
+    def __getitem__(self, item):
+        return self._points[item]
+
+    def add(self, point: PointMO):
+        i = bisect_right(self._xs, point.x)
+        self._xs.insert(i, point.x)
+        self._points.insert(i, point)
+
+    def index(self, point: PointMO) -> int:
+        """ index of given point object (not equal by x) """
+        i = bisect_left(self._xs, point.x)
+        while (i < len(self._xs)) and (self._xs[i] == point.x):
+            if self._points[i] is point:
+                return i
+            i += 1
+        raise ValueError("Point {} not found".format(point))
+
+    def neighbours(self, x: float) -> tuple[Optional[PointMO], Optional[PointMO]]:
+        """ nearest points with x strictly less and strictly greater than given """
+        i_left = bisect_left(self._xs, x)
+        i_right = bisect_right(self._xs, x)
+        prev_point = self._points[i_left - 1] if i_left > 0 else None
+        next_point = self._points[i_right] if i_right < len(self._points) else None
+        return prev_point, next_point
+
+    def between(self, point_1: PointMO, point_2: PointMO) -> list[PointMO]:
+        """ points from point_1 to point_2 including both """
+        return self._points[self.index(point_1):self.index(point_2) + 1]
+
+
 class ModelObject:
     def __init__(self):
         self.name: str = ""
@@ -65,18 +114,22 @@ class AxisMO(ModelObject):
     def __init__(self, line2D: Line2D):
         super().__init__()
         self.line2D = line2D
-        self._points: list[PointMO] = []
+        self._points = SortedPoints()
         self._lines: list[LineMO] = []
 
     def append_point(self, point: PointMO):
-        self._points.append(point)
+        self._points.add(point)
 
     def append_line(self, line: LineMO):
         self._lines.append(line)
 
     @property
-    def points(self):
-        return sorted(self._points, key=lambda s: s.x)
+    def points(self) -> list[PointMO]:
+        """ sorted copy, points are added only by append_point """
+        return list(self._points)
+
+    def points_between(self, point_1: PointMO, point_2: PointMO) -> list[PointMO]:
+        return self._points.between(point_1, point_2)
 
     @property
     def lines(self):
@@ -105,27 +158,29 @@ class LineMO(ModelObject):
     def __init__(self, boundedCurves: list[BoundedCurve], points: list[PointMO] = None):
         super().__init__()
         self.boundedCurves = boundedCurves
-        self._points: list[PointMO] = []
+        self._points = SortedPoints(points)
         self._axis = None
-        if points:
-            self._points = points
 
     def append_point(self, point: PointMO):
-        self._points.append(point)
+        self._points.add(point)
 
     @property
-    def points(self):
-        return sorted(self._points, key=lambda s: s.x)
+    def points(self) -> list[PointMO]:
+        """ sorted copy, points are added only by append_point """
+        return list(self._points)
+
+    def neighbour_points(self, x: float) -> tuple[Optional[PointMO], Optional[PointMO]]:
+        return self._points.neighbours(x)
 
     @property
     def min_point(self):
-        assert len(self.points) >= 2, "Count of points <2"
-        return self.points[0]
+        assert len(self._points) >= 2, "Count of points <2"
+        return self._points[0]
 
     @property
     def max_point(self):
-        assert len(self.points) >= 2, "Count of points <2"
-        return self.points[-1]
+        assert len(self._points) >= 2, "Count of points <2"
+        return self._points[-1]
 
     @property
     def axis(self) -> AxisMO:
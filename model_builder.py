@@ -1,23 +1,39 @@
 from __future__ import annotations
 from collections import OrderedDict
+from dataclasses import dataclass, asdict, fields, replace
+from typing import Type, Callable, Union, Optional, Iterable, Iterator
+from concurrent.futures import ProcessPoolExecutor
+from itertools import chain
+import csv
+import hashlib
+import json
 import math
+import os
+import time
+
+import numpy as np
 
 from enums_images import CEAxisCreationMethod, CEAxisOrLine, CELightRouteType, CEBorderType, CESectionType
 from soi_objects import StationObjectImage, CoordinateSystemSOI, AxisSOI, PointSOI, LineSOI, \
     LightSOI, RailPointSOI, BorderSOI, SectionSOI
-from two_sided_graph import OneComponentTwoSidedPG, PolarNode, Route, NodeInterface
+from two_sided_graph import OneComponentTwoSidedPG, PolarNode, Route, NodeInterface, Move, Link, PicklableGraphCopy, \
+    ElementKey
 from cell_object import CellObject
 from graphical_object import Point2D, Angle, Line2D, BoundedCurve, lines_intersection, evaluate_vector, \
-    ParallelLinesException, EquivalentLinesException, PointsEqualException, OutBorderException
+    LinesAngleIndex, EquivalentLinesException, PointsEqualException, OutBorderException, bezier_params_by_x, \
+    bezier_arc_lengths
 from cell_access_functions import NotFoundCellError, element_cell_by_type, all_cells_of_type, find_cell_name
-from rail_route import RailRoute
-from xml_formation import form_rail_routes_xml
+from rail_route import RailRouteRecord, route_record_values, route_record_from_values
+from xml_formation import write_rail_routes_xml
+from route_cache import RouteCache
+from route_table_formation import tee_route_tables
 from mo_objects import ModelObject, CoordinateSystemMO, AxisMO, PointMO, LineMO, LightMO, RailPointMO, BorderMO, \
     SectionMO
 from default_ordered_dict import DefaultOrderedDict
 from attribute_object_key import AttributeKey
 
 from config_names import GLOBAL_CS_NAME
+from nv_config import COORD_EQUAL_PRECISION
 
 
 class ModelBuildError(Exception):
@@ -32,6 +48,13 @@ class MBEquipmentError(ModelBuildError):
     pass
 
 
+class MBEquipmentErrors(MBEquipmentError):
+    """ all equipment errors of one stage, args are joined messages and list of attribute keys """
+    def __init__(self, errors: list[MBEquipmentError]):
+        self.errors = errors
+        super().__init__("; ".join(e.args[0] for e in errors), [e.args[1] for e in errors])
+
+
 class PointCell(CellObject):
     def __init__(self, name: str):
         self.name = name
@@ -72,30 +95,336 @@ class RailPointDirectionCell(CellObject):
         self.direction = direction
 
 
+@dataclass
+class BuildStage:
+    name: str
+    method_name: str
+    soi_classes: tuple[Type[StationObjectImage], ...] = ()
+    depends_on: tuple[str, ...] = ()
+    cell_types: tuple[Type[CellObject], ...] = ()
+
+
+@dataclass
+class BuildStageReport:
+    name: str
+    duration: float = 0.
+    images_count: int = 0
+    objects_count: int = 0
+    start: float = 0.
+
+
+def stage_reports_summary(stage_reports: Iterable[BuildStageReport]) -> str:
+    return ", ".join("{} {:.1f} ms".format(report.name, report.duration * 1e3) for report in stage_reports)
+
+
+def save_stage_reports_trace(stage_reports: Iterable[BuildStageReport], file_full_name: str):
+    """ trace-event json for chrome://tracing and perfetto, complete events in microseconds """
+    stage_reports = sorted(stage_reports, key=lambda report: report.start)
+    origin = stage_reports[0].start if stage_reports else 0.
+    events = [{"name": report.name, "cat": "stage", "ph": "X",
+               "ts": (report.start - origin) * 1e6, "dur": report.duration * 1e6, "pid": os.getpid(), "tid": 0,
+               "args": {"images_count": report.images_count, "objects_count": report.objects_count}}
+              for report in stage_reports]
+    with open(file_full_name, 'w', encoding='utf-8') as out_file:
+        json.dump({"traceEvents": events, "displayTimeUnit": "ms"}, out_file, indent=1)
+
+
+def timed_items(items: Iterable, report: BuildStageReport) -> Iterator:
+    """ only time of producing items is added to report duration, time spent by consumer is not counted """
+    iterator = iter(items)
+    while True:
+        start_time = time.perf_counter()
+        try:
+            item = next(iterator)
+        except StopIteration:
+            report.duration += time.perf_counter() - start_time
+            return
+        report.duration += time.perf_counter() - start_time
+        report.objects_count += 1
+        yield item
+
+
+@dataclass
+class LightRoutesProfile:
+    light_name: str
+    walk_time: float = 0.
+    raw_paths_count: int = 0
+    train_slices_count: int = 0
+    shunting_slices_count: int = 0
+    duplicates_count: int = 0
+    max_path_depth: int = 0
+    cached: bool = False
+
+
+# stages are executed in given order, each stage consumes only images of its soi_classes,
+# when stage is built again its model objects and graph cells of cell_types are removed first
+BUILD_PIPELINE: list[BuildStage] = [
+    BuildStage("skeleton", "build_skeleton", (CoordinateSystemSOI, AxisSOI, PointSOI, LineSOI)),
+    BuildStage("link_length", "eval_link_length", (), ("skeleton",), (LengthCell,)),
+    BuildStage("lights", "build_lights", (LightSOI,), ("skeleton",), (LightCell,)),
+    BuildStage("rail_points", "build_rail_points", (RailPointSOI,), ("skeleton",),
+               (RailPointCell, RailPointDirectionCell)),
+    BuildStage("borders", "build_borders", (BorderSOI,), ("skeleton",), (BorderCell,)),
+    BuildStage("sections", "build_sections", (SectionSOI,), ("lights", "rail_points"), (IsolatedSectionCell,)),
+]
+
+
+def check_pipeline_order(pipeline: list[BuildStage]):
+    """ every stage depends only on stages executed before it """
+    built_stage_names: set[str] = set()
+    for stage in pipeline:
+        assert set(stage.depends_on) <= built_stage_names, \
+            "Stage {} depends on stages not built before it".format(stage.name)
+        built_stage_names.add(stage.name)
+
+
+check_pipeline_order(BUILD_PIPELINE)
+
+
+def first_stage_name(cls_names: Iterable[str]) -> str:
+    """ first pipeline stage consuming images of given classes, model is built again from this stage """
+    cls_names = set(cls_names)
+    for stage in BUILD_PIPELINE:
+        if any(cls.__name__.replace("SOI", "") in cls_names for cls in stage.soi_classes):
+            return stage.name
+    return BUILD_PIPELINE[0].name
+
+
+def graph_point_nodes(smg: OneComponentTwoSidedPG) -> dict[str, PolarNode]:
+    """ point name -> node, found once instead of search of point cell for every point """
+    return {cell.name: node for cell, node in all_cells_of_type(smg.not_inf_nodes, PointCell).items()}
+
+
+def check_light(smg: OneComponentTwoSidedPG, point_nodes: dict[str, PolarNode], cls_name: str, obj_name: str,
+                center_point_name: str, direct_point_name: str) -> tuple[PolarNode, str]:
+    if center_point_name == direct_point_name:
+        raise MBEquipmentError("Direction point is equal to central point",
+                               AttributeKey(cls_name, obj_name, "direct_point"))
+
+    # check direction
+    center_point_node = point_nodes[center_point_name]
+    direct_point_node = point_nodes[direct_point_name]
+    routes, ni_found = smg.routes_node_to_node(center_point_node, direct_point_node)
+    if not routes:
+        raise MBEquipmentError("Route from central point to direction point not found",
+                               AttributeKey(cls_name, obj_name, "direct_point"))
+    return center_point_node, ni_found.end_str
+
+
+def check_rail_point(smg: OneComponentTwoSidedPG, point_nodes: dict[str, PolarNode], cls_name: str, obj_name: str,
+                     center_point_name: str, plus_point_name: str, minus_point_name: str) -> \
+        tuple[PolarNode, NodeInterface, Move, Move]:
+    # check direction
+    center_point_node = point_nodes[center_point_name]
+    plus_point_node = point_nodes[plus_point_name]
+    minus_point_node = point_nodes[minus_point_name]
+    plus_routes, ni_plus = smg.routes_node_to_node(center_point_node, plus_point_node)
+    minus_routes, ni_minus = smg.routes_node_to_node(center_point_node, minus_point_node)
+    if not plus_routes:
+        raise MBEquipmentError("Route from central point to '+' point not found",
+                               AttributeKey(cls_name, obj_name, "dir_plus_point"))
+    if not minus_routes:
+        raise MBEquipmentError("Route from central point to '-' point not found",
+                               AttributeKey(cls_name, obj_name, "dir_minus_point"))
+    for plus_route in plus_routes:
+        for minus_route in minus_routes:
+            if plus_route.partially_overlaps(minus_route):
+                raise MBEquipmentError("Cannot understand '+' and '-' directions because their overlaps",
+                                       AttributeKey(cls_name, obj_name, "dir_minus_point"))
+    if not (ni_plus is ni_minus):
+        raise MBEquipmentError("Defined '+' or '-' direction is equal to 0-direction",
+                               AttributeKey(cls_name, obj_name, "dir_minus_point"))
+
+    # + and - moves
+    plus_move = ni_plus.get_move_by_link(plus_routes[0].links[0])
+    minus_move = ni_minus.get_move_by_link(minus_routes[0].links[0])
+    return center_point_node, ni_plus, plus_move, minus_move
+
+
+def safe_equipment_check(check_function: Callable, smg: OneComponentTwoSidedPG, point_nodes: dict[str, PolarNode],
+                         args: tuple) -> Union[tuple, MBEquipmentError]:
+    try:
+        return check_function(smg, point_nodes, *args)
+    except MBEquipmentError as e:
+        return e
+
+
+def equipment_checks_in_process(check_function: Callable, graph_copy: PicklableGraphCopy, args_list: list[tuple]) \
+        -> list[Union[tuple, MBEquipmentError]]:
+    """ checks over unpickled graph copy, graph elements of results are returned by element keys """
+    point_nodes = graph_point_nodes(graph_copy.graph)
+    results = []
+    for args in args_list:
+        result = safe_equipment_check(check_function, graph_copy.graph, point_nodes, args)
+        if not isinstance(result, MBEquipmentError):
+            result = tuple(graph_copy.element_key(item) if isinstance(item, (PolarNode, NodeInterface, Move))
+                           else item for item in result)
+        results.append(result)
+    return results
+
+
+class RouteLookupTables:
+    """ flat equipment tables for route slicing, built once before routes evaluation """
+    def __init__(self):
+        self.light_nodes: OrderedDict[str, PolarNode] = OrderedDict()
+        self.light_by_node: dict[PolarNode, LightMO] = {}
+        self.facing_light_by_ni: dict[NodeInterface, LightMO] = {}
+        self.border_by_node: dict[PolarNode, BorderMO] = {}
+        self.direction_by_move: dict[Move, str] = {}
+        self.section_by_link: dict[Link, SectionMO] = {}
+        self.node_names: dict[PolarNode, str] = {}
+
+    def node_descriptor(self, node: PolarNode) -> str:
+        light = self.light_by_node.get(node)
+        border = self.border_by_node.get(node)
+        return repr((self.node_names[node],
+                     (light.name, light.route_type, light.end_forward_tpl1) if light else None,
+                     (border.name, border.border_type) if border else None))
+
+    def link_descriptor(self, link: Link) -> str:
+        ni_s = sorted((self.node_names[ni.pn], ni.end_str, self.direction_by_move.get(ni.get_move_by_link(link), ""))
+                      for ni in link.ni_s)
+        section = self.section_by_link.get(link)
+        return repr((ni_s, (section.name, str(section.section_type)) if section else None))
+
+    def fingerprint(self, nodes: Iterable[PolarNode], links: Iterable[Link], *extra: str) -> str:
+        descriptors = sorted(map(self.node_descriptor, nodes)) + sorted(map(self.link_descriptor, links))
+        return hashlib.sha1("\n".join([*extra, *descriptors]).encode("utf-8")).hexdigest()
+
+    def station_fingerprint(self) -> str:
+        nodes = set(self.node_names)
+        links = {link for node in nodes for ni in node.ni_s for link in ni.links}
+        return self.fingerprint(nodes, links, " ".join(self.light_nodes))
+
+    def light_fingerprint(self, light_node: PolarNode) -> str:
+        """ fingerprint of region reachable from light in its forward direction """
+        light = self.light_by_node[light_node]
+        start_ni = light_node.ni_by_end(light.end_forward_tpl1)
+        nodes: set[PolarNode] = {light_node}
+        links: set[Link] = set()
+        out_ni_s: list[NodeInterface] = [start_ni]
+        visited_ni_s: set[NodeInterface] = {start_ni}
+        while out_ni_s:
+            out_ni = out_ni_s.pop()
+            for link in out_ni.links:
+                links.add(link)
+                enter_ni = link.opposite_ni(out_ni)
+                nodes.add(enter_ni.pn)
+                next_out_ni = enter_ni.pn.opposite_ni(enter_ni)
+                if next_out_ni not in visited_ni_s:
+                    visited_ni_s.add(next_out_ni)
+                    out_ni_s.append(next_out_ni)
+        return self.fingerprint(nodes, links, light.name, start_ni.end_str)
+
+    def trace_point_directions(self, route: Route) -> list[str]:
+        result = []
+        for link in route.links:
+            for ni in link.ni_s:
+                move_ = ni.get_move_by_link(link)
+                if move_ in self.direction_by_move:
+                    result.append(self.direction_by_move[move_])
+        return result
+
+
 class ModelBuilder:
     def __init__(self):
         # gcs init
         self.mo_gcs = CoordinateSystemMO()
         self.mo_gcs.name = GLOBAL_CS_NAME
 
-        self.reset_storages()
+        # equipment checks are read-only graph queries, they can be run in processes over graph copy
+        self.parallel_equipment_check = False
+        self.max_workers: Optional[int] = None
+
+        # link length is x projection by default, true length along line curves if set
+        self.arc_link_length = False
+
+        # evaluated routes are kept between model rebuilds, None - without cache
+        self.route_cache: Optional[RouteCache] = RouteCache()
+
+        # unchanged signals are copied from previous route xml by signals index files
+        self.incremental_xml_export = False
+
+        # route tables written near route xml from the same routes stream (.jsonl or binary)
+        self.route_table_file_names: list[str] = []
+
+        # per light walk profile is written near route xml when file name (.csv or .json) is set
+        self.routes_profile_file_name: Optional[str] = None
+        self.routes_profiles: list[LightRoutesProfile] = []
+
+        # timing of last routes export, route evaluation and writing are interleaved by lights
+        self.routes_stage_reports: OrderedDict[str, BuildStageReport] = OrderedDict()
 
-    def init_soi_list(self, images: list[StationObjectImage]):
         self.reset_storages()
+
+    def init_soi_list(self, images: list[StationObjectImage], from_stage: Optional[str] = None):
+        """ with from_stage model of built stages before it is kept, other stages are built again """
+        kept_stages_count = 0
+        if from_stage is not None:
+            stage_names = [stage.name for stage in BUILD_PIPELINE]
+            kept_stages_count = min(stage_names.index(from_stage), self.built_stages_count)
+        if kept_stages_count:
+            self.clear_stages(BUILD_PIPELINE[kept_stages_count:])
+            self.built_stages_count = kept_stages_count
+            self.stage_images = OrderedDict((stage.name, []) for stage in BUILD_PIPELINE)
+            self.stage_reports = OrderedDict()
+        else:
+            self.reset_storages()
         self.images = images
+        self.partition_images()
 
     def reset_storages(self):
         self.images: list[StationObjectImage] = []
+        self.stage_images: OrderedDict[str, list[StationObjectImage]] = \
+            OrderedDict((stage.name, []) for stage in BUILD_PIPELINE)
+        self.stage_reports: OrderedDict[str, BuildStageReport] = OrderedDict()
+        self.built_stages_count = 0
         self.names_mo: DefaultOrderedDict[str, OrderedDict[str, ModelObject]] = DefaultOrderedDict(OrderedDict)
         self.names_mo["CoordinateSystem"][GLOBAL_CS_NAME] = self.mo_gcs
         self.smg = OneComponentTwoSidedPG()
+        self.axes_index = LinesAngleIndex()
+
+    def clear_stages(self, stages: list[BuildStage]):
+        """ model objects and graph cells of stages are removed, skeleton graph is kept """
+        cell_types = tuple(cell_type for stage in stages for cell_type in stage.cell_types)
+        for stage in stages:
+            for cls in stage.soi_classes:
+                self.names_mo.pop(cls.__name__.replace("SOI", ""), None)
+        nodes = self.smg.nodes
+        moves = {move for node in nodes for ni in node.ni_s for move in ni.moves}
+        for element in chain(nodes, self.smg.links, moves):
+            if any(isinstance(cell, cell_types) for cell in element.cell_objs):
+                element.cell_objs = [cell for cell in element.cell_objs if not isinstance(cell, cell_types)]
+
+    def partition_images(self):
+        """ one pass over images, order of images inside every stage is kept """
+        stage_by_cls: dict[Type[StationObjectImage], str] = {cls: stage.name for stage in BUILD_PIPELINE
+                                                             for cls in stage.soi_classes}
+        for image in self.images:
+            stage_name = stage_by_cls.get(image.__class__)
+            if stage_name:
+                self.stage_images[stage_name].append(image)
+
+    def build_model(self):
+        """ stages are built from first not built one, failed stage is built again next time """
+        objects_count_before = sum(len(cls_mo) for cls_mo in self.names_mo.values())
+        for stage in BUILD_PIPELINE[self.built_stages_count:]:
+            start_time = time.perf_counter()
+            getattr(self, stage.method_name)()
+            objects_count_after = sum(len(cls_mo) for cls_mo in self.names_mo.values())
+            self.stage_reports[stage.name] = BuildStageReport(stage.name, time.perf_counter() - start_time,
+                                                              len(self.stage_images[stage.name]),
+                                                              objects_count_after - objects_count_before,
+                                                              start_time)
+            self.built_stages_count += 1
+            objects_count_before = objects_count_after
 
     def rebuild_images(self, names: list[tuple[str, str]]):
         pass
 
     def build_skeleton(self):
 
-        for image in self.images:
+        for image in self.stage_images["skeleton"]:
             # print("build", image)
             # print(type(image))
             image_name = image.name
@@ -138,20 +467,17 @@ class ModelBuilder:
                 model_object = AxisMO(line2D)
                 model_object.name = image_name
 
-                for model_object_2 in self.names_mo["Axis"].values():
-                    model_object_2: AxisMO
-                    try:
-                        lines_intersection(model_object.line2D, model_object_2.line2D)
-                    except ParallelLinesException:
-                        continue
-                    except EquivalentLinesException:
-                        raise MBSkeletonError("Cannot re-build existing axis",
-                                              AttributeKey(cls_name, obj_name, ""))
+                try:
+                    self.axes_index.check_new_line(model_object.line2D)
+                except EquivalentLinesException:
+                    raise MBSkeletonError("Cannot re-build existing axis",
+                                          AttributeKey(cls_name, obj_name, ""))
 
                 if image.creation_method == "rotational":
                     center_point_soi: PointSOI = image.center_point
                     model_object.append_point(center_point_soi)
                 self.names_mo["Axis"][image_name] = model_object
+                self.axes_index.append_line(model_object.line2D)
 
             if isinstance(image, PointSOI):
                 cs_rel: CoordinateSystemMO = self.names_mo["CoordinateSystem"][image.cs_relative_to.name]
@@ -230,14 +556,8 @@ class ModelBuilder:
                 self.names_mo["Line"][image_name] = model_object
 
     def point_to_line_handling(self, point: PointMO, line: LineMO):
-        old_points = line.points
-        prev_point, next_point = None, None
-        place_found = False
-        for i_ in range(len(old_points)-1):
-            if old_points[i_].x < point.x < old_points[i_+1].x:
-                place_found = True
-                prev_point, next_point = old_points[i_], old_points[i_+1]
-        assert place_found, "point before inserting not found"
+        prev_point, next_point = line.neighbour_points(point.x)
+        assert prev_point, "point before inserting not found"
         assert next_point, "end of point list"
 
         prev_node: PolarNode = find_cell_name(self.smg.not_inf_nodes, PointCell, prev_point.name)[1]
@@ -277,14 +597,13 @@ class ModelBuilder:
 
     def line_to_axis_handling(self, line: LineMO, axis: AxisMO):
         old_lines = axis.lines
-        axis_points = axis.points
         for old_line in old_lines:
             if (line.min_point.x > old_line.max_point.x) or (old_line.min_point.x > line.max_point.x):
                 continue
             else:
                 raise MBSkeletonError("Lines intersection on axis found",
                                       AttributeKey("Line", old_line.name, "points"))
-        on_line_points = axis_points[axis_points.index(line.min_point):axis_points.index(line.max_point)+1]
+        on_line_points = axis.points_between(line.min_point, line.max_point)
         last_nd_interface = self.smg.inf_pu.ni_nd
         for line_point in reversed(on_line_points):
             try:
@@ -299,415 +618,536 @@ class ModelBuilder:
         line.axis = axis
 
     def eval_link_length(self):
-        for link in self.smg.not_inf_links:
-            pn_s_ = [ni.pn for ni in link.ni_s]
-            pnt_cells_: list[PointCell] = [element_cell_by_type(pn, PointCell) for pn in pn_s_]
-            link.append_cell_obj(LengthCell(abs(self.names_mo["Point"][pnt_cells_[0].name].x -
-                                                self.names_mo["Point"][pnt_cells_[1].name].x)))
+        """ lengths of all links are evaluated at once by point coordinates arrays """
+        links = self.smg.not_inf_links
+        if not links:
+            return
+        point_names = [[element_cell_by_type(ni.pn, PointCell).name for ni in link.ni_s] for link in links]
+        if self.arc_link_length:
+            lengths = self.links_arc_lengths(point_names)
+        else:
+            point_index = {point_name: i for i, point_name in enumerate(self.names_mo["Point"])}
+            xs = np.array([point.x for point in self.names_mo["Point"].values()], dtype=float)
+            ends = np.array([[point_index[name_1], point_index[name_2]] for name_1, name_2 in point_names])
+            lengths = np.abs(xs[ends[:, 0]] - xs[ends[:, 1]])
+        for link, length in zip(links, lengths):
+            link.append_cell_obj(LengthCell(float(length)))
+
+    def links_arc_lengths(self, point_names: list[list[str]]) -> np.ndarray:
+        """ link is a piece of line between neighbour points, its bounded curves are integrated all at once """
+        line_by_points: dict[frozenset[str], LineMO] = {}
+        for line in self.names_mo["Line"].values():
+            line_points = line.points
+            for point_1, point_2 in zip(line_points, line_points[1:]):
+                line_by_points[frozenset((point_1.name, point_2.name))] = line
+
+        curves_coords: dict[int, tuple[tuple[float, float], ...]] = {}
+        ends_coords = []
+        piece_link_indexes, piece_coords, piece_x_begin, piece_x_end = [], [], [], []
+        for i, (name_1, name_2) in enumerate(point_names):
+            point_1: PointMO = self.names_mo["Point"][name_1]
+            point_2: PointMO = self.names_mo["Point"][name_2]
+            ends_coords.append(point_1.point2D.coords + point_2.point2D.coords)
+            line = line_by_points.get(frozenset((name_1, name_2)))
+            if not line:
+                continue
+            link_x_min, link_x_max = min(point_1.x, point_2.x), max(point_1.x, point_2.x)
+            for curve in line.boundedCurves:
+                if id(curve) not in curves_coords:
+                    curves_coords[id(curve)] = (curve.pnt_1.coords, curve.pnt_2.coords,
+                                                curve.quadratic_control_point.coords)
+                x_begin = max(link_x_min, min(curve.pnt_1.x, curve.pnt_2.x))
+                x_end = min(link_x_max, max(curve.pnt_1.x, curve.pnt_2.x))
+                if x_end - x_begin > COORD_EQUAL_PRECISION:
+                    piece_link_indexes.append(i)
+                    piece_coords.append(curves_coords[id(curve)])
+                    piece_x_begin.append(x_begin)
+                    piece_x_end.append(x_end)
+
+        # links out of lines are straight
+        ends_coords = np.array(ends_coords, dtype=float)
+        lengths = np.hypot(ends_coords[:, 0] - ends_coords[:, 2], ends_coords[:, 1] - ends_coords[:, 3])
+        if not piece_link_indexes:
+            return lengths
+
+        piece_link_indexes = np.array(piece_link_indexes)
+        piece_coords = np.array(piece_coords, dtype=float)
+        pnts_1, pnts_2, pnts_control = piece_coords[:, 0], piece_coords[:, 1], piece_coords[:, 2]
+        t_begin = bezier_params_by_x(pnts_1[:, 0], pnts_2[:, 0], pnts_control[:, 0], np.array(piece_x_begin))
+        t_end = bezier_params_by_x(pnts_1[:, 0], pnts_2[:, 0], pnts_control[:, 0], np.array(piece_x_end))
+        piece_lengths = bezier_arc_lengths(pnts_1, pnts_2, pnts_control, t_begin, t_end)
+        lengths[piece_link_indexes] = 0.
+        np.add.at(lengths, piece_link_indexes, piece_lengths)
+        return lengths
+
+    def point_nodes_snapshot(self) -> dict[str, PolarNode]:
+        return graph_point_nodes(self.smg)
+
+    def run_equipment_checks(self, check_function: Callable, args_list: list[tuple]) -> \
+            list[Union[tuple, MBEquipmentError]]:
+        """ results and errors are returned in args order also in parallel mode: args are split in chunks for
+            processes, every process checks its chunk over picklable graph copy, graph elements of results
+            are restored by element keys """
+        if not (self.parallel_equipment_check and (len(args_list) > 1)):
+            point_nodes = self.point_nodes_snapshot()
+            return [safe_equipment_check(check_function, self.smg, point_nodes, args) for args in args_list]
+        graph_copy = PicklableGraphCopy(self.smg)
+        workers_count = self.max_workers or os.cpu_count() or 1
+        chunk_size = math.ceil(len(args_list) / workers_count)
+        with ProcessPoolExecutor(max_workers=self.max_workers) as executor:
+            futures = [executor.submit(equipment_checks_in_process, check_function, graph_copy,
+                                       args_list[i:i + chunk_size]) for i in range(0, len(args_list), chunk_size)]
+            keys_results = [result for future in futures for result in future.result()]
+        return [result if isinstance(result, MBEquipmentError) else
+                tuple(graph_copy.element(item) if isinstance(item, ElementKey) else item for item in result)
+                for result in keys_results]
 
     def build_lights(self):
-
-        for image in self.images:
+        images = self.stage_images["lights"]
+        errors: list[MBEquipmentError] = []
+
+        args_list = [(image.__class__.__name__, image.name, image.center_point.name, image.direct_point.name)
+                     for image in images]
+        for image, check_result in zip(images, self.run_equipment_checks(check_light, args_list)):
+            image: LightSOI
+            if isinstance(check_result, MBEquipmentError):
+                errors.append(check_result)
+                continue
             image_name = image.name
-            cls_name = image.__class__.__name__
-            obj_name = image_name
-
-            if isinstance(image, LightSOI):
-                center_point: PointMO = self.names_mo["Point"][image.center_point.name]
-                direct_point: PointMO = self.names_mo["Point"][image.direct_point.name]
-
-                if center_point is direct_point:
-                    raise MBEquipmentError("Direction point is equal to central point",
-                                           AttributeKey(cls_name, obj_name, "direct_point"))
+            center_point_node, end_forward_str = check_result
 
-                # check direction
-                center_point_node: PolarNode = find_cell_name(self.smg.not_inf_nodes, PointCell, center_point.name)[1]
-                direct_point_node = find_cell_name(self.smg.not_inf_nodes, PointCell, direct_point.name)[1]
-                routes_node_to_node = self.smg.routes_node_to_node(center_point_node, direct_point_node)
-                if not routes_node_to_node:
-                    raise MBEquipmentError("Route from central point to direction point not found",
-                                           AttributeKey(cls_name, obj_name, "direct_point"))
+            model_object = LightMO(image.light_route_type, end_forward_str,
+                                   image.colors, image.light_stick_type)
+            center_point_node.append_cell_obj(LightCell(image_name))
 
-                model_object = LightMO(image.light_route_type, routes_node_to_node[1].end_str,
-                                       image.colors, image.light_stick_type)
-                center_point_node.append_cell_obj(LightCell(image_name))
+            model_object.name = image_name
+            self.names_mo["Light"][image_name] = model_object
 
-                model_object.name = image_name
-                self.names_mo["Light"][image_name] = model_object
+        if errors:
+            raise MBEquipmentErrors(errors)
 
     def build_rail_points(self):
-
-        for image in self.images:
+        images = self.stage_images["rail_points"]
+        errors: list[MBEquipmentError] = []
+
+        args_list = [(image.__class__.__name__, image.name, image.center_point.name, image.dir_plus_point.name,
+                      image.dir_minus_point.name) for image in images]
+        for image, check_result in zip(images, self.run_equipment_checks(check_rail_point, args_list)):
+            image: RailPointSOI
+            if isinstance(check_result, MBEquipmentError):
+                errors.append(check_result)
+                continue
             image_name = image.name
-            cls_name = image.__class__.__name__
-            obj_name = image_name
+            center_point_node, ni_plus, plus_move, minus_move = check_result
 
-            if isinstance(image, RailPointSOI):
-                center_point: PointMO = self.names_mo["Point"][image.center_point.name]
-                plus_point: PointMO = self.names_mo["Point"][image.dir_plus_point.name]
-                minus_point: PointMO = self.names_mo["Point"][image.dir_minus_point.name]
-
-                # check direction
-                center_point_node = find_cell_name(self.smg.not_inf_nodes, PointCell, center_point.name)[1]
-                plus_point_node = find_cell_name(self.smg.not_inf_nodes, PointCell, plus_point.name)[1]
-                minus_point_node = find_cell_name(self.smg.not_inf_nodes, PointCell, minus_point.name)[1]
-                plus_routes, ni_plus = self.smg.routes_node_to_node(center_point_node, plus_point_node)
-                minus_routes, ni_minus = self.smg.routes_node_to_node(center_point_node, minus_point_node)
-                if not plus_routes:
-                    raise MBEquipmentError("Route from central point to '+' point not found",
-                                           AttributeKey(cls_name, obj_name, "dir_plus_point"))
-                if not minus_routes:
-                    raise MBEquipmentError("Route from central point to '-' point not found",
-                                           AttributeKey(cls_name, obj_name, "dir_minus_point"))
-                for plus_route in plus_routes:
-                    for minus_route in minus_routes:
-                        if plus_route.partially_overlaps(minus_route):
-                            raise MBEquipmentError("Cannot understand '+' and '-' directions because their overlaps",
-                                                   AttributeKey(cls_name, obj_name, "dir_minus_point"))
-                if not (ni_plus is ni_minus):
-                    raise MBEquipmentError("Defined '+' or '-' direction is equal to 0-direction",
-                                           AttributeKey(cls_name, obj_name, "dir_minus_point"))
-
-                # + and - move cells
-                plus_route = plus_routes[0]
-                plus_link = plus_route.links[0]
-                plus_move = ni_plus.get_move_by_link(plus_link)
-                plus_move.append_cell_obj(RailPointDirectionCell("+{}".format(image.name)))
-                minus_route = minus_routes[0]
-                minus_link = minus_route.links[0]
-                minus_move = ni_minus.get_move_by_link(minus_link)
-                minus_move.append_cell_obj(RailPointDirectionCell("-{}".format(image.name)))
-
-                model_object = RailPointMO(ni_plus.pn.opposite_ni(ni_plus).end_str)
-                center_point_node.append_cell_obj(RailPointCell(image_name))
-                model_object.name = image_name
-                self.names_mo["RailPoint"][image_name] = model_object
+            # + and - move cells
+            plus_move.append_cell_obj(RailPointDirectionCell("+{}".format(image.name)))
+            minus_move.append_cell_obj(RailPointDirectionCell("-{}".format(image.name)))
+
+            model_object = RailPointMO(ni_plus.pn.opposite_ni(ni_plus).end_str)
+            center_point_node.append_cell_obj(RailPointCell(image_name))
+            model_object.name = image_name
+            self.names_mo["RailPoint"][image_name] = model_object
+
+        if errors:
+            raise MBEquipmentErrors(errors)
 
     def build_borders(self):
 
-        for image in self.images:
+        for image in self.stage_images["borders"]:
+            image: BorderSOI
             image_name = image.name
             cls_name = image.__class__.__name__
             obj_name = image_name
 
-            if isinstance(image, BorderSOI):
-                point_node: PolarNode = find_cell_name(self.smg.not_inf_nodes, PointCell, image.point.name)[1]
-                inf_ni_str = None
-                if point_node in self.smg.nodes_inf_connected:
-                    inf_ni_str = self.smg.nodes_inf_connected[point_node].opposite_end_str
+            point_node: PolarNode = find_cell_name(self.smg.not_inf_nodes, PointCell, image.point.name)[1]
+            inf_ni_str = None
+            if point_node in self.smg.nodes_inf_connected:
+                inf_ni_str = self.smg.nodes_inf_connected[point_node].opposite_end_str
 
-                model_object = BorderMO(image.border_type, inf_ni_str)
-                point_node.append_cell_obj(BorderCell(image_name))
-                model_object.name = image_name
-                self.names_mo["Border"][image_name] = model_object
+            model_object = BorderMO(image.border_type, inf_ni_str)
+            point_node.append_cell_obj(BorderCell(image_name))
+            model_object.name = image_name
+            self.names_mo["Border"][image_name] = model_object
 
     def build_sections(self):
-
-        for image in self.images:
+        images = self.stage_images["sections"]
+
+        # graph is cut once in all sections border points
+        point_nodes_snapshot = self.point_nodes_snapshot()
+        sections_point_nodes: list[list[PolarNode]] = []
+        for image in images:
+            border_points: list[PointMO] = [self.names_mo["Point"][point.name] for point in image.border_points]
+            sections_point_nodes.append([point_nodes_snapshot[point.name] for point in border_points])
+        cut_components = self.smg.cut_components(node for point_nodes in sections_point_nodes
+                                                 for node in point_nodes)
+
+        for image, point_nodes in zip(images, sections_point_nodes):
+            image: SectionSOI
             image_name = image.name
             cls_name = image.__class__.__name__
             obj_name = image_name
 
-            if isinstance(image, SectionSOI):
-                border_points: list[PointMO] = [self.names_mo["Point"][point.name] for point in image.border_points]
-                point_nodes: list[PolarNode] = [find_cell_name(self.smg.not_inf_nodes, PointCell, point.name)[1]
-                                                for point in border_points]
-                closed_links, closed_nodes = self.smg.closed_links_nodes(point_nodes)
-                if not closed_links:
-                    raise MBEquipmentError("No closed links found",
+            closed_links, closed_nodes = cut_components.closed_links_nodes(point_nodes)
+            if not closed_links:
+                raise MBEquipmentError("No closed links found",
+                                       AttributeKey(cls_name, obj_name, "border_points"))
+
+            # check links sections and make cells
+            for link in closed_links:
+                try:
+                    element_cell_by_type(link, IsolatedSectionCell)
+                except NotFoundCellError:
+                    pass
+                else:
+                    raise MBEquipmentError("Section in link already exists",
                                            AttributeKey(cls_name, obj_name, "border_points"))
+                link.append_cell_obj(IsolatedSectionCell(image.name))
 
-                # check links sections and make cells
-                for link in closed_links:
+            # section type and rail points evaluations
+            rail_points = []
+            if len(closed_links) > 1:
+                section_type = CESectionType(CESectionType.non_stop)
+                for node in closed_nodes:
                     try:
-                        element_cell_by_type(link, IsolatedSectionCell)
+                        rail_cell: RailPointCell = element_cell_by_type(node, RailPointCell)
                     except NotFoundCellError:
-                        pass
-                    else:
-                        raise MBEquipmentError("Section in link already exists",
-                                               AttributeKey(cls_name, obj_name, "border_points"))
-                    link.append_cell_obj(IsolatedSectionCell(image.name))
-
-                # section type and rail points evaluations
-                rail_points = []
-                if len(closed_links) > 1:
-                    section_type = CESectionType(CESectionType.non_stop)
-                    for node in closed_nodes:
-                        try:
-                            rail_cell: RailPointCell = element_cell_by_type(node, RailPointCell)
-                        except NotFoundCellError:
-                            continue
-                        rail_points.append(rail_cell.name)
+                        continue
+                    rail_points.append(rail_cell.name)
+            else:
+                link = closed_links.pop()
+                light_names: dict[str, NodeInterface] = {}
+                for ni in link.ni_s:
+                    node = ni.pn
+                    try:
+                        light_cell: LightCell = element_cell_by_type(node, LightCell)
+                    except NotFoundCellError:
+                        continue
+                    light_names[light_cell.name] = ni
+                # if not light_names:
+                #     raise MBEquipmentError(cls_name, obj_name,
+                #                            "Found segment section |-----| with 0 border lights")
+                if len(light_names) == 2:
+                    section_type = CESectionType(CESectionType.shunt_stop)
+                    for light_name in light_names:
+                        light: LightMO = self.names_mo['Light'][light_name]
+                        link_ni = light_names[light_name]
+                        if (light.route_type == "train") and (link_ni.end != light.end_forward_tpl1):
+                            section_type = CESectionType(CESectionType.track)
+                            break
                 else:
-                    link = closed_links.pop()
-                    light_names: dict[str, NodeInterface] = {}
-                    for ni in link.ni_s:
-                        node = ni.pn
-                        try:
-                            light_cell: LightCell = element_cell_by_type(node, LightCell)
-                        except NotFoundCellError:
-                            continue
-                        light_names[light_cell.name] = ni
-                    # if not light_names:
-                    #     raise MBEquipmentError(cls_name, obj_name,
-                    #                            "Found segment section |-----| with 0 border lights")
-                    if len(light_names) == 2:
-                        section_type = CESectionType(CESectionType.shunt_stop)
-                        for light_name in light_names:
-                            light: LightMO = self.names_mo['Light'][light_name]
-                            link_ni = light_names[light_name]
-                            if (light.route_type == "train") and (link_ni.end != light.end_forward_tpl1):
-                                section_type = CESectionType(CESectionType.track)
-                                break
-                    else:
-                        section_type = CESectionType(CESectionType.indic)
+                    section_type = CESectionType(CESectionType.indic)
 
-                model_object = SectionMO(section_type, rail_points)
-                model_object.name = image_name
-                self.names_mo["Section"][image_name] = model_object
+            model_object = SectionMO(section_type, rail_points)
+            model_object.name = image_name
+            self.names_mo["Section"][image_name] = model_object
 
-    def eval_routes(self, dir_name):
+    def precompute_route_tables(self) -> RouteLookupTables:
+        tables = RouteLookupTables()
 
-        train_light_routes_dict: OrderedDict[str, tuple[list[RailRoute], list[RailRoute]]] = OrderedDict()
-        shunting_light_routes_dict: OrderedDict[str, list[RailRoute]] = OrderedDict()
+        for point_cell, node in all_cells_of_type(self.smg.not_inf_nodes, PointCell).items():
+            tables.node_names[node] = point_cell.name
+        tables.node_names[self.smg.inf_pu] = "inf_pu"
+        tables.node_names[self.smg.inf_nd] = "inf_nd"
 
-        route_id = 1
-
-        # 1. Form routes from smg
-        light_cells_: dict[LightCell, PolarNode] = all_cells_of_type(self.smg.not_inf_nodes, LightCell)
-        for light_cell in light_cells_:
+        node_by_light_name: dict[str, PolarNode] = {}
+        for light_cell, node in all_cells_of_type(self.smg.not_inf_nodes, LightCell).items():
+            light_cell: LightCell
             light: LightMO = self.names_mo["Light"][light_cell.name]
-            start_ni = light_cells_[light_cell].ni_by_end(light.end_forward_tpl1)
-            routes = self.smg.walk(start_ni)
-            train_route_slices: list[Route] = []
-            shunting_route_slices: list[Route] = []
+            node_by_light_name[light.name] = node
+            tables.light_by_node[node] = light
+            tables.facing_light_by_ni[node.ni_by_end(light.end_forward_tpl1)] = light
+        for light_name in self.names_mo["Light"]:
+            if light_name in node_by_light_name:
+                tables.light_nodes[light_name] = node_by_light_name[light_name]
 
-            # 1.0 Is enter signal check
-            is_enter_signal = False
-            if light.route_type == "train":
+        for border_cell, node in all_cells_of_type(self.smg.not_inf_nodes, BorderCell).items():
+            border_cell: BorderCell
+            tables.border_by_node[node] = self.names_mo["Border"][border_cell.name]
+
+        for link in self.smg.not_inf_links:
+            try:
+                section_cell: IsolatedSectionCell = element_cell_by_type(link, IsolatedSectionCell)
+            except NotFoundCellError:
+                pass
+            else:
+                tables.section_by_link[link] = self.names_mo["Section"][section_cell.name]
+            for ni in link.ni_s:
+                move_ = ni.get_move_by_link(link)
                 try:
-                    element_cell_by_type(start_ni.pn, BorderCell)
+                    rpdc_: RailPointDirectionCell = element_cell_by_type(move_, RailPointDirectionCell)
                 except NotFoundCellError:
-                    pass
-                else:
-                    is_enter_signal = True
-
-            # 1.1 Slices extraction
-            for route in routes:
-
-                # 1.1.1 Train routes slices extraction
-                if light.route_type == "train":
-
-                    train_slice_repeats = False
-                    not_possible_end_train = False
-                    train_route_slice = None
-                    for ni in route.outer_ni_s[1:]:
-                        node = ni.pn
-
-                        # 1.1.1.1 Check if node is light
-                        light_cell = None
-                        try:
-                            light_cell: LightCell = element_cell_by_type(node, LightCell)
-                        except NotFoundCellError:
-                            pass
-                        if light_cell:
-                            light_found: LightMO = self.names_mo["Light"][light_cell.name]
-                            if ni.end == light_found.end_forward_tpl1:
-                                if light_found.route_type == "train":
-                                    train_route_slice = route.get_slice(route.start_ni, ni.pn.opposite_ni(ni))
-                                    for old_train_route_slice in train_route_slices:
-                                        if old_train_route_slice == train_route_slice:
-                                            train_slice_repeats = True
-                                            break
-                                    break
-
-                        # 1.1.1.2 Check if node is border
-                        border_cell = None
-                        try:
-                            border_cell: BorderCell = element_cell_by_type(node, BorderCell)
-                        except NotFoundCellError:
-                            pass
-                        if border_cell:
-                            border_found: BorderMO = self.names_mo["Border"][border_cell.name]
-                            if (light.route_type == "train") and\
-                               (border_found.border_type == "standoff"):
-                                not_possible_end_train = True
-                                break
-                            train_route_slice = route.get_slice(route.start_ni, ni.pn.opposite_ni(ni))
-                            for old_route_slice in train_route_slices:
-                                if old_route_slice == train_route_slice:
-                                    train_slice_repeats = True
-                                    break
-                            break
+                    continue
+                tables.direction_by_move[move_] = rpdc_.direction
+
+        return tables
+
+    def eval_light_routes(self, light_node: PolarNode, tables: RouteLookupTables,
+                          profile: LightRoutesProfile = None) -> tuple[list[RailRouteRecord], list[RailRouteRecord]]:
+        """ route ids are not evaluated here, they depend on order of all lights """
+        light: LightMO = tables.light_by_node[light_node]
+        start_ni = light_node.ni_by_end(light.end_forward_tpl1)
+        walk_start_time = time.perf_counter()
+        routes = self.smg.walk(start_ni)
+        if profile:
+            profile.walk_time = time.perf_counter() - walk_start_time
+            profile.raw_paths_count = len(routes)
+            profile.max_path_depth = max((len(route.links) for route in routes), default=0)
+        train_route_slices: list[Route] = []
+        shunting_route_slices: list[Route] = []
+
+        # 1.0 Is enter signal check
+        is_enter_signal = (light.route_type == "train") and (start_ni.pn in tables.border_by_node)
+
+        # 1.1 Slices extraction
+        for route in routes:
+
+            # 1.1.1 Train routes slices extraction
+            if light.route_type == "train":
 
-                    if (not train_slice_repeats) and (not not_possible_end_train) and train_route_slice:
-                        train_route_slices.append(train_route_slice)
-
-                # 1.1.2 Shunting routes slices extraction
-                if not is_enter_signal:
-                    shunting_slice_repeats = False
-                    shunting_route_slice = None
-                    for ni in route.outer_ni_s[1:]:
-                        node = ni.pn
-
-                        # 1.1.2.1 Check if node is light
-                        light_cell = None
-                        try:
-                            light_cell: LightCell = element_cell_by_type(node, LightCell)
-                        except NotFoundCellError:
-                            pass
-                        if light_cell:
-                            light_found: LightMO = self.names_mo["Light"][light_cell.name]
-                            if ni.end == light_found.end_forward_tpl1:
-                                shunting_route_slice = route.get_slice(route.start_ni, ni.pn.opposite_ni(ni))
-                                for old_shunting_route_slice in shunting_route_slices:
-                                    if old_shunting_route_slice == shunting_route_slice:
-                                        shunting_slice_repeats = True
-                                        break
+                train_slice_repeats = False
+                not_possible_end_train = False
+                train_route_slice = None
+                for ni in route.outer_ni_s[1:]:
+                    node = ni.pn
+
+                    # 1.1.1.1 Check if node is facing train light
+                    light_found = tables.facing_light_by_ni.get(ni)
+                    if light_found and (light_found.route_type == "train"):
+                        train_route_slice = route.get_slice(route.start_ni, ni.pn.opposite_ni(ni))
+                        for old_train_route_slice in train_route_slices:
+                            if old_train_route_slice == train_route_slice:
+                                train_slice_repeats = True
                                 break
+                        break
 
-                        # 1.1.2.2 Check if node is border
-                        border_cell = None
-                        try:
-                            border_cell: BorderCell = element_cell_by_type(node, BorderCell)
-                        except NotFoundCellError:
-                            pass
-                        if border_cell:
-                            shunting_route_slice = route.get_slice(route.start_ni, ni.pn.opposite_ni(ni))
-                            for old_shunting_route_slice in shunting_route_slices:
-                                if old_shunting_route_slice == shunting_route_slice:
-                                    shunting_slice_repeats = True
-                                    break
+                    # 1.1.1.2 Check if node is border
+                    border_found = tables.border_by_node.get(node)
+                    if border_found:
+                        if border_found.border_type == "standoff":
+                            not_possible_end_train = True
                             break
+                        train_route_slice = route.get_slice(route.start_ni, ni.pn.opposite_ni(ni))
+                        for old_route_slice in train_route_slices:
+                            if old_route_slice == train_route_slice:
+                                train_slice_repeats = True
+                                break
+                        break
+
+                if (not train_slice_repeats) and (not not_possible_end_train) and train_route_slice:
+                    train_route_slices.append(train_route_slice)
+                if train_slice_repeats and profile:
+                    profile.duplicates_count += 1
+
+            # 1.1.2 Shunting routes slices extraction
+            if not is_enter_signal:
+                shunting_slice_repeats = False
+                shunting_route_slice = None
+                for ni in route.outer_ni_s[1:]:
+                    node = ni.pn
+
+                    # 1.1.2.1 Check if node is facing light or border
+                    if (ni in tables.facing_light_by_ni) or (node in tables.border_by_node):
+                        shunting_route_slice = route.get_slice(route.start_ni, ni.pn.opposite_ni(ni))
+                        for old_shunting_route_slice in shunting_route_slices:
+                            if old_shunting_route_slice == shunting_route_slice:
+                                shunting_slice_repeats = True
+                                break
+                        break
 
-                    if (not shunting_slice_repeats) and shunting_route_slice:
-                        shunting_route_slices.append(shunting_route_slice)
-
-            # 1.2 Route info extraction
-            train_routes = []
-            shunting_routes = []
-
-            for train_route_slice in train_route_slices:
-                train_route = RailRoute(route_id)
-
-                # route_type
-                train_route.route_type = "PpoTrainRoute"
-
-                # tag_end_eval
-                end_node = train_route_slice.nodes[-1]
-                light_cell: LightCell = element_cell_by_type(end_node, LightCell)
-                end_light_name = light_cell.name
-                train_route.route_tag = "{}_{}".format(light.name, end_light_name)
-
-                # trace_begin
-                train_route.trace_begin = light.name
-
-                # trace_points
-                trace_point_directions = []
-                for link in train_route_slice.links:
-                    for ni in link.ni_s:
-                        move_ = ni.get_move_by_link(link)
-                        try:
-                            rpdc_: RailPointDirectionCell = element_cell_by_type(move_, RailPointDirectionCell)
-                        except NotFoundCellError:
-                            pass
-                        else:
-                            trace_point_directions.append(rpdc_.direction)
-                train_route.trace_points = " ".join(trace_point_directions)
+                if (not shunting_slice_repeats) and shunting_route_slice:
+                    shunting_route_slices.append(shunting_route_slice)
+                if shunting_slice_repeats and profile:
+                    profile.duplicates_count += 1
 
-                # trace_end
-                try:
-                    border_cell: BorderCell = element_cell_by_type(end_node, BorderCell)
-                    trace_end = border_cell.name
-                except NotFoundCellError:
-                    trace_end = element_cell_by_type(end_node, LightCell).name
-                train_route.trace_end = trace_end
-
-                # finish_selectors
-                end_link = train_route_slice.links[-1]
-                end_section_cell: IsolatedSectionCell = element_cell_by_type(end_link, IsolatedSectionCell)
-                end_section: SectionMO = self.names_mo["Section"][end_section_cell.name]
-                finish_selectors = [end_light_name]
-                if end_section.section_type == "track":
-                    node_before_end = train_route_slice.nodes[-2]
-                    before_end_light_cell: LightCell = element_cell_by_type(node_before_end, LightCell)
-                    finish_selectors.append(before_end_light_cell.name)
-                train_route.end_selectors = " ".join(finish_selectors)
+        if profile:
+            profile.train_slices_count = len(train_route_slices)
+            profile.shunting_slices_count = len(shunting_route_slices)
 
-                route_id += 1
-                train_routes.append(train_route)
+        # 1.2 Route info extraction
+        train_routes = []
+        shunting_routes = []
 
-            for shunting_route_slice in shunting_route_slices:
-                shunting_route = RailRoute(route_id)
+        for train_route_slice in train_route_slices:
+            train_route = RailRouteRecord(0)
 
-                # route_type
-                shunting_route.route_type = "PpoShuntingRoute"
+            # route_type
+            train_route.route_type = "PpoTrainRoute"
 
-                # tag_end_eval
-                end_node = shunting_route_slice.nodes[-1]
-                try:
-                    element_cell_by_type(end_node, BorderCell)  # border_cell: BorderCell =
-                except NotFoundCellError:
-                    end_light: LightCell = element_cell_by_type(end_node, LightCell)
-                    end_light_name = end_light.name
-                else:
-                    before_end_node = shunting_route_slice.nodes[-2]
-                    light_before_end_cell: LightCell = element_cell_by_type(before_end_node, LightCell)
-                    end_light_name = light_before_end_cell.name
-
-                shunting_route.route_tag = "{}_{}".format(light.name, end_light_name)
-
-                # trace_begin
-                shunting_route.trace_begin = light.name
-
-                # trace_points
-                trace_point_directions = []
-                for link in shunting_route_slice.links:
-                    for ni in link.ni_s:
-                        move_ = ni.get_move_by_link(link)
-                        try:
-                            rpdc_: RailPointDirectionCell = element_cell_by_type(move_, RailPointDirectionCell)
-                        except NotFoundCellError:
-                            pass
-                        else:
-                            trace_point_directions.append(rpdc_.direction)
-                shunting_route.trace_points = " ".join(trace_point_directions)
+            # tag_end_eval
+            end_node = train_route_slice.nodes[-1]
+            end_light_name = tables.light_by_node[end_node].name
+            train_route.route_tag = "{}_{}".format(light.name, end_light_name)
 
-                # trace_end
-                end_link = shunting_route_slice.links[-1]
-                end_section_cell: IsolatedSectionCell = element_cell_by_type(end_link, IsolatedSectionCell)
-                end_section: SectionMO = self.names_mo["Section"][end_section_cell.name]
-                try:
-                    border_cell: BorderCell = element_cell_by_type(end_node, BorderCell)
-                except NotFoundCellError:
-                    trace_end = element_cell_by_type(end_node, LightCell).name
-                else:
-                    if (end_section.section_type == "indic") or \
-                            (end_section.section_type == "shunt_stop"):
-                        trace_end = end_section.name
-                    else:
-                        trace_end = border_cell.name
+            # trace_begin
+            train_route.trace_begin = light.name
 
-                shunting_route.trace_end = trace_end
+            # trace_points
+            train_route.trace_points = " ".join(tables.trace_point_directions(train_route_slice))
 
-                # finish_selectors
-                finish_selectors = [end_light_name]
-                if (end_section.section_type == "track") or\
-                        (end_section.section_type == "shunt_stop"):
-                    node_before_end = shunting_route_slice.nodes[-2]
-                    before_end_light_cell: LightCell = element_cell_by_type(node_before_end, LightCell)
-                    if before_end_light_cell.name not in finish_selectors:
-                        finish_selectors.append(before_end_light_cell.name)
-                shunting_route.end_selectors = " ".join(finish_selectors)
+            # trace_end
+            if end_node in tables.border_by_node:
+                trace_end = tables.border_by_node[end_node].name
+            else:
+                trace_end = end_light_name
+            train_route.trace_end = trace_end
+
+            # finish_selectors
+            end_section = tables.section_by_link[train_route_slice.links[-1]]
+            finish_selectors = [end_light_name]
+            if end_section.section_type == "track":
+                node_before_end = train_route_slice.nodes[-2]
+                finish_selectors.append(tables.light_by_node[node_before_end].name)
+            train_route.end_selectors = " ".join(finish_selectors)
+
+            train_routes.append(train_route)
+
+        for shunting_route_slice in shunting_route_slices:
+            shunting_route = RailRouteRecord(0)
+
+            # route_type
+            shunting_route.route_type = "PpoShuntingRoute"
+
+            # tag_end_eval
+            end_node = shunting_route_slice.nodes[-1]
+            end_border = tables.border_by_node.get(end_node)
+            if not end_border:
+                end_light_name = tables.light_by_node[end_node].name
+            else:
+                before_end_node = shunting_route_slice.nodes[-2]
+                end_light_name = tables.light_by_node[before_end_node].name
+
+            shunting_route.route_tag = "{}_{}".format(light.name, end_light_name)
 
+            # trace_begin
+            shunting_route.trace_begin = light.name
+
+            # trace_points
+            shunting_route.trace_points = " ".join(tables.trace_point_directions(shunting_route_slice))
+
+            # trace_end
+            end_section = tables.section_by_link[shunting_route_slice.links[-1]]
+            if not end_border:
+                trace_end = tables.light_by_node[end_node].name
+            else:
+                if (end_section.section_type == "indic") or \
+                        (end_section.section_type == "shunt_stop"):
+                    trace_end = end_section.name
+                else:
+                    trace_end = end_border.name
+
+            shunting_route.trace_end = trace_end
+
+            # finish_selectors
+            finish_selectors = [end_light_name]
+            if (end_section.section_type == "track") or\
+                    (end_section.section_type == "shunt_stop"):
+                node_before_end = shunting_route_slice.nodes[-2]
+                before_end_light_name = tables.light_by_node[node_before_end].name
+                if before_end_light_name not in finish_selectors:
+                    finish_selectors.append(before_end_light_name)
+            shunting_route.end_selectors = " ".join(finish_selectors)
+
+            shunting_routes.append(shunting_route)
+
+        return train_routes, shunting_routes
+
+    def set_route_cache_file(self, file_name: Optional[str]):
+        self.route_cache = RouteCache(file_name)
+
+    def iter_light_routes(self) -> Iterator[tuple[str, str, list[RailRouteRecord], Optional[str]]]:
+        """ yields (light_name, signal_type, routes, signal_key) by one light, ids are continued through all lights,
+            signal_key is same for same light region and first route id, None when fingerprints are not evaluated """
+        route_cache = self.route_cache
+
+        # 0. Equipment lookup tables and fingerprints
+        tables = self.precompute_route_tables()
+        station_key = "station_{}".format(tables.station_fingerprint())
+        light_keys: Optional[OrderedDict[str, str]] = None
+        if route_cache is not None:
+            light_keys = route_cache.get(station_key)
+        if (light_keys is None) and ((route_cache is not None) or self.incremental_xml_export):
+            light_keys = OrderedDict((light_name, "light_{}".format(tables.light_fingerprint(light_node)))
+                                     for light_name, light_node in tables.light_nodes.items())
+
+        # 1. Form routes from smg, only for lights with changed reachable region
+        profiling = bool(self.routes_profile_file_name)
+        self.routes_profiles = []
+        route_id = 1
+        for light_name, light_node in tables.light_nodes.items():
+            light: LightMO = tables.light_by_node[light_node]
+            light_routes: Optional[tuple[list[RailRouteRecord], list[RailRouteRecord]]] = None
+            profile: Optional[LightRoutesProfile] = None
+            if route_cache is not None:
+                cached_routes = route_cache.get(light_keys[light_name])
+                if cached_routes is not None:
+                    light_routes = tuple([route_record_from_values(values) for values in routes_values]
+                                         for routes_values in cached_routes)
+                if profiling and (light_routes is not None):
+                    cached_profile = route_cache.get("profile_{}".format(light_keys[light_name]))
+                    if cached_profile is None:
+                        # cache was filled without profiling, light is re-evaluated
+                        light_routes = None
+                    else:
+                        profile = replace(LightRoutesProfile(**cached_profile), cached=True)
+            if light_routes is None:
+                if profiling:
+                    profile = LightRoutesProfile(light_name)
+                light_routes = self.eval_light_routes(light_node, tables, profile)
+                if route_cache is not None:
+                    route_cache.put(light_keys[light_name], [[route_record_values(rail_route) for rail_route in routes]
+                                                             for routes in light_routes])
+                    if profiling:
+                        route_cache.put("profile_{}".format(light_keys[light_name]), asdict(profile))
+            if profiling:
+                self.routes_profiles.append(profile)
+            train_routes, shunting_routes = light_routes
+            first_route_id = route_id
+            for rail_route in train_routes + shunting_routes:
+                rail_route.id = str(route_id)
                 route_id += 1
-                shunting_routes.append(shunting_route)
 
+            signal_type = "PpoTrainSignal" if light.route_type == "train" else "PpoShuntingSignal"
+            signal_key = None
+            if light_keys is not None:
+                signal_key = "{}_{}_{}".format(light_keys[light_name], signal_type, first_route_id)
             if light.route_type == "train":
-                train_light_routes_dict[light.name] = (train_routes, shunting_routes)
+                yield light.name, signal_type, train_routes + shunting_routes, signal_key
             else:
-                shunting_light_routes_dict[light.name] = shunting_routes
+                yield light.name, signal_type, shunting_routes, signal_key
+
+        if route_cache is not None:
+            route_cache.put(station_key, light_keys)
+            used_keys = [station_key, *light_keys.values()]
+            used_keys.extend(["profile_{}".format(light_key) for light_key in light_keys.values()])
+            route_cache.retain(used_keys)
+            route_cache.save()
 
-        # 2. Xml formation
-        form_rail_routes_xml(train_light_routes_dict, shunting_light_routes_dict, dir_name,
-                             "TrainRoute.xml", "ShuntingRoute.xml")
+    def eval_routes(self, dir_name):
+        # routes are written to xml by one light, all station routes are not accumulated
+        eval_report = BuildStageReport("route_eval", start=time.perf_counter())
+        light_routes = timed_items(self.iter_light_routes(), eval_report)
+        if self.route_table_file_names:
+            light_routes = tee_route_tables(light_routes, [os.path.join(os.getcwd(), dir_name, file_name)
+                                                           for file_name in self.route_table_file_names])
+        write_rail_routes_xml(light_routes, dir_name, "TrainRoute.xml", "ShuntingRoute.xml",
+                              self.incremental_xml_export)
+        # writing is the rest of export time, it is placed after evaluation in trace
+        write_start = eval_report.start + eval_report.duration
+        write_report = BuildStageReport("xml_write", time.perf_counter() - write_start, 0, eval_report.objects_count,
+                                        write_start)
+        self.routes_stage_reports = OrderedDict([(eval_report.name, eval_report), (write_report.name, write_report)])
+        if self.routes_profile_file_name:
+            self.save_routes_profile(os.path.join(os.getcwd(), dir_name, self.routes_profile_file_name))
+
+    def save_routes_profile(self, file_full_name: str):
+        """ report format is chosen by file extension: .json, else csv """
+        if file_full_name.endswith(".json"):
+            with open(file_full_name, 'w', encoding='utf-8') as out_file:
+                json.dump([asdict(profile) for profile in self.routes_profiles], out_file, indent=2)
+        else:
+            with open(file_full_name, 'w', encoding='utf-8', newline='') as out_file:
+                writer = csv.DictWriter(out_file, [field.name for field in fields(LightRoutesProfile)])
+                writer.writeheader()
+                for profile in self.routes_profiles:
+                    writer.writerow(asdict(profile))
@@ -4,6 +4,7 @@ from PyQt5.QtCore import QObject, pyqtSignal
 
 # from new_command_supervisor import CommandSupervisor
 from default_ordered_dict import DefaultOrderedDict
+from form_exception_message import form_message_from_error
 from main_handler import MainHandler
 
 
@@ -29,6 +30,9 @@ class AdapterCorePyqtInterface(QObject):
             self.send_curr_obj_attrs(self.mh.current_object_attrib_dict)
         if self.mh.changed_creation_readiness:
             self.send_creation_readiness(self.mh.curr_obj_creation_readiness)
+        if self.mh.changed_common_status:
+            self.send_status_message.emit(self.mh.common_status)
+            self.mh.changed_common_status = False
 
     """ Menus operations """
 
@@ -37,9 +41,17 @@ class AdapterCorePyqtInterface(QObject):
         self.send_result_operations()
 
     def dump_station_config(self, dir_name: str):
-        self.mh.dump_station_config(dir_name)
+        dump_future = self.mh.dump_station_config(dir_name)
+        dump_future.add_done_callback(self.dump_finished)
         self.send_result_operations()
 
+    def dump_finished(self, dump_future):
+        """ called in writing thread, signals are queued to interface thread """
+        if dump_future.exception() is not None:
+            self.send_error_message.emit(form_message_from_error(dump_future.exception()))
+        else:
+            self.send_status_message.emit("Station config saved")
+
     def undo(self):
         self.mh.undo()
         self.send_result_operations()
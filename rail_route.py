@@ -1,6 +1,14 @@
 from __future__ import annotations
+from typing import Iterable, Optional
 import re
 
+ROUTE_POINTS_PATTERN = re.compile(r"[+-]\d{1,3}S?[OB]?")
+SIGNAL_LIGHT_VALUES = frozenset(["K", "ZH", "Z", "ZHM_Z", "ZHM_ZH", "ZM", "DZH", "DZHM"])
+ROUTE_TYPES = frozenset(["PpoTrainRoute", "PpoShuntingRoute"])
+SIGNAL_TYPES = frozenset(["PpoTrainSignal", "PpoShuntingSignal"])
+NEXT_LIGHT_ATTRIBUTES = ("next_dark", "next_stop", "next_on_main", "next_on_main_green", "next_on_side",
+                         "next_also_on_main", "next_also_on_main_green", "next_also_on_side")
+
 
 class CrossroadNotification:
     def __init__(self, cn_route: RailRoute, num: int):
@@ -132,7 +140,7 @@ class RailRoute:
     def signal_light_checker(self, value, column_name):
         if self.route_type == "PpoShuntingRoute":
             return
-        assert value in ["K", "ZH", "Z", "ZHM_Z", "ZHM_ZH", "ZM", "DZH", "DZHM"], \
+        assert value in SIGNAL_LIGHT_VALUES, \
             "Not supported light value {} in line {} column {}".format(value, self.id, column_name)
 
     def int_checker(self, value, column_name, min_possible_value: int = 1):
@@ -142,7 +150,7 @@ class RailRoute:
             .format(min_possible_value, value, self.id, column_name)
 
     def route_points_checker(self, value, column_name):
-        points_found = re.findall(r"[+-]\d{1,3}S?[OB]?", value)
+        points_found = ROUTE_POINTS_PATTERN.findall(value)
         val_copy = value
         for point in points_found:
             val_copy = val_copy.replace(point, "", 1)
@@ -155,7 +163,7 @@ class RailRoute:
 
     @route_type.setter
     def route_type(self, value):
-        assert value in ["PpoTrainRoute", "PpoShuntingRoute"], "Not valid route type {} in line {}" \
+        assert value in ROUTE_TYPES, "Not valid route type {} in line {}" \
             .format(value, self.id)
         self._route_type = value
 
@@ -174,7 +182,7 @@ class RailRoute:
 
     @signal_type.setter
     def signal_type(self, value):
-        assert value in ["PpoTrainSignal", "PpoShuntingSignal"], "Not valid signal type {} in line {}" \
+        assert value in SIGNAL_TYPES, "Not valid signal type {} in line {}" \
             .format(value, self.id)
         self._signal_type = value
 
@@ -327,3 +335,142 @@ class RailRoute:
     def add_crossroad_notification(self):
         cn = CrossroadNotification(self, self.count_crossroad_notification() + 1)
         self.crossroad_notifications.append(cn)
+
+
+def is_blank(value: Optional[str]) -> bool:
+    return (not value) or value.isspace()
+
+
+class CrossroadNotificationRecord:
+    """ raw values of CrossroadNotification, checked and normalized by normalize_route_records """
+    __slots__ = ("route", "num", "crossroad_id", "crossroad_delay_open", "crossroad_delay_start_notif",
+                 "crsrd_start_notif", "crsrd_notif_point", "crsrd_before_route_points")
+
+    def __init__(self, cn_route: RailRouteRecord, num: int):
+        self.route = cn_route
+        self.num = num
+        self.crossroad_id = None
+        self.crossroad_delay_open = None
+        self.crossroad_delay_start_notif = None
+        self.crsrd_start_notif = None
+        self.crsrd_notif_point = None  # not required
+        self.crsrd_before_route_points = None  # not required
+
+
+class RailRouteRecord:
+    """ RailRoute with raw values without checks on assignment, values are checked and normalized
+        as RailRoute setters do in one pass of normalize_route_records before serialization """
+    __slots__ = ("id", "route_tag", "route_type", "signal_tag", "signal_type", "route_pointer_value",
+                 "trace_begin", "trace_points", "trace_variants", "trace_end", "end_selectors",
+                 "route_points_before_route", *NEXT_LIGHT_ATTRIBUTES, "crossroad_notifications", "normalized")
+
+    def __init__(self, id_):
+        self.id = str(id_)
+        self.route_tag = None
+        self.route_type = None
+        self.signal_tag = None
+        self.signal_type = None
+        self.route_pointer_value = None
+        self.trace_begin = None
+        self.trace_points = ""
+        self.trace_variants = None
+        self.trace_end = None
+        self.end_selectors = None
+        self.route_points_before_route = None
+        self.next_dark = "K"
+        self.next_stop = "K"
+        self.next_on_main = "K"
+        self.next_on_main_green = "K"
+        self.next_on_side = "K"
+        self.next_also_on_main = "K"
+        self.next_also_on_main_green = "K"
+        self.next_also_on_side = "K"
+        self.crossroad_notifications: list[CrossroadNotificationRecord] = []
+        self.normalized = False
+
+    def count_crossroad_notification(self):
+        return len(self.crossroad_notifications)
+
+    def add_crossroad_notification(self):
+        cn = CrossroadNotificationRecord(self, self.count_crossroad_notification() + 1)
+        self.crossroad_notifications.append(cn)
+
+
+def route_record_values(route: RailRouteRecord) -> dict:
+    """ raw values of record as json-compatible dict, crossroad notifications are listed without route """
+    values = {attr_name: getattr(route, attr_name) for attr_name in RailRouteRecord.__slots__
+              if attr_name != "crossroad_notifications"}
+    values["crossroad_notifications"] = [{attr_name: getattr(cn, attr_name)
+                                          for attr_name in CrossroadNotificationRecord.__slots__[1:]}
+                                         for cn in route.crossroad_notifications]
+    return values
+
+
+def route_record_from_values(values: dict) -> RailRouteRecord:
+    route = RailRouteRecord(values["id"])
+    for attr_name in RailRouteRecord.__slots__:
+        if attr_name != "crossroad_notifications":
+            setattr(route, attr_name, values[attr_name])
+    for cn_values in values["crossroad_notifications"]:
+        cn = CrossroadNotificationRecord(route, cn_values["num"])
+        for attr_name in CrossroadNotificationRecord.__slots__[2:]:
+            setattr(cn, attr_name, cn_values[attr_name])
+        route.crossroad_notifications.append(cn)
+    return route
+
+
+def check_int_value(route: RailRouteRecord, value: str, column_name: str, min_possible_value: int = 1):
+    if value == "":
+        return
+    assert int(value) >= min_possible_value, "Value should be int >= {}, given value is {} in line {} column {}" \
+        .format(min_possible_value, value, route.id, column_name)
+
+
+def check_route_points(route: RailRouteRecord, value: str, column_name: str):
+    assert not ROUTE_POINTS_PATTERN.sub("", value).strip(), \
+        "Pointers list {} is not valid in line {} column {}".format(value, route.id, column_name)
+
+
+def normalize_route_records(routes: Iterable[RailRouteRecord]):
+    """ same checks and messages as RailRoute setters, records are changed in place as setters do:
+        blank values are set to None, trace points and points before route are padded by space,
+        records are marked normalized and are not padded again by next writer of the same routes stream """
+    for route in routes:
+        if not isinstance(route, RailRouteRecord) or route.normalized:
+            continue
+        assert route.route_type in ROUTE_TYPES, "Not valid route type {} in line {}" \
+            .format(route.route_type, route.id)
+        if route.signal_type is not None:
+            assert route.signal_type in SIGNAL_TYPES, "Not valid signal type {} in line {}" \
+                .format(route.signal_type, route.id)
+        if route.route_pointer_value is not None:
+            check_int_value(route, route.route_pointer_value, 'route_pointer_value')
+        if route.trace_variants == "":
+            route.trace_variants = None
+        check_route_points(route, route.trace_points, 'trace_points')
+        if route.trace_points:
+            route.trace_points += " "
+        if route.route_points_before_route == "":
+            route.route_points_before_route = None
+        elif route.route_points_before_route is not None:
+            route.route_points_before_route += " "
+        if route.route_type == "PpoTrainRoute":
+            for attr_name in NEXT_LIGHT_ATTRIBUTES:
+                value = getattr(route, attr_name)
+                assert value in SIGNAL_LIGHT_VALUES, \
+                    "Not supported light value {} in line {} column {}".format(value, route.id, attr_name)
+        for cn in route.crossroad_notifications:
+            for attr_name in CrossroadNotificationRecord.__slots__[2:]:
+                if is_blank(getattr(cn, attr_name)):
+                    setattr(cn, attr_name, None)
+            if cn.crossroad_delay_open is not None:
+                check_int_value(route, cn.crossroad_delay_open, 'crossroad_delay_open_{}'.format(cn.num), 0)
+            if cn.crossroad_delay_start_notif is not None:
+                check_int_value(route, cn.crossroad_delay_start_notif,
+                                'crossroad_delay_start_notif_{}'.format(cn.num), 0)
+            if cn.crsrd_notif_point is not None:
+                check_int_value(route, cn.crsrd_notif_point, 'crossroad_notif_point_{}'.format(cn.num))
+            if cn.crsrd_before_route_points is not None:
+                check_route_points(route, cn.crsrd_before_route_points,
+                                   'crossroad_before_route_points_{}'.format(cn.num))
+        route.normalized = True
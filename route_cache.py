@@ -0,0 +1,66 @@
+from __future__ import annotations
+from collections import OrderedDict
+from typing import Optional, Any, Iterable
+import json
+import os
+
+# cache of other version is not read, version is changed when fingerprints or cached values forming is changed
+ROUTE_CACHE_VERSION = 2
+
+
+class RouteCache:
+    """ evaluated routes by fingerprint, kept in memory and optionally in json file,
+        values are json-compatible, saved as document {"version": ROUTE_CACHE_VERSION, "entries": {key: value}} """
+    def __init__(self, file_name: Optional[str] = None):
+        self.file_name = file_name
+        self._entries: dict[str, Any] = {}
+        self.hits = 0
+        self.misses = 0
+        if file_name:
+            self.load()
+
+    def __contains__(self, key: str) -> bool:
+        return key in self._entries
+
+    def __len__(self):
+        return len(self._entries)
+
+    def get(self, key: str) -> Optional[Any]:
+        if key in self._entries:
+            self.hits += 1
+            return self._entries[key]
+        self.misses += 1
+        return None
+
+    def put(self, key: str, value: Any):
+        self._entries[key] = value
+
+    def retain(self, keys: Iterable[str]):
+        """ entries not used in last evaluation are removed """
+        keys = set(keys)
+        self._entries = {key: val for key, val in self._entries.items() if key in keys}
+
+    def clear(self):
+        self._entries.clear()
+
+    def load(self):
+        if not os.path.isfile(self.file_name):
+            return
+        try:
+            with open(self.file_name, 'r', encoding='utf-8') as in_file:
+                document = json.load(in_file, object_pairs_hook=OrderedDict)
+        except (OSError, ValueError):
+            return
+        if (not isinstance(document, dict)) or (document.get("version") != ROUTE_CACHE_VERSION):
+            return
+        entries = document.get("entries")
+        if isinstance(entries, dict):
+            self._entries = dict(entries)
+
+    def save(self):
+        if not self.file_name:
+            return
+        tmp_file_name = "{}.tmp".format(self.file_name)
+        with open(tmp_file_name, 'w', encoding='utf-8') as out_file:
+            json.dump({"version": ROUTE_CACHE_VERSION, "entries": self._entries}, out_file, ensure_ascii=False)
+        os.replace(tmp_file_name, self.file_name)
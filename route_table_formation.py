@@ -0,0 +1,173 @@
+from __future__ import annotations
+from array import array
+from collections import OrderedDict
+from typing import Iterable, Iterator, Optional, Union
+import json
+import os
+import struct
+import sys
+
+from rail_route import RailRoute, RailRouteRecord, normalize_route_records
+
+# binary route table layout, all numbers are little-endian:
+#     header      - magic, version, rows count, columns count, strings count
+#     columns     - per column: type code, name length, utf-8 name
+#     column data - per column: rows count of int32 values (int column) or uint32 string indexes, 8-byte aligned
+#     strings     - uint32 offsets (strings count + 1) and utf-8 blob, 8-byte aligned
+ROUTE_TABLE_MAGIC = b"RTBL"
+ROUTE_TABLE_VERSION = 1
+ROUTE_TABLE_HEADER = struct.Struct("<4sIIII")
+ROUTE_TABLE_COLUMN = struct.Struct("<BH")
+INT_COLUMN = 0
+STRING_COLUMN = 1
+
+# column name, column type, value getter by (light_name, signal_type, route)
+ROUTE_TABLE_COLUMNS = [
+    ("id", INT_COLUMN, lambda light_name, signal_type, route: int(route.id)),
+    ("signal", STRING_COLUMN, lambda light_name, signal_type, route: light_name),
+    ("signal_type", STRING_COLUMN, lambda light_name, signal_type, route: signal_type),
+    ("route_type", STRING_COLUMN, lambda light_name, signal_type, route: route.route_type),
+    ("tag", STRING_COLUMN, lambda light_name, signal_type, route: route.route_tag),
+    ("start", STRING_COLUMN, lambda light_name, signal_type, route: route.trace_begin),
+    ("on_course_points", STRING_COLUMN, lambda light_name, signal_type, route: route.trace_points),
+    ("finish", STRING_COLUMN, lambda light_name, signal_type, route: route.trace_end),
+    ("end_selectors", STRING_COLUMN, lambda light_name, signal_type, route: route.end_selectors),
+]
+
+
+def align_8(file) -> None:
+    file.write(b"\0" * (-file.tell() % 8))
+
+
+def little_endian(values: array) -> array:
+    if sys.byteorder != "little":
+        values = array(values.typecode, values)
+        values.byteswap()
+    return values
+
+
+class RouteTableWriter:
+    """ columnar binary table, columns are kept as fixed-width arrays until close """
+    def __init__(self, file_full_name: str):
+        self.file_full_name = file_full_name
+        self.tmp_file_full_name = "{}.tmp".format(file_full_name)
+        self.columns: list[array] = [array('i' if column_type == INT_COLUMN else 'I')
+                                     for _, column_type, _ in ROUTE_TABLE_COLUMNS]
+        self.string_indexes: dict[str, int] = {}
+
+    def string_index(self, value: Optional[str]) -> int:
+        if value is None:
+            value = ""
+        if value not in self.string_indexes:
+            self.string_indexes[value] = len(self.string_indexes)
+        return self.string_indexes[value]
+
+    def write_signal(self, light_name: str, signal_type: str, routes: Iterable[Union[RailRoute, RailRouteRecord]]):
+        for route in routes:
+            for column, (_, column_type, getter) in zip(self.columns, ROUTE_TABLE_COLUMNS):
+                value = getter(light_name, signal_type, route)
+                column.append(value if column_type == INT_COLUMN else self.string_index(value))
+
+    def close(self):
+        encoded_strings = [string.encode('utf-8') for string in self.string_indexes]
+        offsets = array('I', [0])
+        for encoded_string in encoded_strings:
+            offsets.append(offsets[-1] + len(encoded_string))
+        with open(self.tmp_file_full_name, 'wb') as out:
+            out.write(ROUTE_TABLE_HEADER.pack(ROUTE_TABLE_MAGIC, ROUTE_TABLE_VERSION, len(self.columns[0]),
+                                              len(self.columns), len(encoded_strings)))
+            for column_name, column_type, _ in ROUTE_TABLE_COLUMNS:
+                encoded_name = column_name.encode('utf-8')
+                out.write(ROUTE_TABLE_COLUMN.pack(column_type, len(encoded_name)))
+                out.write(encoded_name)
+            for column in self.columns:
+                align_8(out)
+                out.write(little_endian(column).tobytes())
+            align_8(out)
+            out.write(little_endian(offsets).tobytes())
+            out.write(b"".join(encoded_strings))
+
+    def discard(self):
+        if os.path.isfile(self.tmp_file_full_name):
+            os.remove(self.tmp_file_full_name)
+
+
+class RouteJsonLinesWriter:
+    """ one json object per route, keys are route table column names """
+    def __init__(self, file_full_name: str):
+        self.file_full_name = file_full_name
+        self.tmp_file_full_name = "{}.tmp".format(file_full_name)
+        self.out = open(self.tmp_file_full_name, 'w', encoding='utf-8')
+
+    def write_signal(self, light_name: str, signal_type: str, routes: Iterable[Union[RailRoute, RailRouteRecord]]):
+        for route in routes:
+            row = OrderedDict((column_name, getter(light_name, signal_type, route))
+                              for column_name, _, getter in ROUTE_TABLE_COLUMNS)
+            self.out.write(json.dumps(row, ensure_ascii=False))
+            self.out.write("\n")
+
+    def close(self):
+        self.out.close()
+
+    def discard(self):
+        self.out.close()
+        if os.path.isfile(self.tmp_file_full_name):
+            os.remove(self.tmp_file_full_name)
+
+
+def route_table_writer(file_full_name: str) -> Union[RouteTableWriter, RouteJsonLinesWriter]:
+    """ format is chosen by file extension: .jsonl - json lines, else binary table """
+    if file_full_name.endswith(".jsonl"):
+        return RouteJsonLinesWriter(file_full_name)
+    return RouteTableWriter(file_full_name)
+
+
+def tee_route_tables(light_routes: Iterable[tuple], file_full_names: list[str]) -> Iterator[tuple]:
+    """ passes (light_name, signal_type, routes, ...) items through and writes their routes to tables,
+        tables are replaced only when whole stream is passed """
+    writers = [route_table_writer(file_full_name) for file_full_name in file_full_names]
+    try:
+        for signal in light_routes:
+            light_name, signal_type, routes = signal[:3]
+            normalize_route_records(routes)
+            for writer in writers:
+                writer.write_signal(light_name, signal_type, routes)
+            yield signal
+        for writer in writers:
+            writer.close()
+    except BaseException:
+        for writer in writers:
+            writer.discard()
+        raise
+    for writer in writers:
+        os.replace(writer.tmp_file_full_name, writer.file_full_name)
+
+
+def read_route_table(file_full_name: str) -> OrderedDict[str, list]:
+    """ binary table columns as lists, strings are resolved by dictionary """
+    with open(file_full_name, 'rb') as in_file:
+        data = in_file.read()
+    magic, version, rows_count, columns_count, strings_count = ROUTE_TABLE_HEADER.unpack_from(data)
+    assert (magic == ROUTE_TABLE_MAGIC) and (version == ROUTE_TABLE_VERSION), "Not a route table file"
+    position = ROUTE_TABLE_HEADER.size
+    columns_descriptions = []
+    for _ in range(columns_count):
+        column_type, name_length = ROUTE_TABLE_COLUMN.unpack_from(data, position)
+        position += ROUTE_TABLE_COLUMN.size
+        columns_descriptions.append((data[position:position + name_length].decode('utf-8'), column_type))
+        position += name_length
+    columns_values = []
+    for _, column_type in columns_descriptions:
+        position += -position % 8
+        typecode = 'i' if column_type == INT_COLUMN else 'I'
+        columns_values.append(little_endian(array(typecode, data[position:position + 4 * rows_count])))
+        position += 4 * rows_count
+    position += -position % 8
+    offsets = little_endian(array('I', data[position:position + 4 * (strings_count + 1)]))
+    position += 4 * (strings_count + 1)
+    strings = [data[position + offsets[i]:position + offsets[i + 1]].decode('utf-8') for i in range(strings_count)]
+
+    result: OrderedDict[str, list] = OrderedDict()
+    for (column_name, column_type), values in zip(columns_descriptions, columns_values):
+        result[column_name] = list(values) if column_type == INT_COLUMN else [strings[value] for value in values]
+    return result
@@ -42,12 +42,12 @@ class SOIStorage:
         """ docstring """
         """ base data structures """
         self.soi_objects: DefaultOrderedDict[str, OrderedDict[str, StationObjectImage]] = DefaultOrderedDict(OrderedDict)
-        self.gcs = CoordinateSystemSOI()
-        self.gcs.name = GLOBAL_CS_NAME
 
-        """ init operations """
+        """ init operations, name of global cs is checked in storage of this instance """
         self.init_soi_classes()
         self.bind_descriptors()
+        self.gcs = CoordinateSystemSOI()
+        self.gcs.name = GLOBAL_CS_NAME
         self.reset_clean_storages()
 
     @property
@@ -85,6 +85,9 @@ class SOIStorage:
             for obj_name in obj_dict[cls_name]:
                 self.soi_objects[cls_name][obj_name] = obj_dict[cls_name][obj_name]
 
+    def remove_obj(self, cls_name: str, obj_name: str) -> StationObjectImage:
+        return self.soi_objects[cls_name].pop(obj_name)
+
     def rename_obj(self, cls_name: str, old_obj_name: str, new_obj_name: str):
         # print("rename cls_name={} old_obj_name={} new_obj_name={}".format(cls_name, old_obj_name, new_obj_name))
         self.soi_objects[cls_name][new_obj_name] = self.soi_objects[cls_name][old_obj_name]
@@ -142,6 +145,23 @@ class SOIDependenceGraph:
         node = self.dg.insert_node()
         self.node_to_obj_key[node] = obj_key
 
+    def remove_obj_node_dg(self, obj_key: ObjectKey) -> list[AttributeKey]:
+        """ node is removed with its dependencies, returns attrib keys of objects depended on removed one """
+        node = self.obj_key_to_node[obj_key]
+        inf_ni_s = self.dg.inf_ni_s
+        child_attr_keys = []
+        for ni in node.ni_s:
+            for link in ni.links:
+                if link.opposite_ni(ni) in inf_ni_s:
+                    continue
+                attr_key = self.link_to_attribute_key.pop(link)
+                if ni is node.ni_nd:
+                    child_attr_keys.append(attr_key)
+                self.dg.disconnect_inf_handling(*link.ni_s)
+        self.dg.remove_node(node)
+        self.node_to_obj_key.pop(node)
+        return child_attr_keys
+
     def rectify_dg(self) -> list[ObjectKey]:
         nodes: list[PolarNode] = list(flatten(self.dg.longest_coverage()))[1:]  # without Global CS
         return [self.node_to_obj_key[node] for node in nodes]
@@ -176,6 +196,7 @@ class SOIDependenceGraph:
 
     def remove_dependence(self, attr_key: AttributeKey) -> tuple[ObjectKey, ObjectKey]:
         link = self.attribute_key_to_link[attr_key]
+        self.link_to_attribute_key.pop(link)
         ni_1, ni_2 = link.ni_s
         parent_node, child_node = (ni_1.pn, ni_2.pn) if ni_1.end == "nd" else (ni_2.pn, ni_1.pn)
         self.dg.disconnect_inf_handling(*link.ni_s)
@@ -1,11 +1,12 @@
 from collections import OrderedDict
+from typing import Optional
 import os
-import pandas as pd
 
 from soi_objects import StationObjectImage, AttributeEvaluateError
 from default_ordered_dict import DefaultOrderedDict
 from form_exception_message import form_message_from_error
 from attribute_object_key import AttributeKey
+from files_operations import iter_config_records, station_config_file
 
 
 class ReadFileNameError(Exception):
@@ -24,15 +25,15 @@ class RFAttributeError(ReadFileNameError):
     pass
 
 
-def read_station_config(dir_name: str) -> DefaultOrderedDict[str, OrderedDict[str, StationObjectImage]]:
+def read_station_config(dir_name: str, max_workers: Optional[int] = None) -> \
+        DefaultOrderedDict[str, OrderedDict[str, StationObjectImage]]:
     result: DefaultOrderedDict[str, OrderedDict[str, StationObjectImage]] = DefaultOrderedDict(OrderedDict)
     folder = os.path.join(os.getcwd(), dir_name)
-    for cls in StationObjectImage.__subclasses__():
+    classes = StationObjectImage.__subclasses__()
+    files = [station_config_file(folder, cls.__name__.replace("SOI", "")) for cls in classes]
+    for cls, obj_dict_list in zip(classes, iter_config_records(files, max_workers)):
         cls_name_soi = cls.__name__
         cls_name_del_soi = cls_name_soi.replace("SOI", "")
-        file = os.path.join(folder, "{}.xlsx".format(cls_name_del_soi))
-        df: pd.DataFrame = pd.read_excel(file, dtype=str, keep_default_na=False)
-        obj_dict_list: list[OrderedDict[str, str]] = df.to_dict('records', OrderedDict)
         for obj_dict in obj_dict_list:
             new_obj = cls()
             assert "name" in obj_dict, "No column 'name'"
@@ -62,6 +63,8 @@ def read_station_config(dir_name: str) -> DefaultOrderedDict[str, OrderedDict[st
 
 def make_xlsx_templates(dir_name: str):
     # needs to reimplement because of absence of enum values
+    import pandas as pd
+
     folder = os.path.join(os.getcwd(), dir_name)
     for cls in StationObjectImage.__subclasses__():
         name_soi = cls.__name__
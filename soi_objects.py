@@ -1,8 +1,9 @@
 from __future__ import annotations
-from typing import Type, Union, Iterable, Any, Optional
+from typing import Type, Union, Iterable, Any, Optional, Mapping
 from collections import OrderedDict
 from copy import copy
-from dataclasses import dataclass
+from dataclasses import dataclass, field
+from types import MappingProxyType
 
 from custom_enum import CustomEnum
 from enums_images import CEDependence, CEBool, CEAxisCreationMethod, CEAxisOrLine, CELightRouteType, CELightStickType, \
@@ -139,6 +140,7 @@ class EnumDescriptor(UniversalDescriptor):
             self._possible_values = []
         else:
             self._possible_values = possible_values
+        self._possible_values_set = frozenset(self._possible_values)
 
     @property
     def possible_values(self) -> list[str]:
@@ -147,9 +149,14 @@ class EnumDescriptor(UniversalDescriptor):
     @possible_values.setter
     def possible_values(self, values: Iterable[str]):
         self._possible_values = list(values)
+        self._possible_values_set = frozenset(self._possible_values)
+
+    @property
+    def possible_values_set(self) -> frozenset[str]:
+        return self._possible_values_set
 
     def handling_ap(self, new_str_value: str) -> str:
-        if new_str_value not in self.possible_values:
+        if new_str_value not in self.possible_values_set:
             raise AEEnumValueAttributeError("Value '{}' not in possible list: '{}'".format(new_str_value,
                                                                                            self.possible_values))
         return new_str_value
@@ -247,43 +254,96 @@ class NameDescriptor(UniversalDescriptor):
         return candid_name
 
 
+@dataclass(frozen=True)
+class AttributeSchema:
+    name: str
+    descriptor: UniversalDescriptor
+    is_list: bool
+    is_object: bool
+    is_required: bool
+    min_count: int
+    exact_count: int
+    immutable: bool
+    possible_values: Optional[frozenset[str]] = None
+    # indexes of single attributes of new object: one -1 for not list, else min or exact count
+    initial_indexes: tuple[int, ...] = (-1,)
+
+
+@dataclass(frozen=True)
+class ClassSchema:
+    attr_names: tuple[str, ...]
+    attributes: tuple[AttributeSchema, ...]
+    list_attr_names: tuple[str, ...]
+    attribute_by_name: Mapping[str, AttributeSchema] = field(compare=False)
+
+    def get_attribute(self, attr_name: str) -> AttributeSchema:
+        if attr_name not in self.attribute_by_name:
+            raise NotFoundComplexAttrError("Attr '{}' not found in object".format(attr_name))
+        return self.attribute_by_name[attr_name]
+
+
+def compile_class_schema(cls: Type[StationObjectImage]) -> ClassSchema:
+    """ descriptors of class are reflected once in order of class definition """
+    attributes = []
+    attribute_by_name = {}
+    for attr_name in [key for key in cls.__dict__.keys() if not key.startswith("__")]:
+        descriptor: UniversalDescriptor = cls.__dict__[attr_name]
+        possible_values = descriptor.possible_values_set if isinstance(descriptor, EnumDescriptor) else None
+        initial_indexes = tuple(range(max(descriptor.min_count, 0) + max(descriptor.exact_count, 0))) \
+            if descriptor.is_list else (-1,)
+        attributes.append(AttributeSchema(attr_name, descriptor, descriptor.is_list,
+                                          isinstance(descriptor, StationObjectDescriptor), descriptor.is_required,
+                                          descriptor.min_count, descriptor.exact_count, descriptor.immutable,
+                                          possible_values, initial_indexes))
+        attribute_by_name[attr_name] = attributes[-1]
+    return ClassSchema(tuple(attr_schema.name for attr_schema in attributes), tuple(attributes),
+                       tuple(attr_schema.name for attr_schema in attributes if attr_schema.is_list),
+                       MappingProxyType(attribute_by_name))
+
+
+def single_attrs_by_index(single_attr_list: Iterable[SingleAttribProperties]) -> \
+        dict[int, Optional[SingleAttribProperties]]:
+    """ repeated index is mapped to None """
+    result: dict[int, Optional[SingleAttribProperties]] = {}
+    for single_attr in single_attr_list:
+        result[single_attr.index] = None if single_attr.index in result else single_attr
+    return result
+
+
 class StationObjectImage:
     # name = ""
+    _class_schemas: dict[type, ClassSchema] = {}
 
     def __init__(self):
         self.object_prop_struct: ObjectProperties = ObjectProperties()
+        self._complex_attr_by_name: dict[str, ComplexAttribProperties] = {}
+        self._single_attr_by_index: dict[str, dict[int, Optional[SingleAttribProperties]]] = {}
         self.init_list_descriptors()
         self.init_object_prop_struct()
 
+    @classmethod
+    def schema(cls) -> ClassSchema:
+        if cls not in StationObjectImage._class_schemas:
+            StationObjectImage._class_schemas[cls] = compile_class_schema(cls)
+        return StationObjectImage._class_schemas[cls]
+
     def init_object_prop_struct(self):
-        obj_prop = self.object_prop_struct
-        cls = self.__class__
-        for attr_name in [key for key in cls.__dict__.keys() if not key.startswith("__")]:
-            complex_attr = ComplexAttribProperties()
-            obj_prop.attrib_list.append(complex_attr)
-            descriptor: UniversalDescriptor = getattr(cls, attr_name)
-            complex_attr.name = attr_name
-            complex_attr.is_list = descriptor.is_list
-            complex_attr.is_object = isinstance(descriptor, StationObjectDescriptor)
-            complex_attr.min_count = descriptor.min_count
-            complex_attr.exact_count = descriptor.exact_count
-            complex_attr.immutable = descriptor.immutable
-            if complex_attr.is_list:
-                if complex_attr.min_count != -1:
-                    for index in range(complex_attr.min_count):
-                        self.append_complex_attr_index(attr_name)
-                if complex_attr.exact_count != -1:
-                    for index in range(complex_attr.exact_count):
-                        self.append_complex_attr_index(attr_name)
-            else:
-                self.append_complex_attr_index(attr_name)
+        """ attribute properties are stamped from class schema, lookup maps are kept alongside lists """
+        attrib_list = self.object_prop_struct.attrib_list
+        for attr_schema in self.schema().attributes:
+            indexes = attr_schema.initial_indexes
+            single_attr_list = [SingleAttribProperties(index=index) for index in indexes]
+            complex_attr = ComplexAttribProperties(
+                name=attr_schema.name, is_list=attr_schema.is_list, is_object=attr_schema.is_object,
+                exact_count=attr_schema.exact_count, min_count=attr_schema.min_count,
+                immutable=attr_schema.immutable, single_attr_list=single_attr_list)
+            attrib_list.append(complex_attr)
+            self._complex_attr_by_name[attr_schema.name] = complex_attr
+            self._single_attr_by_index[attr_schema.name] = single_attrs_by_index(single_attr_list)
 
     def init_list_descriptors(self):
-        cls = self.__class__
-        for attr_name in [key for key in cls.__dict__.keys() if not key.startswith("__")]:
-            descriptor: UniversalDescriptor = getattr(cls, attr_name)
-            if descriptor.is_list:
-                setattr(self, "_{}".format(attr_name), [])
+        for attr_name in self.schema().list_attr_names:
+            setattr(self, "_{}".format(attr_name), [])
 
     def append_complex_attr_index(self, attr_name: str):
         complex_attr = self.get_complex_attr_prop(attr_name)
@@ -295,34 +355,30 @@ class StationObjectImage:
             assert not complex_attr.single_attr_list
             single_attr.index = -1
             complex_attr.single_attr_list.append(single_attr)
+        single_attr_by_index = self._single_attr_by_index[attr_name]
+        single_attr_by_index[single_attr.index] = None if single_attr.index in single_attr_by_index else single_attr
 
     def remove_complex_attr_index(self, attr_name: str, index: int):
         complex_attr = self.get_complex_attr_prop(attr_name)
         complex_attr.single_attr_list.pop(index)
+        self._single_attr_by_index[attr_name] = single_attrs_by_index(complex_attr.single_attr_list)
 
     def remove_descriptor_index(self, attr_name: str, index: int):
         setattr(self, attr_name, ("", IndexManagementCommand(command="remove_index", index=index)))
 
     def get_complex_attr_prop(self, attr_name: str) -> ComplexAttribProperties:
-        result_list = []
-        for complex_attr_prop_candidate in self.object_prop_struct.attrib_list:
-            if complex_attr_prop_candidate.name == attr_name:
-                result_list.append(complex_attr_prop_candidate)
-        if not result_list:
+        if attr_name not in self._complex_attr_by_name:
             raise NotFoundComplexAttrError("Attr '{}' not found in object".format(attr_name))
-        if len(result_list) > 1:
-            raise ManyFoundComplexAttrError("More then 1 '{}' found in object".format(attr_name))
-        return result_list.pop()
+        return self._complex_attr_by_name[attr_name]
 
     def get_single_attr_prop(self, attr_name: str, index: int = -1) -> SingleAttribProperties:
-        result_list = []
-        complex_attr_prop = self.get_complex_attr_prop(attr_name)
-        for single_attr_prop_candidate in complex_attr_prop.single_attr_list:
-            if single_attr_prop_candidate.index == index:
-                result_list.append(single_attr_prop_candidate)
-        assert result_list, "Attr not found"
-        assert len(result_list) < 2, "More then 1 found"
-        return result_list.pop()
+        single_attr_by_index = self._single_attr_by_index.get(attr_name)
+        if single_attr_by_index is None:
+            raise NotFoundComplexAttrError("Attr '{}' not found in object".format(attr_name))
+        assert index in single_attr_by_index, "Attr not found"
+        if single_attr_by_index[index] is None:
+            raise ManyFoundComplexAttrError("More then 1 found for attr '{}' index {}".format(attr_name, index))
+        return single_attr_by_index[index]
 
     @property
     def active_complex_attrs(self) -> list[ComplexAttribProperties]:
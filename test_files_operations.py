@@ -0,0 +1,128 @@
+import json
+import os
+import shutil
+
+import pytest
+from openpyxl import Workbook
+
+import config_cache
+from config_cache import ConfigRecordsCache, config_cache_file_name
+from files_operations import read_station_config_values, convert_station_config, write_station_config, \
+    iter_config_rows, use_process_pool, RFGetComplexAttrError, WFOtherFormatFileError
+
+STATION_IN_CONFIG = os.path.join(os.path.dirname(os.path.abspath(__file__)), "station_in_config")
+
+
+@pytest.fixture
+def user_cache(tmp_path, monkeypatch):
+    monkeypatch.setenv("LOCALAPPDATA", str(tmp_path / "user_cache"))
+    monkeypatch.setenv("XDG_CACHE_HOME", str(tmp_path / "user_cache"))
+    return tmp_path / "user_cache"
+
+
+def write_xlsx(file_name: str, rows: list[list]):
+    workbook = Workbook()
+    worksheet = workbook.active
+    for row in rows:
+        worksheet.append(row)
+    workbook.save(file_name)
+
+
+def test_xlsx_records_as_pandas(tmp_path):
+    pd = pytest.importorskip("pandas")
+    file_name = str(tmp_path / "table.xlsx")
+    write_xlsx(file_name, [["name", "x", None, "y", "x", None],
+                           ["a", 1, 2.0, 2.5, True, None],
+                           [None] * 6,
+                           ["b", None, None, None, None, None, "out of header"],
+                           [" c ", "", None, None, None],
+                           [None] * 3])
+    expected = pd.read_excel(file_name, dtype=str, keep_default_na=False).to_dict('records')
+    assert [dict(record) for record in iter_config_rows(file_name)] == expected
+
+
+def test_xlsx_error_cell_is_nan(tmp_path):
+    pd = pytest.importorskip("pandas")
+    file_name = str(tmp_path / "table.xlsx")
+    workbook = Workbook()
+    workbook.active.append(["name", "x"])
+    workbook.active.append(["a", "#DIV/0!"])
+    workbook.active["B2"].data_type = "e"
+    workbook.save(file_name)
+    expected = pd.read_excel(file_name, dtype=str, keep_default_na=False).to_dict('records')
+    assert [dict(record) for record in iter_config_rows(file_name)] == \
+           [{column: str(value) for column, value in record.items()} for record in expected]
+
+
+@pytest.mark.parametrize("extension", [".csv", ".json"])
+def test_text_config_values_equal_xlsx(tmp_path, extension):
+    convert_station_config(STATION_IN_CONFIG, str(tmp_path), extension)
+    assert read_station_config_values(str(tmp_path), max_workers=1) == \
+           read_station_config_values(STATION_IN_CONFIG, max_workers=1)
+
+
+def test_cells_out_of_header_are_rejected(tmp_path):
+    convert_station_config(STATION_IN_CONFIG, str(tmp_path), ".json")
+    with open(tmp_path / "Light.json", 'r', encoding='utf-8') as in_file:
+        document = json.load(in_file)
+    document["rows"][1] += ["", "out of header"]
+    with open(tmp_path / "Light.json", 'w', encoding='utf-8') as out_file:
+        json.dump(document, out_file)
+    with pytest.raises(RFGetComplexAttrError, match="Unnamed: 6"):
+        read_station_config_values(str(tmp_path), max_workers=1)
+
+
+def test_use_process_pool():
+    assert not use_process_pool(None, 8, 100, 1000)
+    assert use_process_pool(None, 8, 1000, 1000)
+    assert use_process_pool(4, 8, 100, 1000)
+    assert not use_process_pool(1, 8, 1000, 1000)
+    assert not use_process_pool(4, 1, 1000, 1000)
+
+
+def test_process_pool_reading_equals_sequential(tmp_path):
+    convert_station_config(STATION_IN_CONFIG, str(tmp_path), ".csv")
+    assert read_station_config_values(str(tmp_path), max_workers=2) == \
+           read_station_config_values(str(tmp_path), max_workers=1)
+
+
+def test_cache_is_versioned_json_in_user_cache_folder(tmp_path, user_cache, monkeypatch):
+    config_folder = tmp_path / "config"
+    convert_station_config(STATION_IN_CONFIG, str(config_folder), ".csv")
+    config_files = sorted(os.listdir(config_folder))
+    values = read_station_config_values(str(config_folder), max_workers=1, use_cache=True)
+    assert sorted(os.listdir(config_folder)) == config_files
+
+    cache_file_name = config_cache_file_name(str(config_folder))
+    assert os.path.dirname(cache_file_name) == str(user_cache / config_cache.CONFIG_CACHE_FOLDER_NAME)
+    with open(cache_file_name, 'r', encoding='utf-8') as in_file:
+        assert json.load(in_file)["version"] == config_cache.CONFIG_CACHE_VERSION
+    cache = ConfigRecordsCache(cache_file_name)
+    assert len(cache) == len(config_files)
+    assert read_station_config_values(str(config_folder), max_workers=1, use_cache=True) == values
+
+    monkeypatch.setattr(config_cache, "CONFIG_CACHE_VERSION", config_cache.CONFIG_CACHE_VERSION + 1)
+    assert len(ConfigRecordsCache(cache_file_name)) == 0
+
+
+def test_cache_entry_of_changed_file_is_not_used(tmp_path, user_cache):
+    config_folder = tmp_path / "config"
+    convert_station_config(STATION_IN_CONFIG, str(config_folder), ".csv")
+    read_station_config_values(str(config_folder), max_workers=1, use_cache=True)
+    light_file = config_folder / "Light.csv"
+    light_file.write_text(light_file.read_text(encoding='utf-8').replace("mast", "dwarf", 1), encoding='utf-8')
+    values = read_station_config_values(str(config_folder), max_workers=1, use_cache=True)
+    assert values == read_station_config_values(str(config_folder), max_workers=1)
+    assert "dwarf" in [obj_values["light_stick_type"] for obj_values in values["Light"].values()]
+
+
+def test_write_station_config_refuses_other_format_files(tmp_path):
+    config_folder = tmp_path / "config"
+    shutil.copytree(STATION_IN_CONFIG, config_folder)
+    config_files = sorted(os.listdir(config_folder))
+    cls_rows = {"Light": (["name"], [["N"]])}
+    with pytest.raises(WFOtherFormatFileError, match="Light.xlsx"):
+        write_station_config(str(config_folder), cls_rows, ".csv")
+    with pytest.raises(WFOtherFormatFileError):
+        convert_station_config(STATION_IN_CONFIG, str(config_folder), ".json")
+    assert sorted(os.listdir(config_folder)) == config_files
@@ -0,0 +1,102 @@
+import math
+
+import numpy as np
+import pytest
+
+from graphical_object import Point2D, Angle, Line2D, LinesAngleIndex, EquivalentLinesException, \
+    ParallelLinesException, lines_intersection, bezier_arc_lengths, bezier_params_by_x
+from nv_config import ANGLE_EQUAL_EVAL_PRECISION, COORD_EQUAL_PRECISION
+
+
+def parabola_arc_length(a: float, h: float) -> float:
+    """ length of y = h*(1 - x**2/a**2) on [-a, a] """
+    k = 2*h/a**2
+    return a*math.sqrt(1 + (k*a)**2) + math.asinh(k*a)/k
+
+
+def test_straight_segment_arc_lengths():
+    pnts_1 = np.array([[0., 0.], [0., 0.]])
+    pnts_2 = np.array([[3., 4.], [3., 4.]])
+    pnts_control = 0.5*(pnts_1 + pnts_2)
+    lengths = bezier_arc_lengths(pnts_1, pnts_2, pnts_control, np.array([0., 0.25]), np.array([1., 0.75]))
+    assert np.allclose(lengths, [5., 2.5], rtol=0., atol=1e-9)
+    # x is linear by t on straight segment
+    assert np.allclose(bezier_params_by_x(pnts_1[:, 0], pnts_2[:, 0], pnts_control[:, 0], np.array([0., 2.25])),
+                       [0., 0.75])
+
+
+def test_symmetric_parabola_arc_lengths():
+    a, h = 100., 25.
+    pnts_1 = np.array([[-a, 0.]]*3)
+    pnts_2 = np.array([[a, 0.]]*3)
+    pnts_control = np.array([[0., 2*h]]*3)
+    t_begin = bezier_params_by_x(pnts_1[:, 0], pnts_2[:, 0], pnts_control[:, 0], np.array([-a, -a, 0.]))
+    t_end = bezier_params_by_x(pnts_1[:, 0], pnts_2[:, 0], pnts_control[:, 0], np.array([a, 0., a]))
+    assert np.allclose(t_begin, [0., 0., 0.5]) and np.allclose(t_end, [1., 0.5, 1.])
+    full_length, left_length, right_length = bezier_arc_lengths(pnts_1, pnts_2, pnts_control, t_begin, t_end)
+    assert math.isclose(full_length, parabola_arc_length(a, h), rel_tol=1e-6)
+    assert math.isclose(left_length, right_length, rel_tol=1e-12)
+    assert math.isclose(left_length + right_length, full_length, rel_tol=1e-6)
+    # arc is longer than chord
+    assert full_length > 2*a
+
+
+def line_by_angle(angle: float, y: float) -> Line2D:
+    return Line2D(Point2D(0., y), angle=Angle(angle))
+
+
+def are_equivalent(line_1: Line2D, line_2: Line2D) -> bool:
+    try:
+        lines_intersection(line_1, line_2)
+    except EquivalentLinesException:
+        return True
+    except ParallelLinesException:
+        return False
+    return False
+
+
+def index_finds_equivalent(lines: list[Line2D], new_line: Line2D) -> bool:
+    index = LinesAngleIndex()
+    for line in lines:
+        index.append_line(line)
+    try:
+        index.check_new_line(new_line)
+    except EquivalentLinesException:
+        return True
+    return False
+
+
+@pytest.mark.parametrize("base_angle", [0., 0.3, math.pi/2 - 0.01])
+@pytest.mark.parametrize("bucket_shift", [0.5, 0.49, 0.51])
+def test_lines_index_angle_bucket_boundary(base_angle, bucket_shift):
+    """ angles near boundary of angle buckets are in neighbour buckets """
+    boundary = (round(base_angle / ANGLE_EQUAL_EVAL_PRECISION) + bucket_shift) * ANGLE_EQUAL_EVAL_PRECISION
+    for delta_1, delta_2 in [(-0.45, 0.45), (-0.05, 0.9), (0.05, -0.9), (-0.6, 0.6)]:
+        line_1 = line_by_angle(boundary + delta_1*ANGLE_EQUAL_EVAL_PRECISION, 10.)
+        line_2 = line_by_angle(boundary + delta_2*ANGLE_EQUAL_EVAL_PRECISION, 10.)
+        assert index_finds_equivalent([line_1], line_2) == are_equivalent(line_1, line_2)
+        assert index_finds_equivalent([line_2], line_1) == are_equivalent(line_2, line_1)
+
+
+@pytest.mark.parametrize("angle", [0., 0.3, -1.2])
+@pytest.mark.parametrize("bucket_shift", [0.5, -0.5, 1.5, 0.499])
+def test_lines_index_intercept_bucket_boundary(angle, bucket_shift):
+    """ intercepts nearer than coordinate precision are in neighbour buckets """
+    y_boundary = 1000. + bucket_shift*COORD_EQUAL_PRECISION
+    for delta_1, delta_2 in [(-0.45, 0.45), (-0.01, 0.98), (0.01, -0.98), (-0.55, 0.55), (0., 1.)]:
+        line_1 = line_by_angle(angle, y_boundary + delta_1*COORD_EQUAL_PRECISION)
+        line_2 = line_by_angle(angle, y_boundary + delta_2*COORD_EQUAL_PRECISION)
+        assert index_finds_equivalent([line_1], line_2) == are_equivalent(line_1, line_2)
+        assert index_finds_equivalent([line_2], line_1) == are_equivalent(line_2, line_1)
+
+
+def test_lines_index_equals_pairwise_check():
+    rng = np.random.default_rng(7)
+    base_lines = [line_by_angle(angle, y) for angle, y in zip(rng.uniform(-1.5, 1.5, 20), rng.uniform(-50, 50, 20))]
+    for base_line in base_lines:
+        for _ in range(20):
+            angle_delta, y_delta = rng.uniform(-2., 2., 2)
+            new_line = line_by_angle(base_line.angle.angle_mpi2_ppi2 + angle_delta*ANGLE_EQUAL_EVAL_PRECISION,
+                                     base_line.pnt.y + y_delta*COORD_EQUAL_PRECISION)
+            assert index_finds_equivalent(base_lines, new_line) == \
+                   any(are_equivalent(line, new_line) for line in base_lines)
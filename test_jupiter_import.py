@@ -0,0 +1,68 @@
+import os
+
+import pytest
+
+from files_operations import read_config_columns, read_config_records
+from jupiter_import import JupiterStation, import_jupiter_station
+
+JUPITER_DIR = os.path.join(os.path.dirname(os.path.abspath(__file__)), "jupiter")
+
+
+@pytest.fixture(scope="module")
+def station_rows():
+    return JupiterStation(JUPITER_DIR).station_config_rows()
+
+
+def rows_by_name(cls_rows, cls_name: str) -> dict[str, list[str]]:
+    _, rows = cls_rows[cls_name]
+    return {row[0]: row for row in rows}
+
+
+def test_known_records(station_rows):
+    # BASEPOINTS: Point_Link_Obuh_Kirov_2;;FieldCoord( 'PK_117+00', CoordinateSystem_Picket_AB );GroundLine_3_Put
+    assert rows_by_name(station_rows, "Point")["Point_Link_Obuh_Kirov_2"] == \
+           ["Point_Link_Obuh_Kirov_2", "axis", "GroundLine_3_Put", "", "CoordinateSystem_Picket_AB", "PK_117+00"]
+    # BASELINES: Line_Kirov_2;Point_Link_Obuh_Kirov_2;Point_Link_Ribats_Kirov_2 and
+    # Line_3Put_Ribats;Point_Link_Ribats_Kirov_2;Point_Link_Ribats_Izori_3 are chained on GroundLine_3_Put
+    lines_rows = rows_by_name(station_rows, "Line")
+    assert lines_rows["Line_Kirov_2"] == ["Line_Kirov_2", "Point_Link_Obuh_Kirov_2 Point_Link_Ribats_Izori_3"]
+    assert "Line_3Put_Ribats" not in lines_rows
+    # BASEPOINTS: Point_s2;;FieldCoord(-883, CoordinateSystem_EC);Line_3Put_Ribats - line on axis
+    assert rows_by_name(station_rows, "Point")["Point_s2"] == \
+           ["Point_s2", "axis", "GroundLine_3_Put", "", "CoordinateSystem_EC", "-883"]
+    # LIGHTS: Light_M2;Point_M2;Point_M2;E_SigType.Man;E_Direct.Plus;[E_SigColor.B, E_SigColor.W]
+    assert rows_by_name(station_rows, "Light")["Light_M2"] == \
+           ["Light_M2", "shunt", "Point_4CHDP_4SP", "Point_s4", "blue white", "mast"]
+    # LIGHTS: Light_O_2_2;...;E_SigType.AB - block signal
+    assert "Light_O_2_2" not in rows_by_name(station_rows, "Light")
+    assert rows_by_name(station_rows, "Border")["Border_Link_Ribats_Kirov_2"] == \
+           ["Border_Link_Ribats_Kirov_2", "Point_Link_Ribats_Kirov_2", "ab"]
+    # fictive segment piece from its border to graph border on line
+    assert rows_by_name(station_rows, "Section")["IsolSegment_GroundRC"] == \
+           ["IsolSegment_GroundRC", "Point_33_37SP_GroundRC_19 Point_Link_Ribats_Tpk_19"]
+
+
+def test_axes_count_subset(station_rows):
+    subset_rows = JupiterStation(JUPITER_DIR, axes_count=5).station_config_rows()
+    assert len(subset_rows["Axis"][1]) == 5
+    assert 0 < len(subset_rows["Point"][1]) < len(station_rows["Point"][1])
+    for cls_name, (columns, rows) in subset_rows.items():
+        assert columns == station_rows[cls_name][0]
+    # sections on the edge of subset have less border points
+    for cls_name in ("Axis", "Point", "Line", "Light"):
+        full_rows = rows_by_name(station_rows, cls_name)
+        for row in subset_rows[cls_name][1]:
+            assert full_rows[row[0]] == row
+    points_names = set(rows_by_name(subset_rows, "Point"))
+    for row in subset_rows["Light"][1]:
+        assert {row[2], row[3]} <= points_names
+    for row in subset_rows["Section"][1]:
+        assert set(row[1].split()) <= points_names
+
+
+def test_import_writes_station_config(tmp_path):
+    cls_rows = import_jupiter_station(str(tmp_path), JUPITER_DIR, axes_count=5)
+    for cls_name, (columns, rows) in cls_rows.items():
+        file = str(tmp_path / "{}.csv".format(cls_name))
+        assert read_config_columns(file) == columns
+        assert [[record[column] for column in columns] for record in read_config_records(file)] == rows
@@ -0,0 +1,166 @@
+import json
+import os
+
+import pytest
+
+from attribute_object_key import ObjectKey
+from files_operations import convert_station_config, read_station_config_values, RFGetComplexAttrError
+from main_handler import MainHandler, ConfigChanges
+
+STATION_IN_CONFIG = os.path.join(os.path.dirname(os.path.abspath(__file__)), "station_in_config")
+
+
+@pytest.fixture(autouse=True)
+def user_cache(tmp_path, monkeypatch):
+    monkeypatch.setenv("LOCALAPPDATA", str(tmp_path / "user_cache"))
+    monkeypatch.setenv("XDG_CACHE_HOME", str(tmp_path / "user_cache"))
+
+
+@pytest.fixture
+def csv_config(tmp_path) -> str:
+    config_folder = str(tmp_path / "config")
+    convert_station_config(STATION_IN_CONFIG, config_folder, ".csv")
+    return config_folder
+
+
+def replace_in_file(file_name: str, old: str, new: str):
+    with open(file_name, 'r', encoding='utf-8', newline='') as in_file:
+        text = in_file.read()
+    assert old in text
+    with open(file_name, 'w', encoding='utf-8', newline='') as out_file:
+        out_file.write(text.replace(old, new, 1))
+
+
+def unordered_values(config_values) -> dict:
+    """ column order of dumped files is order of class descriptors """
+    return {cls_name: {obj_name: dict(obj_values) for obj_name, obj_values in objects_values.items()}
+            for cls_name, objects_values in config_values.items()}
+
+
+def test_dump_station_config_round_trip(tmp_path):
+    mh = MainHandler()
+    mh.read_station_config(STATION_IN_CONFIG)
+    config_values = unordered_values(read_station_config_values(STATION_IN_CONFIG, max_workers=1))
+    for extension in (".xlsx", ".csv", ".json"):
+        dump_folder = str(tmp_path / "dump{}".format(extension))
+        mh.dump_station_config(dump_folder, extension).result()
+        assert all(file_name.endswith(extension) for file_name in os.listdir(dump_folder))
+        assert unordered_values(read_station_config_values(dump_folder, max_workers=1)) == config_values
+
+
+def test_read_station_config_stage_reports(tmp_path):
+    mh = MainHandler()
+    mh.trace_file_name = str(tmp_path / "trace.json")
+    mh.read_station_config(STATION_IN_CONFIG)
+    assert list(mh.stage_reports) == ["config_read", "objects_load"]
+    assert mh.changed_common_status
+    assert mh.common_status.startswith("Objects successfully loaded from file [config_read ")
+    with open(mh.trace_file_name, 'r', encoding='utf-8') as trace_file:
+        events = json.load(trace_file)["traceEvents"]
+    assert [event["name"] for event in events] == ["config_read", "objects_load"]
+    assert all(event["ph"] == "X" for event in events)
+
+
+def routes_files(mh: MainHandler, routes_folder) -> dict[str, str]:
+    routes_folder.mkdir()
+    mh.eval_routes(str(routes_folder))
+    return {file_name: (routes_folder / file_name).read_text(encoding='utf-8')
+            for file_name in sorted(os.listdir(routes_folder))}
+
+
+def test_reload_without_changes(csv_config):
+    mh = MainHandler()
+    mh.read_station_config(csv_config)
+    assert mh.reload_station_config() == ConfigChanges()
+    assert list(mh.stage_reports) == ["config_read"]
+    assert mh.common_status.startswith("Station config not changed [config_read ")
+
+
+def test_reload_applies_changed_objects_and_builds_model(csv_config):
+    mh = MainHandler()
+    mh.read_station_config(csv_config)
+    replace_in_file(os.path.join(csv_config, "Light.csv"), "red yellow    ,", "red green,")
+
+    changes = mh.reload_station_config()
+    assert changes == ConfigChanges(modified=[ObjectKey("Light", "N")])
+    assert mh.soi_storage.soi_objects["Light"]["N"].get_complex_attr_prop("colors") \
+        .single_attr_list[1].last_input_str_value == "green"
+    assert len(mh.model_builder.names_mo["Light"]) == len(mh.soi_storage.soi_objects["Light"])
+    assert len(mh.model_builder.names_mo["Section"]) == len(mh.soi_storage.soi_objects["Section"])
+    assert list(mh.stage_reports)[:4] == ["config_read", "objects_apply", "rectify", "skeleton"]
+    assert mh.common_status.startswith("Station config reloaded [")
+    assert mh.reload_station_config() == ConfigChanges()
+
+
+def test_reload_of_equipment_keeps_skeleton(csv_config, tmp_path):
+    mh = MainHandler()
+    mh.read_station_config(csv_config)
+    mh.build_model()
+    smg = mh.model_builder.smg
+    points_mo = mh.model_builder.names_mo["Point"]
+    replace_in_file(os.path.join(csv_config, "Light.csv"), "N,train,Point_1,Point_4", "N,shunt,Point_1,Point_4")
+
+    assert mh.reload_station_config() == ConfigChanges(modified=[ObjectKey("Light", "N")])
+    assert list(mh.stage_reports) == ["config_read", "objects_apply", "rectify", "lights", "rail_points", "borders",
+                                      "sections"]
+    assert mh.model_builder.smg is smg
+    assert mh.model_builder.names_mo["Point"] is points_mo
+    assert mh.model_builder.names_mo["Light"]["N"].route_type == "shunt"
+
+    fresh_mh = MainHandler()
+    fresh_mh.read_station_config(csv_config)
+    fresh_mh.build_model()
+    assert routes_files(mh, tmp_path / "reloaded") == routes_files(fresh_mh, tmp_path / "fresh")
+
+
+def test_reload_with_model_build_error(csv_config):
+    mh = MainHandler()
+    mh.read_station_config(csv_config)
+    mh.build_model()
+    light_file = os.path.join(csv_config, "Light.csv")
+    replace_in_file(light_file, "N,train,Point_1,Point_4", "N,train,Point_1,Point_1")
+
+    assert mh.reload_station_config() == ConfigChanges(modified=[ObjectKey("Light", "N")])
+    assert mh.common_status.startswith("ERROR ('Direction point is equal to central point'")
+    assert "lights" not in mh.stage_reports
+    assert mh.reload_station_config() == ConfigChanges()
+
+    replace_in_file(os.path.join(csv_config, "Section.csv"), "NP,Point_1 Point_4", "NP,Point_4 Point_1")
+    assert mh.reload_station_config() == ConfigChanges(modified=[ObjectKey("Section", "NP")])
+    assert mh.common_status.startswith("ERROR ('Direction point is equal to central point'")
+
+    replace_in_file(light_file, "N,train,Point_1,Point_1", "N,train,Point_1,Point_4")
+    assert mh.reload_station_config() == ConfigChanges(modified=[ObjectKey("Light", "N")])
+    assert list(mh.stage_reports)[3:] == ["lights", "rail_points", "borders", "sections"]
+    assert len(mh.model_builder.names_mo["Light"]) == len(mh.soi_storage.soi_objects["Light"])
+    assert mh.common_status.startswith("Station config reloaded [")
+
+
+def test_failed_reload_is_repeated(csv_config):
+    mh = MainHandler()
+    mh.read_station_config(csv_config)
+    files_stats = mh.config_files_stats.copy()
+    light_file = os.path.join(csv_config, "Light.csv")
+    replace_in_file(light_file, "red yellow    ,mast", "red yellow,mast,,out of header")
+
+    with pytest.raises(RFGetComplexAttrError):
+        mh.reload_station_config()
+    assert mh.config_files_stats == files_stats
+
+    replace_in_file(light_file, "red yellow,mast,,out of header", "red green,mast")
+    assert mh.reload_station_config().modified == [ObjectKey("Light", "N")]
+
+
+def test_eval_routes_stage_reports(tmp_path):
+    mh = MainHandler()
+    mh.read_station_config(STATION_IN_CONFIG)
+    mh.build_model()
+    routes_folder = tmp_path / "routes"
+    routes_folder.mkdir()
+    mh.eval_routes(str(routes_folder))
+    assert list(mh.stage_reports) == ["route_eval", "xml_write"]
+    eval_report, write_report = mh.stage_reports.values()
+    assert eval_report.objects_count == write_report.objects_count == len(mh.model_builder.names_mo["Light"])
+    assert write_report.start == eval_report.start + eval_report.duration
+    assert mh.common_status.startswith("Routes evaluated [route_eval ")
+    assert sorted(os.listdir(routes_folder)) == ["ShuntingRoute.xml", "TrainRoute.xml"]
@@ -0,0 +1,63 @@
+import pytest
+
+from graphical_object import Point2D, BoundedCurve
+from mo_objects import SortedPoints, PointMO, AxisMO, LineMO
+
+
+def point_mo(name: str, x: float) -> PointMO:
+    point = PointMO(Point2D(x, 0))
+    point.name = name
+    return point
+
+
+@pytest.fixture
+def points() -> list[PointMO]:
+    return [point_mo("Point_{}".format(i), x) for i, x in enumerate([300, -100, 200, 0, 200])]
+
+
+def test_sorted_points_order(points):
+    sorted_points = SortedPoints(points)
+    assert [point.x for point in sorted_points] == [-100, 0, 200, 200, 300]
+    # points with equal x are kept in adding order
+    assert [point.name for point in sorted_points][2:4] == ["Point_2", "Point_4"]
+    assert sorted_points.index(points[4]) == 3
+    with pytest.raises(ValueError):
+        sorted_points.index(point_mo("Point_5", 200))
+
+
+def test_sorted_points_neighbours(points):
+    sorted_points = SortedPoints(points)
+    first_point, last_point = sorted_points[0], sorted_points[-1]
+    assert sorted_points.neighbours(-200) == (None, first_point)
+    assert sorted_points.neighbours(-100) == (None, sorted_points[1])
+    assert sorted_points.neighbours(400) == (last_point, None)
+    assert sorted_points.neighbours(300) == (sorted_points[3], None)
+    # points with given x are skipped
+    assert sorted_points.neighbours(200) == (sorted_points[1], last_point)
+    assert sorted_points.neighbours(100) == (sorted_points[1], sorted_points[2])
+    assert SortedPoints().neighbours(0) == (None, None)
+
+
+def test_sorted_points_between(points):
+    sorted_points = SortedPoints(points)
+    first_point, last_point = sorted_points[0], sorted_points[-1]
+    assert sorted_points.between(first_point, last_point) == list(sorted_points)
+    assert sorted_points.between(first_point, first_point) == [first_point]
+    assert sorted_points.between(last_point, last_point) == [last_point]
+    assert sorted_points.between(points[3], points[4]) == [points[3], points[2], points[4]]
+
+
+def test_points_are_copied(points):
+    axis = AxisMO(None)
+    line = LineMO([BoundedCurve(Point2D(-100, 0), Point2D(300, 0))], points[:2])
+    for point in points:
+        axis.append_point(point)
+    for model_object in (axis, line):
+        model_object_points = model_object.points
+        model_object_points.append(point_mo("Point_5", 1000))
+        model_object_points.reverse()
+        assert [point.x for point in model_object.points] == sorted(point.x for point in model_object.points)
+        assert len(model_object.points) == len(model_object_points) - 1
+    assert line.min_point is points[1] and line.max_point is points[0]
+    assert line.neighbour_points(0) == (points[1], points[0])
+    assert axis.points_between(points[3], points[0]) == [points[3], points[2], points[4], points[0]]
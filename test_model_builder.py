@@ -0,0 +1,242 @@
+import json
+import math
+import os
+import pickle
+
+import pytest
+
+from attribute_object_key import AttributeKey
+from cell_access_functions import element_cell_by_type
+from files_operations import convert_station_config
+from main_handler import MainHandler
+from model_builder import ModelBuilder, BuildStage, BUILD_PIPELINE, check_pipeline_order, MBEquipmentErrors, PointCell, \
+    LengthCell
+from mo_objects import PointMO
+from rail_route import route_record_values
+from route_cache import RouteCache, ROUTE_CACHE_VERSION
+from soi_objects import StationObjectImage
+from two_sided_graph import PicklableGraphCopy
+
+STATION_IN_CONFIG = os.path.join(os.path.dirname(os.path.abspath(__file__)), "station_in_config")
+
+
+@pytest.fixture(autouse=True)
+def user_cache(tmp_path, monkeypatch):
+    monkeypatch.setenv("LOCALAPPDATA", str(tmp_path / "user_cache"))
+    monkeypatch.setenv("XDG_CACHE_HOME", str(tmp_path / "user_cache"))
+
+
+@pytest.fixture(scope="module")
+def station_images() -> list[StationObjectImage]:
+    """ storage images in dependence order as main handler passes them to model builder """
+    return config_images(STATION_IN_CONFIG)
+
+
+def config_images(config_folder: str) -> list[StationObjectImage]:
+    mh = MainHandler()
+    mh.read_station_config(config_folder)
+    return [mh.soi_storage.soi_objects[obj_key.cls_name][obj_key.obj_name]
+            for obj_key in mh.dependence_graph.rectify_dg()]
+
+
+def built_model(images: list[StationObjectImage], parallel_equipment_check: bool = False,
+                arc_link_length: bool = False) -> ModelBuilder:
+    model_builder = ModelBuilder()
+    model_builder.parallel_equipment_check = parallel_equipment_check
+    model_builder.arc_link_length = arc_link_length
+    model_builder.max_workers = 2
+    model_builder.init_soi_list(images)
+    model_builder.build_model()
+    return model_builder
+
+
+def changed_lights_images(tmp_path, replacements: list[tuple[str, str]]) -> list[StationObjectImage]:
+    """ images of station config in csv with replaced lines of light file """
+    config_folder = str(tmp_path / "config")
+    convert_station_config(STATION_IN_CONFIG, config_folder, ".csv")
+    light_file = os.path.join(config_folder, "Light.csv")
+    with open(light_file, 'r', encoding='utf-8', newline='') as in_file:
+        text = in_file.read()
+    for old, new in replacements:
+        assert old in text
+        text = text.replace(old, new, 1)
+    with open(light_file, 'w', encoding='utf-8', newline='') as out_file:
+        out_file.write(text)
+    return config_images(config_folder)
+
+
+def light_routes_values(model_builder: ModelBuilder) -> list[tuple[str, str, list[dict]]]:
+    return [(light_name, signal_type, [route_record_values(rail_route) for rail_route in routes])
+            for light_name, signal_type, routes, _ in model_builder.iter_light_routes()]
+
+
+def cells_values(element) -> list[tuple[str, dict]]:
+    return [(cell.__class__.__name__, vars(cell)) for cell in element.cell_objs]
+
+
+def graph_cells(model_builder: ModelBuilder) -> dict[str, list]:
+    """ cells of point nodes and of their moves in order, moves are found by point of opposite node,
+        active moves are not compared because skeleton activates them in sets order """
+    result = {}
+    for point_name, node in model_builder.point_nodes_snapshot().items():
+        moves_cells = []
+        for ni in node.ni_s:
+            for move in ni.moves:
+                opposite_cells = cells_values(move.link.opposite_ni(ni).pn)
+                moves_cells.append((ni.end_str, opposite_cells[:1], cells_values(move)))
+        result[point_name] = [cells_values(node), moves_cells]
+    return result
+
+
+def test_check_pipeline_order():
+    check_pipeline_order(BUILD_PIPELINE)
+    with pytest.raises(AssertionError, match="Stage lights depends"):
+        check_pipeline_order([BuildStage("lights", "build_lights", (), ("skeleton",)),
+                              BuildStage("skeleton", "build_skeleton")])
+
+
+def test_partition_images(station_images):
+    model_builder = ModelBuilder()
+    model_builder.init_soi_list(station_images)
+    assert list(model_builder.stage_images) == [stage.name for stage in BUILD_PIPELINE]
+    for stage in BUILD_PIPELINE:
+        assert model_builder.stage_images[stage.name] == \
+               [image for image in station_images if isinstance(image, stage.soi_classes)]
+
+
+def test_stage_reports_counts(station_images):
+    model_builder = built_model(station_images)
+    reports = model_builder.stage_reports
+    assert list(reports) == [stage.name for stage in BUILD_PIPELINE]
+    for stage in BUILD_PIPELINE:
+        assert reports[stage.name].images_count == len(model_builder.stage_images[stage.name])
+        assert reports[stage.name].duration >= 0.
+    for stage_name, cls_name in [("lights", "Light"), ("rail_points", "RailPoint"), ("borders", "Border"),
+                                 ("sections", "Section")]:
+        assert reports[stage_name].objects_count == len(model_builder.names_mo[cls_name]) > 0
+    assert reports["skeleton"].objects_count == \
+           sum(len(model_builder.names_mo[cls_name]) for cls_name in ("Axis", "Point", "Line")) + \
+           len(model_builder.names_mo["CoordinateSystem"]) - 1
+    assert reports["link_length"].objects_count == 0
+    assert [report.start for report in reports.values()] == sorted(report.start for report in reports.values())
+
+
+def test_parallel_equipment_checks_are_equal_to_serial(station_images):
+    serial_model = built_model(station_images)
+    parallel_model = built_model(station_images, parallel_equipment_check=True)
+    assert graph_cells(parallel_model) == graph_cells(serial_model)
+    for cls_name in ("Light", "RailPoint"):
+        assert [(name, vars(model_object)) for name, model_object in parallel_model.names_mo[cls_name].items()] == \
+               [(name, vars(model_object)) for name, model_object in serial_model.names_mo[cls_name].items()]
+
+
+@pytest.mark.parametrize("parallel_equipment_check", [False, True])
+def test_equipment_errors_of_all_lights(tmp_path, parallel_equipment_check):
+    images = changed_lights_images(tmp_path, [("N,train,Point_1,Point_4", "N,train,Point_1,Point_1"),
+                                              ("CH,train,Point_2,Point_9", "CH,train,Point_2,Point_2")])
+    light_names = [image.name for image in images if image.name in ("N", "CH")]
+
+    with pytest.raises(MBEquipmentErrors) as exc_info:
+        built_model(images, parallel_equipment_check)
+    assert exc_info.value.args[1] == [AttributeKey("LightSOI", name, "direct_point") for name in light_names]
+    assert [e.args[0] for e in exc_info.value.errors] == ["Direction point is equal to central point"] * 2
+
+
+def test_picklable_graph_copy(station_images):
+    model_builder = built_model(station_images)
+    graph_copy = PicklableGraphCopy(model_builder.smg)
+    unpickled_copy = pickle.loads(pickle.dumps(graph_copy))
+    assert len(unpickled_copy.graph.nodes) == len(model_builder.smg.nodes)
+    assert len(unpickled_copy.graph.links) == len(model_builder.smg.links)
+    for node, node_copy in zip(graph_copy.nodes, unpickled_copy.nodes):
+        assert cells_values(node_copy) == cells_values(node)
+        for ni, ni_copy in zip(node.ni_s, node_copy.ni_s):
+            assert [graph_copy.element_key(move) for move in ni.moves] == \
+                   [unpickled_copy.element_key(move) for move in ni_copy.moves]
+            assert [(move.active, cells_values(move)) for move in ni.moves] == \
+                   [(move.active, cells_values(move)) for move in ni_copy.moves]
+            assert graph_copy.element(unpickled_copy.element_key(ni_copy)) is ni
+    point_node = model_builder.point_nodes_snapshot()["Point_1"]
+    assert isinstance(point_node.cell_objs[0], PointCell)
+    assert graph_copy.element(graph_copy.element_key(point_node)) is point_node
+
+
+def test_route_cache_misses_only_changed_lights(tmp_path, station_images):
+    cache_file = str(tmp_path / "routes_cache.json")
+    model_builder = built_model(station_images)
+    model_builder.set_route_cache_file(cache_file)
+    routes_values = light_routes_values(model_builder)
+    tables = model_builder.precompute_route_tables()
+    light_fingerprints = {light_name: tables.light_fingerprint(light_node)
+                          for light_name, light_node in tables.light_nodes.items()}
+
+    # same station is read from cache file
+    model_builder.set_route_cache_file(cache_file)
+    assert light_routes_values(model_builder) == routes_values
+    assert (model_builder.route_cache.hits, model_builder.route_cache.misses) == (1 + len(light_fingerprints), 0)
+
+    # direction point of M4 is moved to other side of its center point
+    changed_images = changed_lights_images(tmp_path, [("M4,shunt,Point_14,Point_20", "M4,shunt,Point_14,Point_3")])
+    changed_model = built_model(changed_images)
+    changed_tables = changed_model.precompute_route_tables()
+    assert changed_tables.station_fingerprint() != tables.station_fingerprint()
+    changed_lights = [light_name for light_name, light_node in changed_tables.light_nodes.items()
+                      if changed_tables.light_fingerprint(light_node) != light_fingerprints[light_name]]
+    assert "M4" in changed_lights
+    assert len(changed_lights) < len(light_fingerprints)
+
+    changed_model.set_route_cache_file(cache_file)
+    changed_routes_values = light_routes_values(changed_model)
+    # station key and keys of changed lights are missed
+    assert changed_model.route_cache.misses == 1 + len(changed_lights)
+    assert changed_model.route_cache.hits == len(light_fingerprints) - len(changed_lights)
+    changed_model.route_cache = None
+    assert light_routes_values(changed_model) == changed_routes_values
+
+
+def test_route_cache_of_other_version_is_not_read(tmp_path):
+    cache_file = str(tmp_path / "routes_cache.json")
+    route_cache = RouteCache(cache_file)
+    route_cache.put("station_key", {"N": "light_key"})
+    route_cache.save()
+    assert RouteCache(cache_file).get("station_key") == {"N": "light_key"}
+    with open(cache_file, 'r', encoding='utf-8') as in_file:
+        document = json.load(in_file)
+    document["version"] = ROUTE_CACHE_VERSION + 1
+    with open(cache_file, 'w', encoding='utf-8') as out_file:
+        json.dump(document, out_file)
+    assert len(RouteCache(cache_file)) == 0
+
+
+def links_lengths(model_builder: ModelBuilder) -> dict[tuple[str, str], tuple[float, PointMO, PointMO]]:
+    result = {}
+    for link in model_builder.smg.not_inf_links:
+        point_1, point_2 = [model_builder.names_mo["Point"][element_cell_by_type(ni.pn, PointCell).name]
+                            for ni in link.ni_s]
+        result[(point_1.name, point_2.name)] = (element_cell_by_type(link, LengthCell).length, point_1, point_2)
+    return result
+
+
+def test_link_length_by_x(station_images):
+    lengths = links_lengths(built_model(station_images))
+    assert lengths
+    for length, point_1, point_2 in lengths.values():
+        assert length == abs(point_1.x - point_2.x)
+
+
+def test_arc_link_length(station_images):
+    lengths = links_lengths(built_model(station_images, arc_link_length=True))
+    x_lengths = links_lengths(built_model(station_images))
+    assert lengths.keys() == x_lengths.keys()
+    for points_names, (length, point_1, point_2) in lengths.items():
+        chord_length = math.dist(point_1.point2D.coords, point_2.point2D.coords)
+        assert length >= chord_length - 1e-9
+        assert length >= x_lengths[points_names][0] - 1e-9
+    # link of axis points out of lines is straight, link on curve of Line_4 is longer than its chord
+    for points_names, is_curve in [(("Point_18", "Point_7"), False), (("Point_17", "Point_10"), True)]:
+        if points_names not in lengths:
+            points_names = points_names[::-1]
+        length, point_1, point_2 = lengths[points_names]
+        chord_length = math.dist(point_1.point2D.coords, point_2.point2D.coords)
+        assert (length > chord_length + 1e-3) == is_curve
+        assert math.isclose(length, chord_length) or is_curve
@@ -0,0 +1,79 @@
+import json
+
+import pytest
+
+from rail_route import RailRouteRecord
+from route_table_formation import ROUTE_TABLE_COLUMNS, tee_route_tables, read_route_table
+
+
+def route_record(id_: int, route_type: str, tag: str, begin: str, points: str, end: str,
+                 end_selectors: str = None) -> RailRouteRecord:
+    route = RailRouteRecord(id_)
+    route.route_type = route_type
+    route.route_tag = tag
+    route.trace_begin = begin
+    route.trace_points = points
+    route.trace_end = end
+    route.end_selectors = end_selectors
+    return route
+
+
+def signals_routes() -> list[tuple[str, str, list[RailRouteRecord]]]:
+    return [
+        ("Н1", "PpoTrainSignal", [route_record(1, "PpoTrainRoute", "Н1_Ч2", "Н1", "+12 -3", "Ч2", "Ч2 М4"),
+                                  route_record(2, "PpoShuntingRoute", "Н1_М4", "Н1", "", "М4")]),
+        ("M2", "PpoShuntingSignal", []),
+        ("ЧМ«5»", "PpoShuntingSignal", [route_record(3, "PpoShuntingRoute", "ЧМ«5»_Н1", "ЧМ«5»", "-12", "Н1")]),
+    ]
+
+
+def written_tables(tmp_path, signals: list[tuple]) -> tuple[list, str, str]:
+    table_file, json_lines_file = str(tmp_path / "routes.rtbl"), str(tmp_path / "routes.jsonl")
+    passed_signals = list(tee_route_tables(signals, [table_file, json_lines_file]))
+    return passed_signals, table_file, json_lines_file
+
+
+def test_route_table_round_trip(tmp_path):
+    signals = signals_routes()
+    passed_signals, table_file, json_lines_file = written_tables(tmp_path, signals)
+    assert passed_signals == signals
+    rows = [[getter(light_name, signal_type, route) for _, _, getter in ROUTE_TABLE_COLUMNS]
+            for light_name, signal_type, routes in signals for route in routes]
+    assert len(rows) == 3
+    # trace points are padded by normalization as in route xml
+    assert rows[0][6] == "+12 -3 "
+
+    table = read_route_table(table_file)
+    assert list(table) == [column_name for column_name, _, _ in ROUTE_TABLE_COLUMNS]
+    # None is written to binary table as empty string
+    assert [list(row) for row in zip(*table.values())] == \
+           [["" if value is None else value for value in row] for row in rows]
+    assert table["signal"] == ["Н1", "Н1", "ЧМ«5»"]
+
+    with open(json_lines_file, 'r', encoding='utf-8') as in_file:
+        json_rows = [json.loads(line) for line in in_file]
+    assert [list(json_row) for json_row in json_rows] == [list(table)] * 3
+    assert [list(json_row.values()) for json_row in json_rows] == rows
+
+
+@pytest.mark.parametrize("signals", [[], [("M2", "PpoShuntingSignal", [])]])
+def test_empty_route_table_round_trip(tmp_path, signals):
+    passed_signals, table_file, json_lines_file = written_tables(tmp_path, signals)
+    assert passed_signals == signals
+    table = read_route_table(table_file)
+    assert list(table) == [column_name for column_name, _, _ in ROUTE_TABLE_COLUMNS]
+    assert all(values == [] for values in table.values())
+    with open(json_lines_file, 'r', encoding='utf-8') as in_file:
+        assert in_file.read() == ""
+
+
+def test_failed_stream_does_not_replace_tables(tmp_path):
+    _, table_file, json_lines_file = written_tables(tmp_path, signals_routes())
+    with open(table_file, 'rb') as in_file:
+        table_data = in_file.read()
+    bad_route = route_record(4, "NotRoute", "Н1_Ч2", "Н1", "", "Ч2")
+    with pytest.raises(AssertionError, match="Not valid route type"):
+        written_tables(tmp_path, [("Н1", "PpoTrainSignal", [bad_route])])
+    with open(table_file, 'rb') as in_file:
+        assert in_file.read() == table_data
+    assert sorted(path.name for path in tmp_path.iterdir()) == ["routes.jsonl", "routes.rtbl"]
@@ -0,0 +1,70 @@
+import pytest
+
+from soi_objects import StationObjectImage, LightSOI, LineSOI, SectionSOI, EnumDescriptor, \
+    NotFoundComplexAttrError, ManyFoundComplexAttrError, ComplexAttrError
+
+
+@pytest.mark.parametrize("cls", StationObjectImage.__subclasses__())
+def test_schema_is_stamped_to_object(cls):
+    schema = cls.schema()
+    assert schema is cls.schema()
+    assert hash(schema) == hash(cls.schema())
+    assert schema.attr_names == tuple(key for key in cls.__dict__ if not key.startswith("__"))
+    obj = cls()
+    assert [complex_attr.name for complex_attr in obj.object_prop_struct.attrib_list] == list(schema.attr_names)
+    for attr_schema, complex_attr in zip(schema.attributes, obj.object_prop_struct.attrib_list):
+        assert complex_attr.is_list == attr_schema.is_list
+        assert tuple(single_attr.index for single_attr in complex_attr.single_attr_list) == \
+               attr_schema.initial_indexes
+        assert obj.get_complex_attr_prop(attr_schema.name) is complex_attr
+        for single_attr in complex_attr.single_attr_list:
+            assert obj.get_single_attr_prop(attr_schema.name, single_attr.index) is single_attr
+        if attr_schema.is_list:
+            assert getattr(obj, "_{}".format(attr_schema.name)) == []
+
+
+def test_schema_initial_indexes():
+    assert LineSOI.schema().get_attribute("points").initial_indexes == (0, 1)
+    assert SectionSOI.schema().get_attribute("border_points").initial_indexes == (0, 1)
+    assert LightSOI.schema().get_attribute("colors").initial_indexes == (0,)
+    assert LightSOI.schema().get_attribute("name").initial_indexes == (-1,)
+    assert LightSOI.schema().list_attr_names == ("colors",)
+
+
+def test_schema_possible_values():
+    descriptor = LightSOI.__dict__["light_stick_type"]
+    assert isinstance(descriptor, EnumDescriptor)
+    assert LightSOI.schema().get_attribute("light_stick_type").possible_values == \
+           frozenset(descriptor.possible_values)
+
+
+def test_not_found_attribute():
+    with pytest.raises(NotFoundComplexAttrError):
+        LightSOI.schema().get_attribute("Unnamed: 6")
+    with pytest.raises(NotFoundComplexAttrError):
+        LightSOI().get_complex_attr_prop("Unnamed: 6")
+    with pytest.raises(NotFoundComplexAttrError):
+        LightSOI().get_single_attr_prop("Unnamed: 6")
+    with pytest.raises(AssertionError, match="Attr not found"):
+        LightSOI().get_single_attr_prop("colors", 5)
+
+
+def test_single_attribute_indexes_are_kept_on_removal():
+    obj = LightSOI()
+    for _ in range(3):
+        obj.append_complex_attr_index("colors")
+    obj.remove_complex_attr_index("colors", 1)
+    single_attr_list = obj.get_complex_attr_prop("colors").single_attr_list
+    assert [single_attr.index for single_attr in single_attr_list] == [0, 2, 3]
+    with pytest.raises(AssertionError, match="Attr not found"):
+        obj.get_single_attr_prop("colors", 1)
+    assert obj.get_single_attr_prop("colors", 2) is single_attr_list[1]
+
+    obj.append_complex_attr_index("colors")
+    assert [single_attr.index for single_attr in single_attr_list] == [0, 2, 3, 3]
+    with pytest.raises(ManyFoundComplexAttrError, match="More then 1 found for attr 'colors' index 3"):
+        obj.get_single_attr_prop("colors", 3)
+    with pytest.raises(ComplexAttrError):
+        obj.get_single_attr_prop("colors", 3)
+    obj.remove_complex_attr_index("colors", 3)
+    assert obj.get_single_attr_prop("colors", 3) is single_attr_list[2]
@@ -0,0 +1,42 @@
+from two_sided_graph import OneComponentTwoSidedPG
+
+
+def line_graph(nodes_count: int):
+    """ inf_pu - node_0 - node_1 - ... - inf_nd """
+    pg = OneComponentTwoSidedPG()
+    nodes = [pg.insert_node()]
+    for _ in range(nodes_count - 1):
+        nodes.append(pg.insert_node(nodes[-1].ni_nd))
+    return pg, nodes
+
+
+def test_cut_components_section_between_borders():
+    pg, nodes = line_graph(4)
+    border_nodes = [nodes[0], nodes[2]]
+    closed_links, closed_nodes = pg.cut_components(border_nodes).closed_links_nodes(border_nodes)
+    assert (closed_links, closed_nodes) == pg.closed_links_nodes(border_nodes)
+    assert closed_nodes == {nodes[1]}
+    assert len(closed_links) == 2
+
+
+def test_cut_components_section_touching_inf_is_not_closed():
+    """ node_0 branches to node_1 and parallel node, both lead to inf_nd """
+    pg, nodes = line_graph(2)
+    parallel_node = pg.init_node()
+    pg.connect(nodes[0].ni_nd, parallel_node.ni_pu)
+    pg.connect(parallel_node.ni_nd, pg.inf_nd.ni_pu)
+    border_nodes = [nodes[1], parallel_node]
+    assert pg.cut_components(border_nodes).closed_links_nodes(border_nodes) == (set(), set())
+    assert pg.closed_links_nodes(border_nodes) == (set(), set())
+
+
+def test_cut_components_section_reaching_other_cut_node_is_not_closed():
+    """ nodes_1 branch leads to border of other section, part between nodes_2 and nodes_3 is closed """
+    pg, nodes = line_graph(4)
+    other_border_node = pg.init_node()
+    pg.connect(nodes[1].ni_nd, other_border_node.ni_pu)
+    pg.connect(other_border_node.ni_nd, pg.inf_nd.ni_pu)
+    border_nodes = [nodes[0], nodes[2], nodes[3]]
+    cut_components = pg.cut_components(border_nodes + [other_border_node])
+    assert cut_components.closed_links_nodes(border_nodes) == (set(), set())
+    assert cut_components.closed_links_nodes([nodes[2], nodes[3]])[0]
@@ -0,0 +1,131 @@
+import io
+import os
+import threading
+
+import pytest
+
+import xml_formation
+from rail_route import RailRoute, RailRouteRecord, normalize_route_records
+from xml_formation import RoutesXmlStream, minidom_rail_routes_xml, write_rail_routes_xml
+
+
+def make_light_routes(lights_count: int = 3, routes_per_light: int = 4, route_cls: type = RailRoute) -> \
+        list[tuple[str, str, list[RailRoute]]]:
+    light_routes = []
+    for i in range(lights_count):
+        routes = []
+        for j in range(routes_per_light):
+            route = route_cls(i * routes_per_light + j + 1)
+            route.route_type = "PpoTrainRoute" if j % 2 else "PpoShuntingRoute"
+            route.route_tag = "N{}_CH{}&{}".format(i, j, j % 3)
+            route.trace_begin = "N{}".format(i)
+            route.trace_points = "+{} -{}".format(j + 1, j + 7)
+            route.trace_end = "CH{}".format(j)
+            route.end_selectors = "CH{} M{}".format(j, j)
+            routes.append(route)
+        signal_type = "PpoTrainSignal" if i % 2 == 0 else "PpoShuntingSignal"
+        light_routes.append(("N{}".format(i), signal_type, routes))
+    return light_routes
+
+
+def signals_with_keys(light_routes):
+    return [(light_name, signal_type, routes, "key_{}".format(light_name))
+            for light_name, signal_type, routes in light_routes]
+
+
+def read_file(file_name: str) -> str:
+    with open(file_name, 'r', encoding='utf-8') as in_file:
+        return in_file.read()
+
+
+def test_streaming_writer_equals_minidom():
+    light_routes = make_light_routes()
+    out = io.StringIO()
+    stream = RoutesXmlStream(out)
+    for light_name, signal_type, routes in light_routes:
+        if signal_type == "PpoTrainSignal":
+            stream.write_signal(light_name, signal_type, routes)
+    stream.close()
+    assert out.getvalue() == minidom_rail_routes_xml(light_routes, "PpoTrainSignal")
+
+
+def test_normalized_records_equal_minidom_of_routes():
+    light_routes = make_light_routes()
+    light_records = make_light_routes(route_cls=RailRouteRecord)
+    for _, _, records in light_records:
+        assert not any(record.normalized for record in records)
+        normalize_route_records(records)
+        # records of the same stream are normalized by every writer, they are padded only once
+        normalize_route_records(records)
+        assert all(record.normalized for record in records)
+    assert light_records[0][2][0].trace_points == "+1 -7 "
+    for signal_type in ("PpoTrainSignal", "PpoShuntingSignal"):
+        assert minidom_rail_routes_xml(light_records, signal_type) == minidom_rail_routes_xml(light_routes, signal_type)
+
+
+def test_streaming_writer_normalizes_records():
+    light_records = make_light_routes(route_cls=RailRouteRecord)
+    out = io.StringIO()
+    stream = RoutesXmlStream(out)
+    for light_name, signal_type, records in light_records:
+        if signal_type == "PpoShuntingSignal":
+            stream.write_signal(light_name, signal_type, records)
+    stream.close()
+    assert out.getvalue() == minidom_rail_routes_xml(make_light_routes(), "PpoShuntingSignal")
+
+
+def test_write_rail_routes_xml_files(tmp_path):
+    light_routes = make_light_routes()
+    write_rail_routes_xml(signals_with_keys(light_routes), str(tmp_path), "TrainRoute.xml", "ShuntingRoute.xml")
+    assert sorted(os.listdir(tmp_path)) == ["ShuntingRoute.xml", "TrainRoute.xml"]
+    assert read_file(tmp_path / "TrainRoute.xml") == minidom_rail_routes_xml(light_routes, "PpoTrainSignal")
+    assert read_file(tmp_path / "ShuntingRoute.xml") == minidom_rail_routes_xml(light_routes, "PpoShuntingSignal")
+
+
+def test_incremental_export_reuses_unchanged_signals(tmp_path):
+    light_routes = make_light_routes()
+    assert write_rail_routes_xml(signals_with_keys(light_routes), str(tmp_path),
+                                 "TrainRoute.xml", "ShuntingRoute.xml", True) == 0
+    light_routes[0][2][0].trace_end = "CH9"
+    changed_signals = signals_with_keys(light_routes)
+    changed_signals[0] = changed_signals[0][:3] + ("key_changed",)
+    reused_count = write_rail_routes_xml(changed_signals, str(tmp_path), "TrainRoute.xml", "ShuntingRoute.xml", True)
+    assert reused_count == len(light_routes) - 1
+    assert read_file(tmp_path / "TrainRoute.xml") == minidom_rail_routes_xml(light_routes, "PpoTrainSignal")
+
+
+def test_producer_error_keeps_old_files(tmp_path):
+    light_routes = make_light_routes()
+    write_rail_routes_xml(signals_with_keys(light_routes), str(tmp_path), "TrainRoute.xml", "ShuntingRoute.xml")
+    old_train_xml = read_file(tmp_path / "TrainRoute.xml")
+
+    def failing_light_routes():
+        yield from signals_with_keys(make_light_routes(1))
+        raise ValueError("route evaluation failed")
+
+    with pytest.raises(ValueError, match="route evaluation failed"):
+        write_rail_routes_xml(failing_light_routes(), str(tmp_path), "TrainRoute.xml", "ShuntingRoute.xml")
+    assert sorted(os.listdir(tmp_path)) == ["ShuntingRoute.xml", "TrainRoute.xml"]
+    assert read_file(tmp_path / "TrainRoute.xml") == old_train_xml
+
+
+def test_writer_error_after_sentinel_is_raised_without_hang(tmp_path, monkeypatch):
+    def failing_close(self):
+        raise OSError("disk full")
+
+    monkeypatch.setattr(xml_formation.RoutesXmlStream, "close", failing_close)
+    light_routes = signals_with_keys(make_light_routes(2 * xml_formation.WRITER_QUEUE_SIZE))
+    errors = []
+
+    def export():
+        try:
+            write_rail_routes_xml(light_routes, str(tmp_path), "TrainRoute.xml", "ShuntingRoute.xml")
+        except OSError as e:
+            errors.append(e)
+
+    export_thread = threading.Thread(target=export, daemon=True)
+    export_thread.start()
+    export_thread.join(10)
+    assert not export_thread.is_alive()
+    assert [e.args[0] for e in errors] == ["disk full"]
+    assert os.listdir(tmp_path) == []
@@ -95,6 +95,11 @@ class NodeInterface:
         self._move_by_link.pop(link)
         self.random_move_activate()
 
+    def order_links(self, links: list[Link]) -> None:
+        """ moves are kept in order of given links, links are the same as connected """
+        assert set(links) == set(self._move_by_link), "Links differ from connected"
+        self._move_by_link = OrderedDict((link, self._move_by_link[link]) for link in links)
+
     def choice_move_activate(self, move: Move) -> None:
         assert move in self.moves, 'Move not found'
         self._deactivate_all_moves()
@@ -415,22 +420,33 @@ class PolarGraph:
             ni_2.remove_link(link)
             self._links.remove(link)
 
+    def remove_node(self, pn: PolarNode) -> None:
+        for ni in pn.ni_s:
+            for link in ni.links:
+                self.disconnect(ni, link.opposite_ni(ni))
+        self._nodes.remove(pn)
+
     def walk(self, start_ni: NodeInterface, stop_nodes: Iterable[PolarNode] = None) -> list[Route]:
         if stop_nodes is None:
             stop_nodes = set()
         else:
             stop_nodes = set(stop_nodes)
+        # graph is not changed by walk, border interfaces are found once,
+        # nodes of current route are out nodes of links_need_to_check and kept as set
+        border_ni_s = self.border_ni_s
         routes_: list[Route] = [Route(start_ni)]
         links_need_to_check: OrderedDict[NodeInterface, list[Link]] = OrderedDict({start_ni: start_ni.links})
+        route_nodes: set[PolarNode] = {start_ni.pn}
         route_ends = False
 
         while links_need_to_check:
-            last_out_ni = list(links_need_to_check.keys())[-1]
+            last_out_ni = next(reversed(links_need_to_check))
             if not links_need_to_check[last_out_ni]:
                 links_need_to_check.pop(last_out_ni)
+                route_nodes.discard(last_out_ni.pn)
                 if len(links_need_to_check):
                     up_ni = last_out_ni.pn.opposite_ni(last_out_ni)
-                    prev_ni = list(links_need_to_check.keys())[-1]
+                    prev_ni = next(reversed(links_need_to_check))
                     common_links = common_links_of_ni_s(up_ni, prev_ni)
                     for common_link in common_links:
                         if common_link in links_need_to_check[prev_ni]:
@@ -445,13 +461,13 @@ class PolarGraph:
                 enter_ni = link.opposite_ni(last_out_ni)
                 enter_node = enter_ni.pn
                 routes_[-1].append_link(link)
-                if (enter_node in stop_nodes) or (enter_ni in self.border_ni_s) or \
-                        (enter_node in routes_[-1].nodes[:-1]):
+                if (enter_node in stop_nodes) or (enter_ni in border_ni_s) or (enter_node in route_nodes):
                     links_need_to_check[last_out_ni].remove(link)
                     route_ends = True
                 else:
                     opposite_ni = enter_node.opposite_ni(enter_ni)
                     links_need_to_check[opposite_ni] = opposite_ni.links
+                    route_nodes.add(enter_node)
         return routes_
 
     def routes_node_to_node(self, start_node: PolarNode, end_node: PolarNode) \
@@ -758,6 +774,157 @@ class OneComponentTwoSidedPG(PolarGraph):
                     return set(), set()
         return route_links, internal_nodes
 
+    def cut_components(self, cut_nodes: Iterable[PolarNode]) -> CutComponents:
+        return CutComponents(self, cut_nodes)
+
+
+class LinksComponent:
+    def __init__(self):
+        self.links: set[Link] = set()
+        self.nodes: set[PolarNode] = set()
+        self.cut_ni_s: set[NodeInterface] = set()
+        self.touches_inf = False
+
+
+class CutComponents:
+    """ connected components of links after cutting graph in cut nodes, evaluated by one flood-fill pass """
+
+    def __init__(self, pg: OneComponentTwoSidedPG, cut_nodes: Iterable[PolarNode]):
+        self.cut_nodes = set(cut_nodes)
+        self.components: list[LinksComponent] = []
+        self.components_by_cut_ni: dict[NodeInterface, list[LinksComponent]] = {}
+        inf_nodes = set(pg.inf_nodes)
+        link_component: dict[Link, LinksComponent] = {}
+        for start_link in pg.links:
+            if start_link in link_component:
+                continue
+            component = LinksComponent()
+            self.components.append(component)
+            link_component[start_link] = component
+            links_stack = [start_link]
+            while links_stack:
+                link = links_stack.pop()
+                component.links.add(link)
+                for ni in link.ni_s:
+                    node = ni.pn
+                    if node in self.cut_nodes:
+                        component.cut_ni_s.add(ni)
+                        continue
+                    if node in component.nodes:
+                        continue
+                    component.nodes.add(node)
+                    if node in inf_nodes:
+                        component.touches_inf = True
+                    for node_ni in node.ni_s:
+                        for next_link in node_ni.links:
+                            if next_link not in link_component:
+                                link_component[next_link] = component
+                                links_stack.append(next_link)
+        for component in self.components:
+            for ni in component.cut_ni_s:
+                self.components_by_cut_ni.setdefault(ni, []).append(component)
+
+    def closed_links_nodes(self, border_nodes: Iterable[PolarNode]) -> tuple[set[Link], set[PolarNode]]:
+        """
+        border_nodes should be subset of cut nodes
+        closed are components with >= 2 border interfaces,
+        if such component touches inf or other cut nodes - section is not closed
+        """
+        border_nodes = set(border_nodes)
+        assert border_nodes <= self.cut_nodes, "Border nodes not in cut nodes"
+        candidates: dict[int, LinksComponent] = {}
+        for node in border_nodes:
+            for ni in node.ni_s:
+                for component in self.components_by_cut_ni.get(ni, []):
+                    candidates[id(component)] = component
+        closed_links: set[Link] = set()
+        internal_nodes: set[PolarNode] = set()
+        for component in candidates.values():
+            cut_nodes = {ni.pn for ni in component.cut_ni_s}
+            border_ni_count = len([ni for ni in component.cut_ni_s if ni.pn in border_nodes])
+            if border_ni_count < 2:
+                continue
+            if component.touches_inf or not (cut_nodes <= border_nodes):
+                return set(), set()
+            closed_links |= component.links
+            internal_nodes |= component.nodes
+        return closed_links, internal_nodes
+
+
+# graph element of other process: node index, interface end and link index of move (None when not used)
+ElementKey = namedtuple("ElementKey", ["node_index", "end_str", "link_index"])
+
+
+class PicklableGraphCopy:
+    """
+    copy of graph for other processes, pickle of graph objects goes from node to node by links deeper than
+    recursion limit, so nodes and links are pickled as lists with cells and links of interfaces as indexes,
+    graph is rebuilt on unpickling with the same order of interfaces links and the same active moves,
+    elements of graph and of its copy are matched by element keys
+    """
+
+    def __init__(self, pg: PolarGraph):
+        self.graph = pg
+        self.nodes: list[PolarNode] = list(pg.nodes)
+        self.links: list[Link] = list(pg.links)
+        self.index_elements()
+        inf_nodes = pg.inf_nodes if isinstance(pg, OneComponentTwoSidedPG) else ()
+        self._state = {"graph_cls": pg.__class__,
+                       "inf_indexes": [self._node_indexes[node] for node in inf_nodes],
+                       "nodes_cells": [node.copy_cells() for node in self.nodes],
+                       "links_ends": [[(self._node_indexes[ni.pn], ni.end_str) for ni in link.ni_s]
+                                      for link in self.links],
+                       "links_cells": [link.copy_cells() for link in self.links],
+                       "ni_s_moves": [[[(self._link_indexes[move.link], move.active, move.copy_cells())
+                                        for move in ni.moves] for ni in node.ni_s] for node in self.nodes]}
+
+    def index_elements(self):
+        self._node_indexes: dict[PolarNode, int] = {node: i for i, node in enumerate(self.nodes)}
+        self._link_indexes: dict[Link, int] = {link: i for i, link in enumerate(self.links)}
+
+    def __getstate__(self) -> dict:
+        return self._state
+
+    def __setstate__(self, state: dict):
+        self._state = state
+        self.graph = pg = state["graph_cls"]()
+        nodes: list[Optional[PolarNode]] = [None] * len(state["nodes_cells"])
+        if isinstance(pg, OneComponentTwoSidedPG):
+            for i, node in zip(state["inf_indexes"], pg.inf_nodes):
+                nodes[i] = node
+        self.nodes = [node if node is not None else pg.init_node() for node in nodes]
+        for node, cells in zip(self.nodes, state["nodes_cells"]):
+            node.cell_objs = cells
+        self.links = [pg.connect(*(self.nodes[i].ni_by_end(End(end_str)) for i, end_str in ends))
+                      for ends in state["links_ends"]]
+        for link, cells in zip(self.links, state["links_cells"]):
+            link.cell_objs = cells
+        for node, ni_s_moves in zip(self.nodes, state["ni_s_moves"]):
+            for ni, moves in zip(node.ni_s, ni_s_moves):
+                ni.order_links([self.links[link_index] for link_index, _, _ in moves])
+                for link_index, active, cells in moves:
+                    move = ni.get_move_by_link(self.links[link_index])
+                    move.cell_objs = cells
+                    if active:
+                        ni.choice_move_activate(move)
+        self.index_elements()
+
+    def element_key(self, element: Union[PolarNode, NodeInterface, Move]) -> ElementKey:
+        if isinstance(element, PolarNode):
+            return ElementKey(self._node_indexes[element], None, None)
+        if isinstance(element, NodeInterface):
+            return ElementKey(self._node_indexes[element.pn], element.end_str, None)
+        return ElementKey(self._node_indexes[element.ni.pn], element.ni.end_str, self._link_indexes[element.link])
+
+    def element(self, key: ElementKey) -> Union[PolarNode, NodeInterface, Move]:
+        node = self.nodes[key.node_index]
+        if key.end_str is None:
+            return node
+        ni = node.ni_by_end(End(key.end_str))
+        if key.link_index is None:
+            return ni
+        return ni.get_move_by_link(self.links[key.link_index])
+
 
 if __name__ == '__main__':
     pass
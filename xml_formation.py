@@ -1,12 +1,21 @@
 from collections import OrderedDict
+from concurrent.futures import ThreadPoolExecutor, wait
+from contextlib import nullcontext
+from itertools import chain
+from queue import Queue
+from typing import Iterable, TextIO, BinaryIO, Optional, Union
+import json
 import os
 import xml.dom.minidom
 import xml.etree.ElementTree as ElTr
 
-from rail_route import RailRoute
+from rail_route import RailRoute, RailRouteRecord, normalize_route_records
 
+# signals waiting for each route file writer, producer is blocked when writer is behind
+WRITER_QUEUE_SIZE = 16
 
-def form_route_element(signal_element_, route_: RailRoute) -> ElTr.Element:
+
+def form_route_element(signal_element_, route_: Union[RailRoute, RailRouteRecord]) -> ElTr.Element:
     if route_.route_type == "PpoTrainRoute":
         route_element = ElTr.SubElement(signal_element_, 'TrRoute')
     else:
@@ -53,36 +62,235 @@ def form_route_element(signal_element_, route_: RailRoute) -> ElTr.Element:
     return route_element
 
 
-def form_rail_routes_xml(train_light_routes_dict: OrderedDict[str, tuple[list[RailRoute], list[RailRoute]]],
-                         shunting_light_routes_dict: OrderedDict[str, list[RailRoute]],
-                         sub_folder: str, train_routes_file_name: str, shunting_routes_file_name: str):
+def escape_attrib_value(value: str) -> str:
+    """ same escaping as minidom uses for attribute values """
+    return value.replace("&", "&amp;").replace("<", "&lt;").replace("\"", "&quot;").replace(">", "&gt;")
+
+
+class IndentedXmlWriter:
+    """ incremental xml writer, output is equal to minidom toprettyxml with same indent and newl """
+    def __init__(self, out: TextIO, indent: str = "\t", newl: str = "\n"):
+        self.out = out
+        self.indent = indent
+        self.newl = newl
+        self._open_elements: list[str] = []
+        self._start_tag_pending = False
+
+    def start_document(self):
+        self.out.write('<?xml version="1.0" ?>' + self.newl)
+
+    def start_element(self, name: str, attrs: dict[str, str]):
+        if self._start_tag_pending:
+            self.out.write(">" + self.newl)
+        attrs_str = "".join(' {}="{}"'.format(attr_name, escape_attrib_value(attr_value))
+                            for attr_name, attr_value in attrs.items())
+        self.out.write("{}<{}{}".format(self.indent * len(self._open_elements), name, attrs_str))
+        self._open_elements.append(name)
+        self._start_tag_pending = True
+
+    def flush_start_tag(self):
+        if self._start_tag_pending:
+            self.out.write(">" + self.newl)
+            self._start_tag_pending = False
+
+    def write_raw(self, text: str):
+        """ already formatted child elements of current element """
+        self.flush_start_tag()
+        self.out.write(text)
+
+    def end_element(self):
+        name = self._open_elements.pop()
+        if self._start_tag_pending:
+            self.out.write("/>" + self.newl)
+            self._start_tag_pending = False
+        else:
+            self.out.write("{}</{}>{}".format(self.indent * len(self._open_elements), name, self.newl))
+
+    def write_element(self, element: ElTr.Element):
+        self.start_element(element.tag, element.attrib)
+        for child_element in element:
+            self.write_element(child_element)
+        self.end_element()
+
+
+class ByteCountingOut:
+    """ text output with position in utf-8 bytes, newlines are translated to os.linesep by text file """
+    def __init__(self, out: TextIO):
+        self.out = out
+        self.position = 0
+        self.linesep_extra = len(os.linesep) - 1
+
+    def write(self, text: str):
+        self.out.write(text)
+        self.position += len(text) if text.isascii() else len(text.encode('utf-8'))
+        self.position += self.linesep_extra * text.count("\n")
+
+
+class RoutesXmlStream:
+    """ 'Routes' document written by signals, only one route element is kept in memory,
+        signal keyed by signal_key is copied from previous file if its index has the same key """
+    def __init__(self, out: TextIO, previous_file: BinaryIO = None, previous_index: dict[str, dict] = None):
+        self.out = ByteCountingOut(out)
+        self.previous_file = previous_file
+        self.previous_index = previous_index if previous_index else {}
+        self.index: OrderedDict[str, dict] = OrderedDict()
+        self.reused_count = 0
+        self.writer = IndentedXmlWriter(self.out)
+        self.writer.start_document()
+        self.writer.start_element("Routes", {})
+
+    def write_signal(self, light_name: str, signal_type: str, routes: Iterable[RailRoute],
+                     signal_key: Optional[str] = None):
+        self.writer.flush_start_tag()
+        offset = self.out.position
+        previous_entry = self.previous_index.get(light_name)
+        if signal_key and self.previous_file and previous_entry and (previous_entry["key"] == signal_key):
+            self.previous_file.seek(previous_entry["offset"])
+            fragment = self.previous_file.read(previous_entry["length"]).decode('utf-8')
+            self.writer.write_raw(fragment.replace(os.linesep, "\n"))
+            self.reused_count += 1
+        else:
+            normalize_route_records(routes)
+            signal_tag_name = 'TrainSignal' if signal_type == "PpoTrainSignal" else 'ShuntingSignal'
+            self.writer.start_element(signal_tag_name, {"Tag": light_name, "Type": signal_type})
+            route_parent = ElTr.Element(signal_tag_name)
+            for route in routes:
+                route_element = form_route_element(route_parent, route)
+                self.writer.write_element(route_element)
+                route_parent.remove(route_element)
+            self.writer.end_element()
+        self.index[light_name] = {"key": signal_key, "offset": offset, "length": self.out.position - offset}
+
+    def close(self):
+        self.writer.end_element()
+
+
+def routes_index_file_name(file_full_name: str) -> str:
+    return "{}.index.json".format(file_full_name)
+
+
+def load_routes_index(file_full_name: str) -> Optional[dict[str, dict]]:
+    """ signals index is valid only for the same file as it was written for """
+    try:
+        with open(routes_index_file_name(file_full_name), 'r', encoding='utf-8') as index_file:
+            index_data = json.load(index_file)
+        file_stat = os.stat(file_full_name)
+    except (OSError, ValueError):
+        return None
+    if (index_data.get("size") != file_stat.st_size) or (index_data.get("mtime_ns") != file_stat.st_mtime_ns):
+        return None
+    return index_data.get("signals")
+
+
+def save_routes_index(file_full_name: str, signals_index: dict[str, dict]):
+    file_stat = os.stat(file_full_name)
+    index_file_full_name = routes_index_file_name(file_full_name)
+    tmp_file_full_name = "{}.tmp".format(index_file_full_name)
+    with open(tmp_file_full_name, 'w', encoding='utf-8') as index_file:
+        json.dump({"size": file_stat.st_size, "mtime_ns": file_stat.st_mtime_ns, "signals": signals_index},
+                  index_file)
+    os.replace(tmp_file_full_name, index_file_full_name)
+
+
+def write_routes_file(file_full_name: str, signals: Queue, incremental: bool = False) -> \
+        tuple[str, OrderedDict[str, dict], int]:
+    """ signals are (light_name, signal_type, routes, signal_key) until None,
+        file appears only when fully written """
+    tmp_file_full_name = "{}.tmp".format(file_full_name)
+    sentinel_received = False
+    try:
+        previous_index = load_routes_index(file_full_name) if incremental else None
+        with open(tmp_file_full_name, 'w', encoding='utf-8') as out, \
+                (open(file_full_name, 'rb') if previous_index else nullcontext()) as previous_file:
+            stream = RoutesXmlStream(out, previous_file, previous_index)
+            signal = signals.get()
+            while signal is not None:
+                stream.write_signal(*signal)
+                signal = signals.get()
+            sentinel_received = True
+            stream.close()
+    except BaseException:
+        # producer must not be blocked by full queue of failed writer, queue is empty after None
+        if not sentinel_received:
+            while signals.get() is not None:
+                pass
+        try:
+            if os.path.isfile(tmp_file_full_name):
+                os.remove(tmp_file_full_name)
+        except OSError:
+            pass
+        raise
+    return tmp_file_full_name, stream.index, stream.reused_count
+
+
+def write_rail_routes_xml(light_routes: Iterable[tuple[str, str, list[RailRoute], Optional[str]]],
+                          sub_folder: str, train_routes_file_name: str, shunting_routes_file_name: str,
+                          incremental: bool = False) -> int:
+    """ light_routes items are (light_name, signal_type, routes, signal_key), every signal is written when produced,
+        train and shunting files are written by two threads and replaced only after both are complete.
+        In incremental mode signals with same signal_key as in previous export are copied from previous files.
+        Returns count of copied signals """
     train_routes_file_full_name = os.path.join(os.getcwd(), sub_folder, train_routes_file_name)
     shunting_routes_file_full_name = os.path.join(os.getcwd(), sub_folder, shunting_routes_file_name)
+    file_full_names = [train_routes_file_full_name, shunting_routes_file_full_name]
+    train_signals = Queue(WRITER_QUEUE_SIZE)
+    shunting_signals = Queue(WRITER_QUEUE_SIZE)
 
-    train_route_element = ElTr.Element('Routes')
-    shunting_route_element = ElTr.Element('Routes')
+    producer_error: Optional[BaseException] = None
+    with ThreadPoolExecutor(max_workers=2) as executor:
+        futures = [executor.submit(write_routes_file, train_routes_file_full_name, train_signals, incremental),
+                   executor.submit(write_routes_file, shunting_routes_file_full_name, shunting_signals, incremental)]
+        try:
+            for signal in light_routes:
+                if signal[1] == "PpoTrainSignal":
+                    train_signals.put(signal)
+                else:
+                    shunting_signals.put(signal)
+        except BaseException as e:
+            producer_error = e
+        train_signals.put(None)
+        shunting_signals.put(None)
+        wait(futures)
+
+    # old files are kept if any of documents is not complete
+    results = [future.result() for future in futures if future.exception() is None]
+    if producer_error or (len(results) < len(futures)):
+        for tmp_file_full_name, _, _ in results:
+            os.remove(tmp_file_full_name)
+        if producer_error:
+            raise producer_error
+        for future in futures:
+            future.result()
+
+    reused_count = 0
+    for file_full_name, (tmp_file_full_name, signals_index, file_reused_count) in zip(file_full_names, results):
+        os.replace(tmp_file_full_name, file_full_name)
+        reused_count += file_reused_count
+        if incremental:
+            save_routes_index(file_full_name, signals_index)
+    return reused_count
+
+
+def form_rail_routes_xml(train_light_routes_dict: OrderedDict[str, tuple[list[RailRoute], list[RailRoute]]],
+                         shunting_light_routes_dict: OrderedDict[str, list[RailRoute]],
+                         sub_folder: str, train_routes_file_name: str, shunting_routes_file_name: str):
+    light_routes = chain(((light_name, "PpoTrainSignal", train_routes + shunting_routes, None)
+                          for light_name, (train_routes, shunting_routes) in train_light_routes_dict.items()),
+                         ((light_name, "PpoShuntingSignal", shunting_routes, None)
+                          for light_name, shunting_routes in shunting_light_routes_dict.items()))
+    write_rail_routes_xml(light_routes, sub_folder, train_routes_file_name, shunting_routes_file_name)
 
-    for light_name in train_light_routes_dict:
-        train_routes, shunting_routes = train_light_routes_dict[light_name]
-        signal_element = ElTr.SubElement(train_route_element, 'TrainSignal')
-        signal_element.set("Tag", light_name)
-        signal_element.set("Type", "PpoTrainSignal")
-        for route in train_routes:
-            form_route_element(signal_element, route)
-        for route in shunting_routes:
-            form_route_element(signal_element, route)
 
-    for light_name in shunting_light_routes_dict:
-        shunting_routes = shunting_light_routes_dict[light_name]
-        signal_element = ElTr.SubElement(shunting_route_element, 'ShuntingSignal')
+def minidom_rail_routes_xml(light_routes: Iterable[tuple[str, str, list[RailRoute]]], signal_type_: str) -> str:
+    """ whole document pretty format, reference for streaming writer """
+    routes_element = ElTr.Element('Routes')
+    for light_name, signal_type, routes in light_routes:
+        if signal_type != signal_type_:
+            continue
+        signal_element = ElTr.SubElement(routes_element, 'TrainSignal' if signal_type == "PpoTrainSignal"
+                                         else 'ShuntingSignal')
         signal_element.set("Tag", light_name)
-        signal_element.set("Type", "PpoShuntingSignal")
-        for route in shunting_routes:
+        signal_element.set("Type", signal_type)
+        for route in routes:
             form_route_element(signal_element, route)
-
-    xml_str_train = xml.dom.minidom.parseString(ElTr.tostring(train_route_element)).toprettyxml()
-    with open(train_routes_file_full_name, 'w', encoding='utf-8') as out:
-        out.write(xml_str_train)
-    xml_str_shunt = xml.dom.minidom.parseString(ElTr.tostring(shunting_route_element)).toprettyxml()
-    with open(shunting_routes_file_full_name, 'w', encoding='utf-8') as out:
-        out.write(xml_str_shunt)
+    return xml.dom.minidom.parseString(ElTr.tostring(routes_element)).toprettyxml(indent="\t")